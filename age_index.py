@@ -0,0 +1,147 @@
+"""
+This module contains the age-range interval index behind the "modules
+suitable for age N" queries.
+"""
+
+import math
+import re
+from bisect import bisect_right
+
+from facets import Bitset, set_positions
+
+# "5-12 years", "5 to 12", "10+ years" or "16 years", with nothing else
+# around it, so "5 potatoes" or "5-12-20 years" are not read as ages
+AGE_RANGE_PATTERN = re.compile(r"\s*(\d+)\s*(?:(?:-|–|to)\s*(\d+)|(\+))?\s*(?:years?)?\s*", re.IGNORECASE)
+
+
+# Parse an age range such as "5-12 years" or "14+ years" into an inclusive
+# (youngest, oldest) interval. Open-ended ranges have math.inf as their
+# oldest age, and text that is not an age range gives None.
+def parse_age_range(text):
+    if not text:
+        return None
+    match = AGE_RANGE_PATTERN.fullmatch(text)
+    if match is None:
+        return None
+    youngest, oldest, open_ended = match.groups()
+    youngest = int(youngest)
+    if open_ended:
+        return (youngest, math.inf)
+    if oldest is None:
+        return (youngest, youngest)
+    oldest = int(oldest)
+    return (min(youngest, oldest), max(youngest, oldest))
+
+
+class _Node:
+    """Node of a centered interval tree."""
+
+    __slots__ = ("center", "by_low", "by_high", "left", "right")
+
+    def __init__(self, intervals):
+        self.center = intervals[len(intervals) // 2][0]
+        here = [interval for interval in intervals if interval[0] <= self.center <= interval[1]]
+        self.by_low = sorted(here)
+        self.by_high = sorted(here, key=lambda interval: interval[1], reverse=True)
+        left = [interval for interval in intervals if interval[1] < self.center]
+        right = [interval for interval in intervals if interval[0] > self.center]
+        self.left = _Node(left) if left else None
+        self.right = _Node(right) if right else None
+
+
+# Yield the intervals in the tree that contain the given age
+def _stab(node, age):
+    while node is not None:
+        if age < node.center:
+            for interval in node.by_low:
+                if interval[0] > age:
+                    break
+                yield interval
+            node = node.left
+        elif age > node.center:
+            for interval in node.by_high:
+                if interval[1] < age:
+                    break
+                yield interval
+            node = node.right
+        else:
+            yield from node.by_low
+            return
+
+
+class AgeIndex:
+    """Interval index from age ranges to catalog slots.
+
+    Each record's ``age_range`` is parsed once when it is added. Only the
+    slot the catalog gives the record is kept, in a bitset per distinct
+    interval, and the catalog fetches the records itself. The distinct
+    intervals are kept in a centered interval tree, so finding those that
+    match costs O(log m) for m distinct age ranges; the matching slots are
+    the OR of their bitsets, ready to intersect with facet bits. The tree is
+    rebuilt on the next query after a new distinct interval appears or the
+    last record of one goes.
+
+    Records without a parseable age range are skipped.
+    """
+
+    def __init__(self):
+        self._groups = {}
+        self._tree = None
+        self._sorted = None
+
+    def __len__(self):
+        return sum(group.bits.bit_count() for group in self._groups.values())
+
+    # Index a record's slot under its parsed age range
+    def add(self, slot, record):
+        interval = parse_age_range(record.get("age_range"))
+        if interval is None:
+            return
+        group = self._groups.get(interval)
+        if group is None:
+            group = self._groups[interval] = Bitset()
+            self._sorted = None
+        group.set(slot)
+
+    # Take a record's slot out of the index
+    def remove(self, slot, record):
+        interval = parse_age_range(record.get("age_range"))
+        group = self._groups.get(interval)
+        if group is None:
+            return
+        group.clear(slot)
+        if not group.bits:
+            del self._groups[interval]
+            self._sorted = None
+
+    # Forget every indexed record
+    def reset(self):
+        self._groups = {}
+        self._sorted = None
+
+    # Get the distinct intervals overlapping youngest..oldest
+    def intervals(self, youngest, oldest=None):
+        if oldest is None:
+            oldest = youngest
+        if self._sorted is None:
+            self._sorted = sorted(self._groups)
+            self._tree = _Node(self._sorted) if self._sorted else None
+        # Intervals containing the youngest age, plus those starting later
+        # but no later than the oldest age, are exactly the overlapping ones
+        found = list(_stab(self._tree, youngest))
+        start = bisect_right(self._sorted, (youngest, math.inf))
+        end = bisect_right(self._sorted, (oldest, math.inf))
+        found.extend(self._sorted[start:end])
+        return found
+
+    # Get the bits of the slots whose age range overlaps youngest..oldest,
+    # or covers youngest when oldest is not given
+    def bits(self, youngest, oldest=None):
+        bits = 0
+        for interval in self.intervals(youngest, oldest):
+            bits |= self._groups[interval].bits
+        return bits
+
+    # Get the matching slots in order
+    def slots(self, youngest, oldest=None):
+        return set_positions(self.bits(youngest, oldest))
@@ -0,0 +1,46 @@
+"""
+This module contains the materialized aggregate views behind the dashboard's
+distribution charts.
+"""
+
+
+class AggregateView:
+    """Count of catalog records per bucket, maintained as records change.
+
+    ``key`` maps a record to its bucket. Buckets listed up front are always
+    reported, in that order, even when their count is zero; any other bucket
+    appears after them in order of first appearance and is dropped again
+    when its count falls to zero. Adding or removing a record costs O(1),
+    and a snapshot costs O(number of buckets).
+    """
+
+    def __init__(self, key, buckets=()):
+        self.key = key
+        self._fixed = frozenset(buckets)
+        self._buckets = tuple(buckets)
+        self._counts = dict.fromkeys(self._buckets, 0)
+
+    # Count a record that was added to the catalog
+    def add(self, record):
+        bucket = self.key(record)
+        self._counts[bucket] = self._counts.get(bucket, 0) + 1
+
+    # Uncount a record that was removed from the catalog
+    def remove(self, record):
+        bucket = self.key(record)
+        count = self._counts[bucket] - 1
+        if count or bucket in self._fixed:
+            self._counts[bucket] = count
+        else:
+            del self._counts[bucket]
+
+    # Forget every counted record
+    def reset(self):
+        self._counts = dict.fromkeys(self._buckets, 0)
+
+    # Get the current counts
+    def snapshot(self):
+        return {
+            "buckets": list(self._counts.keys()),
+            "counts": list(self._counts.values())
+        }
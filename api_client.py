@@ -0,0 +1,327 @@
+"""
+This module contains the asyncio HTTP client used to call the providers listed
+in api_integrations.py.
+
+Each provider gets a pool of keep-alive connections per host and a token
+bucket sized from its ``requests_per_minute`` entry. Requests share a global
+concurrency limit, failed calls are retried with exponential backoff, and
+``fetch_many`` fans a batch of paths out over the pool. GET requests go
+through a ``ResponseCache`` (see response_cache.py) when the client is given
+one.
+"""
+
+import asyncio
+import json
+import random
+import ssl
+import time
+from urllib.parse import urlencode, urlsplit
+
+from api_integrations import get_api_by_name
+
+USER_AGENT = "EduVerse/0.1"
+
+# Statuses worth retrying: rate limited or a transient server failure
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class ApiClientError(Exception):
+    """Raised when a provider cannot be called or keeps failing."""
+
+
+class HttpError(ApiClientError):
+    """Raised for a non-2xx response once retries are exhausted."""
+
+    def __init__(self, response):
+        super().__init__(f"HTTP {response.status} from {response.url}")
+        self.response = response
+
+
+class Response:
+    """A fully read HTTP response."""
+
+    def __init__(self, url, status, reason, headers, body):
+        self.url = url
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+
+    @property
+    def ok(self):
+        return 200 <= self.status < 300
+
+    def text(self, encoding="utf-8"):
+        return self.body.decode(encoding)
+
+    def json(self):
+        return json.loads(self.body)
+
+
+class TokenBucket:
+    """Token bucket allowing ``rate`` requests per second with bursts up to ``capacity``."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    # Wait until a token is available and take it
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class _StaleConnection(Exception):
+    """The server closed an idle keep-alive connection before we reused it."""
+
+
+class _Connection:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.reused = False
+
+    def close(self):
+        self.writer.close()
+
+
+class ConnectionPool:
+    """Keep-alive HTTP/1.1 connections to a single host."""
+
+    def __init__(self, scheme, host, port, max_connections=10, ssl_context=None):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.ssl_context = ssl_context
+        self._idle = []
+        self._slots = asyncio.Semaphore(max_connections)
+
+    async def _acquire(self):
+        await self._slots.acquire()
+        while self._idle:
+            connection = self._idle.pop()
+            if not connection.reader.at_eof():
+                connection.reused = True
+                return connection
+            connection.close()
+        try:
+            reader, writer = await asyncio.open_connection(
+                self.host, self.port,
+                ssl=self.ssl_context if self.scheme == "https" else None,
+                server_hostname=self.host if self.scheme == "https" else None
+            )
+        except BaseException:
+            self._slots.release()
+            raise
+        return _Connection(reader, writer)
+
+    def _release(self, connection, reusable):
+        if reusable:
+            self._idle.append(connection)
+        else:
+            connection.close()
+        self._slots.release()
+
+    # Send one request and read the whole response
+    async def request(self, method, target, headers, body, url):
+        connection = await self._acquire()
+        reusable = False
+        try:
+            lines = [f"{method} {target} HTTP/1.1", f"Host: {self.host}"]
+            lines += [f"{name}: {value}" for name, value in headers.items()]
+            if body is not None:
+                lines.append(f"Content-Length: {len(body)}")
+            connection.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + (body or b""))
+            await connection.writer.drain()
+            response, reusable = await self._read_response(connection, method, url)
+            return response
+        except (ConnectionError, asyncio.IncompleteReadError) as error:
+            if connection.reused:
+                raise _StaleConnection() from error
+            raise
+        finally:
+            self._release(connection, reusable)
+
+    async def _read_response(self, connection, method, url):
+        reader = connection.reader
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError("Connection closed before the response")
+        version, status, *reason = status_line.decode("latin-1").rstrip("\r\n").split(" ", 2)
+        status = int(status)
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        keep_alive = headers.get("connection", "").lower() != "close" and version != "HTTP/1.0"
+        if method == "HEAD" or status in (204, 304) or 100 <= status < 200:
+            body = b""
+        elif headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                        pass
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            body = b"".join(chunks)
+        elif "content-length" in headers:
+            body = await reader.readexactly(int(headers["content-length"]))
+        else:
+            body = await reader.read()
+            keep_alive = False
+        return Response(url, status, reason[0] if reason else "", headers, body), keep_alive
+
+    def close(self):
+        while self._idle:
+            self._idle.pop().close()
+
+
+class ApiClient:
+    """Async client for the providers in the API integration registry.
+
+    Use it as an async context manager so pooled connections are closed::
+
+        async with ApiClient() as client:
+            response = await client.get("Khan Academy API", "/topic/math")
+    """
+
+    def __init__(self, max_concurrency=20, max_connections_per_host=10,
+                 retries=3, backoff=0.5, max_backoff=30.0, timeout=30.0, registry=None, cache=None):
+        self.max_connections_per_host = max_connections_per_host
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.cache = cache
+        self._registry = registry if registry is not None else get_api_by_name
+        self._concurrency = asyncio.Semaphore(max_concurrency)
+        self._pools = {}
+        self._buckets = {}
+        self._ssl_context = ssl.create_default_context()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        for pool in self._pools.values():
+            pool.close()
+        self._pools.clear()
+
+    # Look up a provider's registry entry, which must declare a base URL
+    def _provider(self, name):
+        api = self._registry(name)
+        if api is None:
+            raise ApiClientError(f"Unknown API provider: {name}")
+        if not api.get("base_url"):
+            raise ApiClientError(f"{name} has no HTTP endpoint to call")
+        return api
+
+    # Get the provider's rate limiter, or None when it declares no limit
+    def _bucket(self, api):
+        per_minute = api.get("requests_per_minute")
+        if not per_minute:
+            return None
+        bucket = self._buckets.get(api["name"])
+        if bucket is None:
+            bucket = self._buckets[api["name"]] = TokenBucket(per_minute / 60)
+        return bucket
+
+    def _pool(self, scheme, host, port):
+        key = (scheme, host, port)
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = self._pools[key] = ConnectionPool(
+                scheme, host, port, self.max_connections_per_host, self._ssl_context
+            )
+        return pool
+
+    # Wait before the next attempt, honouring Retry-After when the server sends it
+    def _delay(self, attempt, response=None):
+        if response is not None and response.headers.get("retry-after", "").isdigit():
+            return min(self.max_backoff, float(response.headers["retry-after"]))
+        return min(self.max_backoff, self.backoff * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+    # Build the full URL of a provider endpoint
+    def url(self, provider, path, params=None):
+        url = self._provider(provider)["base_url"].rstrip("/") + "/" + path.lstrip("/")
+        if params:
+            url += ("&" if "?" in url else "?") + urlencode(params, doseq=True)
+        return url
+
+    # Call a provider endpoint, retrying transient failures
+    async def request(self, provider, method, path, params=None, headers=None, body=None):
+        api = self._provider(provider)
+        url = self.url(provider, path, params)
+        parts = urlsplit(url)
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        target = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        pool = self._pool(parts.scheme, parts.hostname, port)
+        request_headers = {"User-Agent": USER_AGENT, "Accept": "application/json", "Connection": "keep-alive"}
+        request_headers.update(headers or {})
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body).encode("utf-8")
+            request_headers.setdefault("Content-Type", "application/json")
+
+        bucket = self._bucket(api)
+        attempt = 0
+        while True:
+            response = None
+            try:
+                if bucket is not None:
+                    await bucket.acquire()
+                async with self._concurrency:
+                    response = await asyncio.wait_for(
+                        pool.request(method, target, request_headers, body, url), self.timeout
+                    )
+                if response.ok or response.status not in RETRY_STATUSES:
+                    break
+            except _StaleConnection:
+                # A dead idle connection is not a real failure, so it is not counted
+                continue
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError) as error:
+                if attempt >= self.retries:
+                    raise ApiClientError(f"{method} {url} failed: {error!r}") from error
+            if attempt >= self.retries:
+                break
+            await asyncio.sleep(self._delay(attempt, response))
+            attempt += 1
+
+        if not response.ok:
+            raise HttpError(response)
+        return response
+
+    async def get(self, provider, path, params=None, headers=None):
+        if self.cache is not None:
+            return await self.cache.get(self, provider, path, params=params, headers=headers)
+        return await self.request(provider, "GET", path, params=params, headers=headers)
+
+    async def post(self, provider, path, body=None, params=None, headers=None):
+        return await self.request(provider, "POST", path, params=params, headers=headers, body=body)
+
+    # Fetch many paths from one provider concurrently. Failures are returned
+    # in place of their response when return_exceptions is set.
+    async def fetch_many(self, provider, paths, params=None, return_exceptions=False):
+        return await asyncio.gather(
+            *(self.get(provider, path, params=params) for path in paths),
+            return_exceptions=return_exceptions
+        )
@@ -2,6 +2,16 @@
 This module contains information about API integrations for the EduVerse platform.
 """
 
+import os
+from operator import itemgetter
+
+from aggregates import AggregateView
+from catalog_store import open_catalog
+from columnar import ColumnarTable
+from metrics import timed
+from search import tokenize
+from snapshot import load_catalog
+
 # Define API integration data
 api_integrations = [
     {
@@ -14,7 +24,9 @@ api_integrations = [
             "Map Khan Academy content to EduVerse learning objectives"
         ],
         "implementation_complexity": "Medium",
-        "documentation_url": "https://api-explorer.khanacademy.org/"
+        "documentation_url": "https://api-explorer.khanacademy.org/",
+        "base_url": "https://www.khanacademy.org/api/v1",
+        "requests_per_minute": 60
     },
     {
         "name": "Quizlet API",
@@ -26,7 +38,9 @@ api_integrations = [
             "Enable spaced repetition learning within the platform"
         ],
         "implementation_complexity": "Low",
-        "documentation_url": "https://quizlet.com/api/2.0/docs"
+        "documentation_url": "https://quizlet.com/api/2.0/docs",
+        "base_url": "https://api.quizlet.com/2.0",
+        "requests_per_minute": 60
     },
     {
         "name": "PhishTank API",
@@ -38,7 +52,9 @@ api_integrations = [
             "Train students to identify phishing patterns"
         ],
         "implementation_complexity": "Medium",
-        "documentation_url": "https://phishtank.org/api_info.php"
+        "documentation_url": "https://phishtank.org/api_info.php",
+        "base_url": "https://checkurl.phishtank.com",
+        "requests_per_minute": 30
     },
     {
         "name": "Google Safe Browsing API",
@@ -50,7 +66,9 @@ api_integrations = [
             "Build safe browsing simulations"
         ],
         "implementation_complexity": "Medium",
-        "documentation_url": "https://developers.google.com/safe-browsing"
+        "documentation_url": "https://developers.google.com/safe-browsing",
+        "base_url": "https://safebrowsing.googleapis.com/v4",
+        "requests_per_minute": 600
     },
     {
         "name": "VirusTotal API",
@@ -62,7 +80,9 @@ api_integrations = [
             "Compare detection rates across security vendors"
         ],
         "implementation_complexity": "High",
-        "documentation_url": "https://developers.virustotal.com/reference"
+        "documentation_url": "https://developers.virustotal.com/reference",
+        "base_url": "https://www.virustotal.com/api/v3",
+        "requests_per_minute": 4
     },
     {
         "name": "Blockly",
@@ -86,55 +106,117 @@ api_integrations = [
             "Build comparative analyses across educational institutions"
         ],
         "implementation_complexity": "High",
-        "documentation_url": "https://educationdata.urban.org/documentation/"
+        "documentation_url": "https://educationdata.urban.org/documentation/",
+        "base_url": "https://educationdata.urban.org/api/v1",
+        "requests_per_minute": 120
     }
 ]
 
+# Column layout used when the catalog is kept in compact columnar form
+API_COLUMNS = {
+    "name": "text",
+    "category": "category",
+    "description": "text",
+    "use_cases": "list",
+    "implementation_complexity": "category",
+    "documentation_url": "text",
+    "base_url": "text",
+    "requests_per_minute": "value"
+}
+
+# Store the APIs column by column when EDUVERSE_COMPACT_CATALOG is set
+if os.environ.get("EDUVERSE_COMPACT_CATALOG"):
+    api_integrations = ColumnarTable(api_integrations, API_COLUMNS)
+
+# Implementation complexity levels, in the order they are charted
+COMPLEXITY_LEVELS = ["Low", "Medium", "High"]
+
+# Build the aggregate views kept up to date by the API catalog
+def api_views():
+    return {"complexity": AggregateView(itemgetter("implementation_complexity"), COMPLEXITY_LEVELS)}
+
+# Get the keywords of an API's use cases
+def use_case_keywords(api):
+    return tokenize(" ".join(api.get("use_cases", ())))
+
+# Get the category of an API as a facet value
+def category_facet(api):
+    return [api["category"]]
+
+# Get the implementation complexity of an API as a facet value
+def complexity_facet(api):
+    return [api["implementation_complexity"]]
+
+# Build the facets that API filters can combine
+def api_facets():
+    return {
+        "category": category_facet,
+        "complexity": complexity_facet,
+        "use_case": use_case_keywords
+    }
+
+# Build the name and category indexes once at import time, or load them
+# prebuilt from the catalog snapshot when it is up to date (see snapshot.py).
+# When EDUVERSE_APIS_STORE points at a .jsonl or SQLite file the catalog is
+# served from that file instead, and the records above are only used to seed
+# a new one.
+apis_store = os.environ.get("EDUVERSE_APIS_STORE")
+api_catalog = None if apis_store else load_catalog("apis")
+if api_catalog is None:
+    api_catalog = open_catalog(apis_store, api_integrations, api_views(), api_facets())
+
 # Get all API categories
+@timed("accessor")
 def get_all_api_categories():
-    categories = set()
-    for api in api_integrations:
-        categories.add(api["category"])
-    return sorted(list(categories))
+    return api_catalog.categories()
 
 # Get APIs by category
+@timed("accessor")
 def get_apis_by_category(category):
-    return [api for api in api_integrations if api["category"] == category]
+    return api_catalog.get_by_category(category)
+
+# Get one page of APIs in a category
+@timed("accessor")
+def get_apis_page(category, cursor=0, page_size=20):
+    return api_catalog.get_page(category, cursor, page_size)
 
 # Get API by name
+@timed("accessor")
 def get_api_by_name(name):
-    for api in api_integrations:
-        if api["name"] == name:
-            return api
-    return None
+    return api_catalog.get_by_name(name)
 
 # Get API distribution by category
+@timed("accessor")
 def get_api_distribution():
-    categories = {}
-    for api in api_integrations:
-        category = api["category"]
-        if category in categories:
-            categories[category] += 1
-        else:
-            categories[category] = 1
-    
-    return {
-        "categories": list(categories.keys()),
-        "counts": list(categories.values())
-    }
+    return api_catalog.distribution()
 
 # Get all API names
+@timed("accessor")
 def get_all_api_names():
-    return [api["name"] for api in api_integrations]
+    return api_catalog.names()
+
+# Get one page of the APIs matching a facet filter, built with facets.where
+# and combined with &, | and ~
+@timed("accessor")
+def filter_apis(expression, cursor=0, page_size=20):
+    return api_catalog.filter(expression, cursor, page_size)
+
+# Count the APIs matching a facet filter per category, complexity and use-case
+# keyword, or only for the named facets
+@timed("accessor")
+def get_api_facet_counts(expression, names=None):
+    return api_catalog.facet_counts(expression, names)
+
+# Search APIs by name, description and use cases
+@timed("accessor")
+def search_apis(query, limit=10):
+    return api_catalog.search(query, limit)
 
 # Get complexity distribution
+@timed("accessor")
 def get_complexity_distribution():
-    complexity_counts = {"Low": 0, "Medium": 0, "High": 0}
-    for api in api_integrations:
-        complexity = api["implementation_complexity"]
-        complexity_counts[complexity] += 1
-    
+    snapshot = api_catalog.aggregate("complexity")
     return {
-        "complexities": list(complexity_counts.keys()),
-        "counts": list(complexity_counts.values())
+        "complexities": snapshot["buckets"],
+        "counts": snapshot["counts"]
     }
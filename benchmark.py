@@ -0,0 +1,211 @@
+"""
+This module contains the benchmark suite for the catalog accessors and the
+dashboard sections.
+
+Run the suite and save the results:
+
+    python benchmark.py run --sizes 1000 100000 1000000 --output results.json
+
+Compare a run against a saved baseline, exiting non-zero on regressions:
+
+    python benchmark.py compare baseline.json results.json --threshold 0.2
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+
+import api_integrations
+import modules_data
+import similarity
+import synthetic_catalog
+from facets import Facet, where
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "streamlit_app.py")
+SECTIONS = ["Overview", "Performance", "Module Explorer", "API Integrations"]
+
+
+# Time repeated calls of fn, stopping after min_time seconds or max_calls calls
+def time_calls(fn, min_time=0.2, max_calls=1000):
+    fn()
+    samples = []
+    started = time.perf_counter()
+    while len(samples) < max_calls and (not samples or time.perf_counter() - started < min_time):
+        call_started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - call_started)
+    return summarize(samples)
+
+
+# Reduce timing samples to the statistics stored in a results file
+def summarize(samples):
+    ordered = sorted(samples)
+    return {
+        "calls": len(ordered),
+        "min_s": ordered[0],
+        "median_s": statistics.median(ordered),
+        "p95_s": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+    }
+
+
+# Build the accessor calls to time against the currently installed catalogs
+def accessor_calls():
+    module_category = modules_data.get_all_categories()[0]
+    module_names = modules_data.get_all_module_names()
+    module_name = module_names[len(module_names) // 2]
+    api_category = api_integrations.get_all_api_categories()[0]
+    api_names = api_integrations.get_all_api_names()
+    api_name = api_names[len(api_names) // 2]
+    # Two facets ANDed together with an excluded keyword
+    module_filter = where(category=[module_category], age_bucket=["High school"]) & ~Facet("feature", "interactive")
+    api_filter = where(category=[api_category], complexity=["Low", "Medium"])
+    return {
+        "modules_data.get_module_distribution": modules_data.get_module_distribution,
+        "modules_data.get_modules_by_category": lambda: modules_data.get_modules_by_category(module_category),
+        "modules_data.get_modules_page": lambda: modules_data.get_modules_page(module_category),
+        "modules_data.get_module_by_name": lambda: modules_data.get_module_by_name(module_name),
+        "modules_data.get_modules_for_age": lambda: modules_data.get_modules_for_age(11),
+        "modules_data.get_modules_for_ages": lambda: modules_data.get_modules_for_ages(13, 16),
+        "modules_data.get_all_categories": modules_data.get_all_categories,
+        "modules_data.get_all_module_names": modules_data.get_all_module_names,
+        "modules_data.search_modules": lambda: modules_data.search_modules("interactive lea"),
+        "modules_data.filter_modules": lambda: modules_data.filter_modules(module_filter),
+        "modules_data.get_module_facet_counts": lambda: modules_data.get_module_facet_counts(module_filter),
+        "api_integrations.get_all_api_categories": api_integrations.get_all_api_categories,
+        "api_integrations.get_apis_by_category": lambda: api_integrations.get_apis_by_category(api_category),
+        "api_integrations.get_apis_page": lambda: api_integrations.get_apis_page(api_category),
+        "api_integrations.get_api_by_name": lambda: api_integrations.get_api_by_name(api_name),
+        "api_integrations.get_api_distribution": api_integrations.get_api_distribution,
+        "api_integrations.get_all_api_names": api_integrations.get_all_api_names,
+        "api_integrations.search_apis": lambda: api_integrations.search_apis("phishing sim"),
+        "api_integrations.filter_apis": lambda: api_integrations.filter_apis(api_filter),
+        "api_integrations.get_complexity_distribution": api_integrations.get_complexity_distribution,
+        "similarity.get_similar_modules": lambda: similarity.get_similar_modules(module_name),
+        "similarity.get_suggested_apis": lambda: similarity.get_suggested_apis(module_name),
+        "similarity.get_related_modules": lambda: similarity.get_related_modules(api_name),
+        "similarity.get_similar_apis": lambda: similarity.get_similar_apis(api_name),
+    }
+
+
+# Run the app once, failing if the section raised, so a crash is never
+# timed as a render
+def checked_run(app, section):
+    app.run()
+    if app.exception:
+        raise RuntimeError(f"{section} raised: {app.exception[0].value}")
+    return app
+
+
+# Time full reruns of each dashboard section with Streamlit's headless AppTest
+def time_reruns(reruns):
+    from streamlit.testing.v1 import AppTest
+
+    # The app loads its logo relative to the working directory
+    os.chdir(os.path.dirname(APP_PATH))
+    results = {}
+    for section in SECTIONS:
+        app = checked_run(AppTest.from_file(APP_PATH, default_timeout=600), SECTIONS[0])
+        app.sidebar.radio[0].set_value(section)
+        started = time.perf_counter()
+        checked_run(app, section)
+        first = time.perf_counter() - started
+        samples = []
+        for _ in range(reruns):
+            started = time.perf_counter()
+            checked_run(app, section)
+            samples.append(time.perf_counter() - started)
+        result = summarize(samples)
+        result["first_run_s"] = first
+        results[f"streamlit_app.{section}"] = result
+    return results
+
+
+def run(args):
+    results = {}
+    for size in args.sizes:
+        print(f"Generating synthetic catalog with {size} entries", file=sys.stderr)
+        started = time.perf_counter()
+        synthetic_catalog.install(size)
+        results[f"{size}/synthetic_catalog.install"] = summarize([time.perf_counter() - started])
+        for name, fn in accessor_calls().items():
+            results[f"{size}/{name}"] = time_calls(fn, args.min_time)
+        if args.reruns:
+            for name, result in time_reruns(args.reruns).items():
+                results[f"{size}/{name}"] = result
+
+    report = {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sizes": args.sizes,
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, indent=2)
+    for name, result in results.items():
+        print(f"{name:70s} {result['median_s'] * 1000:12.3f} ms")
+    print(f"Saved results to {args.output}", file=sys.stderr)
+
+
+def compare(args):
+    with open(args.baseline, encoding="utf-8") as handle:
+        baseline = json.load(handle)["results"]
+    with open(args.current, encoding="utf-8") as handle:
+        current = json.load(handle)["results"]
+
+    regressions = 0
+    for name in sorted(set(baseline) & set(current)):
+        before = baseline[name]["median_s"]
+        after = current[name]["median_s"]
+        ratio = after / before if before else float("inf")
+        flag = ""
+        # Ignore differences below the timer noise floor
+        if ratio > 1 + args.threshold and after - before > args.min_delta:
+            flag = "REGRESSION"
+            regressions += 1
+        elif ratio < 1 - args.threshold:
+            flag = "improved"
+        print(f"{name:70s} {before * 1000:10.3f} -> {after * 1000:10.3f} ms  x{ratio:6.2f}  {flag}")
+    for name in sorted(set(baseline) - set(current)):
+        print(f"{name:70s} missing from current run")
+    print(f"{regressions} regression(s) above {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark EduVerse catalog accessors and dashboard reruns.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the benchmarks and save the results as JSON")
+    run_parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000],
+                            help="synthetic catalog sizes to benchmark")
+    run_parser.add_argument("--reruns", type=int, default=5,
+                            help="timed reruns per dashboard section (0 to skip AppTest)")
+    run_parser.add_argument("--min-time", type=float, default=0.2,
+                            help="minimum seconds spent timing each accessor")
+    run_parser.add_argument("--output", default="benchmark_results.json")
+
+    compare_parser = commands.add_parser("compare", help="flag regressions against a saved baseline")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.2,
+                                help="relative slowdown that counts as a regression")
+    compare_parser.add_argument("--min-delta", type=float, default=1e-6,
+                                help="absolute slowdown in seconds below which changes are ignored")
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        run(args)
+        return 0
+    return compare(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
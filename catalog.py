@@ -0,0 +1,239 @@
+"""
+This module contains the indexed in-memory catalog used to look up EduVerse
+modules and API integrations.
+"""
+
+import hashlib
+import json
+from bisect import bisect_left, insort
+from itertools import islice
+from operator import itemgetter
+
+from age_index import AgeIndex
+from aggregates import AggregateView
+from facets import FacetIndex, set_positions
+from search import SearchIndex
+
+
+# Describe one window of a paged listing
+def make_page(records, total, cursor):
+    next_cursor = cursor + len(records)
+    return {
+        "records": records,
+        "total": total,
+        "cursor": cursor,
+        "next_cursor": next_cursor if next_cursor < total else None
+    }
+
+
+class Catalog:
+    """Hash-indexed view over a list of catalog records.
+
+    Records are plain dicts with at least a ``name`` and a ``category`` key.
+    The name and category indexes are built once, so lookups cost O(1) and
+    category listings cost O(k) in the size of the result.
+
+    ``version`` is a hash of the catalog content. It changes whenever a record
+    is added, removed or updated, so it can be used as a cache key for
+    anything derived from the catalog.
+
+    ``views`` maps names to ``AggregateView`` objects that are kept up to date
+    on every change. A ``category`` view is always present.
+
+    The slots of records with an ``age_range`` are kept in an ``AgeIndex`` so
+    they can be queried by age in logarithmic time, alone or together with
+    a facet filter.
+
+    ``facets`` maps facet names to functions returning a record's values for
+    that facet. They are kept in a ``FacetIndex`` so filters combining
+    several facets are answered with bitwise operations.
+
+    The full-text search index is built on first use and then kept up to
+    date as records are added. Removing or updating a record drops it, and
+    it is rebuilt on the next search.
+    """
+
+    def __init__(self, records=(), views=None, facets=None):
+        self.views = {"category": AggregateView(itemgetter("category"))}
+        self.views.update(views or {})
+        # Records are keyed by slot, an increasing number, so the dict keeps
+        # catalog order and a record can be removed without shifting others
+        self._records = {}
+        self._next_slot = 0
+        self._names = []
+        self._by_name = {}
+        self._by_category = {}
+        self._sorted_categories = []
+        self.age_index = AgeIndex()
+        self.facet_index = FacetIndex(facets or {})
+        self._version = None
+        self._search_index = None
+        for record in records:
+            self.add(record)
+
+    def __len__(self):
+        return len(self._records)
+
+    def __iter__(self):
+        return iter(self._records.values())
+
+    @property
+    def version(self):
+        if self._version is None:
+            digest = hashlib.sha256()
+            for record in self._records.values():
+                # default=dict serializes columnar row views like plain dicts
+                digest.update(json.dumps(record, sort_keys=True, default=dict).encode("utf-8"))
+            self._version = digest.hexdigest()[:16]
+        return self._version
+
+    @property
+    def search_index(self):
+        if self._search_index is None:
+            self._search_index = SearchIndex(self._records.values())
+        return self._search_index
+
+    # Add a record to the name and category indexes and the views
+    def _index(self, slot, record):
+        self._records[slot] = record
+        # The first record with a given name wins, as with the old linear scan
+        insort(self._by_name.setdefault(record["name"], []), slot)
+        category = record["category"]
+        if category not in self._by_category:
+            self._by_category[category] = {}
+            insort(self._sorted_categories, category)
+        self._by_category[category][slot] = record
+        self.age_index.add(slot, record)
+        self.facet_index.add(slot, record)
+        for view in self.views.values():
+            view.add(record)
+
+    # Take a record out of the name and category indexes and the views.
+    # With keep_category its category entry stays, for _index to overwrite in
+    # place.
+    def _unindex(self, slot, record, keep_category=False):
+        slots = self._by_name[record["name"]]
+        slots.remove(slot)
+        if not slots:
+            del self._by_name[record["name"]]
+        if not keep_category:
+            category = record["category"]
+            members = self._by_category[category]
+            del members[slot]
+            if not members:
+                del self._by_category[category]
+                del self._sorted_categories[bisect_left(self._sorted_categories, category)]
+        self.age_index.remove(slot, record)
+        self.facet_index.remove(slot, record)
+        for view in self.views.values():
+            view.remove(record)
+
+    # Find the slot of the record a name lookup would return
+    def _slot(self, name):
+        slots = self._by_name.get(name)
+        if not slots:
+            raise KeyError(name)
+        return slots[0]
+
+    # Index a new record
+    def add(self, record):
+        self._version = None
+        slot = self._next_slot
+        self._next_slot += 1
+        self._index(slot, record)
+        if self._names is not None:
+            self._names.append(record["name"])
+        if self._search_index is not None:
+            self._search_index.add(record)
+
+    # Remove the record with the given name
+    def remove(self, name):
+        slot = self._slot(name)
+        record = self._records.pop(slot)
+        self._unindex(slot, record)
+        self._version = None
+        self._names = None
+        self._search_index = None
+        return record
+
+    # Replace fields of the record with the given name, keeping its position.
+    # Changing "category" moves the record to the end of its new category.
+    def update(self, name, **changes):
+        slot = self._slot(name)
+        old = self._records[slot]
+        record = {**old, **changes}
+        # Reassigning an existing dict key keeps its position in the category
+        self._unindex(slot, old, keep_category=record["category"] == old["category"])
+        self._index(slot, record)
+        self._version = None
+        self._names = None
+        self._search_index = None
+        return record
+
+    # Get record by name
+    def get_by_name(self, name):
+        slots = self._by_name.get(name)
+        return self._records[slots[0]] if slots else None
+
+    # Get records by category
+    def get_by_category(self, category):
+        return list(self._by_category.get(category, {}).values())
+
+    # Get records whose age range overlaps youngest..oldest, or covers
+    # youngest when oldest is not given
+    def get_by_age(self, youngest, oldest=None):
+        return [self._records[slot] for slot in self.age_index.slots(youngest, oldest)]
+
+    # Get one page of records in a category, starting at the cursor offset
+    def get_page(self, category, cursor=0, page_size=20):
+        records = self._by_category.get(category, {})
+        window = list(islice(records.values(), cursor, cursor + page_size))
+        return make_page(window, len(records), cursor)
+
+    # Get one page of the records matching a facet filter
+    def filter(self, expression, cursor=0, page_size=20):
+        bits = self.facet_index.select(expression)
+        slots = set_positions(bits, cursor, page_size)
+        return make_page([self._records[slot] for slot in slots], bits.bit_count(), cursor)
+
+    # Get one page of the records matching a facet filter whose age range
+    # overlaps youngest..oldest, or covers youngest when oldest is not given
+    def filter_by_age(self, expression, youngest, oldest=None, cursor=0, page_size=20):
+        bits = self.facet_index.select(expression) & self.age_index.bits(youngest, oldest)
+        slots = set_positions(bits, cursor, page_size)
+        return make_page([self._records[slot] for slot in slots], bits.bit_count(), cursor)
+
+    # Count the records matching a facet filter per facet value, for the
+    # named facets or all of them
+    def facet_counts(self, expression, names=None):
+        return self.facet_index.counts(self.facet_index.select(expression), names)
+
+    # Get all categories, sorted
+    def categories(self):
+        return list(self._sorted_categories)
+
+    # Get all record names in catalog order
+    def names(self):
+        if self._names is None:
+            self._names = [record["name"] for record in self._records.values()]
+        return list(self._names)
+
+    # Get a snapshot of one of the aggregate views
+    def aggregate(self, view):
+        return self.views[view].snapshot()
+
+    # Get category counts in order of first appearance
+    def distribution(self):
+        snapshot = self.aggregate("category")
+        return {
+            "categories": snapshot["buckets"],
+            "counts": snapshot["counts"]
+        }
+
+    # Rank records against a free-text query
+    def search(self, query, limit=10):
+        return self.search_index.search(query, limit)
+
+    # Complete a partially typed name
+    def suggest(self, prefix, limit=10):
+        return self.search_index.suggest(prefix, limit)
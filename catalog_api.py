@@ -0,0 +1,297 @@
+"""
+This module contains the read-only HTTP API that serves the module and API
+integration catalogs as JSON to other services.
+
+It is a plain ASGI application, so any ASGI server can run it:
+
+    uvicorn catalog_api:app --workers 4
+    python catalog_api.py --port 8000 --workers 4
+
+Endpoints, all GET (or HEAD):
+
+    /modules/names                      /apis/names
+    /modules/categories                 /apis/categories
+    /modules/distribution               /apis/distribution
+    /modules/age-distribution           /apis/complexity-distribution
+    /modules/by-name/<name>             /apis/by-name/<name>
+    /modules/by-category/<category>     /apis/by-category/<category>
+        ?cursor=0&page_size=20
+    /modules/search?q=...&limit=10      /apis/search?q=...&limit=10
+    /version
+
+Serialized responses are cached per catalog version: the fixed listings are
+built as soon as a version is first seen, and lookups and searches are kept
+after their first request. Every response carries an ETag so clients can
+revalidate with If-None-Match, and bodies are gzipped once when the client
+accepts it. Responses always have a Content-Length, so the server can keep
+connections alive between requests.
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import sys
+from urllib.parse import parse_qs
+
+import api_integrations
+import modules_data
+
+# Bodies smaller than this are sent uncompressed
+MIN_GZIP_SIZE = 512
+
+# Lookups and searches cached per catalog version, oldest dropped first
+MAX_CACHED_RESPONSES = 20000
+
+MAX_PAGE_SIZE = 500
+MAX_SEARCH_LIMIT = 100
+
+
+class BadRequest(Exception):
+    """Raised for a request with missing or malformed parameters."""
+
+
+class PreparedResponse:
+    """A serialized JSON body with its ETag and, once needed, its gzip form."""
+
+    __slots__ = ("status", "body", "etag", "_gzipped")
+
+    def __init__(self, status, payload):
+        self.status = status
+        self.body = json.dumps(payload, separators=(",", ":"), default=dict).encode("utf-8")
+        self.etag = '"%s"' % hashlib.blake2b(self.body, digest_size=12).hexdigest()
+        self._gzipped = None
+
+    @property
+    def gzipped(self):
+        if self._gzipped is None:
+            self._gzipped = gzip.compress(self.body, compresslevel=6, mtime=0)
+        return self._gzipped
+
+
+# Read an integer query parameter within bounds
+def int_param(params, name, default, minimum, maximum):
+    values = params.get(name)
+    if not values:
+        return default
+    try:
+        value = int(values[0])
+    except ValueError:
+        raise BadRequest(f"{name} must be an integer") from None
+    if not minimum <= value <= maximum:
+        raise BadRequest(f"{name} must be between {minimum} and {maximum}")
+    return value
+
+
+# Read a required text query parameter
+def text_param(params, name):
+    values = params.get(name)
+    if not values or not values[0].strip():
+        raise BadRequest(f"{name} is required")
+    return values[0]
+
+
+class Collection:
+    """The endpoints of one catalog and its per-version response cache.
+
+    ``source`` is the data module and ``catalog_attribute`` the name of its
+    catalog, looked up on every request so a catalog swapped in later (for
+    example by synthetic_catalog.install) is served from then on.
+    """
+
+    def __init__(self, source, catalog_attribute, fixed, lookups):
+        self.source = source
+        self.catalog_attribute = catalog_attribute
+        self.fixed = fixed
+        self.lookups = lookups
+        self._version = None
+        self._responses = {}
+
+    @property
+    def version(self):
+        return getattr(self.source, self.catalog_attribute).version
+
+    # Drop every cached response once the catalog has a new version, and
+    # serialize the fixed listings for the new one
+    def refresh(self):
+        version = self.version
+        if version != self._version:
+            responses = {}
+            for endpoint, fn in self.fixed.items():
+                responses[(endpoint, None, ())] = PreparedResponse(200, fn())
+            self._responses = responses
+            self._version = version
+
+    # Get the response for an endpoint, an optional path argument and the
+    # query parameters
+    def respond(self, endpoint, argument, params):
+        self.refresh()
+        if endpoint in self.fixed:
+            if argument is not None:
+                return None
+            return self._responses[(endpoint, None, ())]
+        handler = self.lookups.get(endpoint)
+        if handler is None:
+            return None
+        key = (endpoint, argument, tuple(sorted((name, values[0]) for name, values in params.items())))
+        response = self._responses.get(key)
+        if response is None:
+            try:
+                response = handler(argument, params)
+            except BadRequest as error:
+                return PreparedResponse(400, {"error": str(error)})
+            if len(self._responses) >= MAX_CACHED_RESPONSES:
+                del self._responses[next(iter(self._responses))]
+            self._responses[key] = response
+        return response
+
+
+# Wrap a lookup result, answering 404 when there is nothing to return
+def found(record, what):
+    if record is None:
+        return PreparedResponse(404, {"error": f"No {what} with that name"})
+    return PreparedResponse(200, record)
+
+
+# Build the endpoints that take a path argument or query parameters
+def lookups(get_by_name, get_page, search, what):
+    def by_name(name, params):
+        if name is None:
+            raise BadRequest("a name is required")
+        return found(get_by_name(name), what)
+
+    def by_category(category, params):
+        if category is None:
+            raise BadRequest("a category is required")
+        cursor = int_param(params, "cursor", 0, 0, sys.maxsize)
+        page_size = int_param(params, "page_size", 20, 1, MAX_PAGE_SIZE)
+        return PreparedResponse(200, get_page(category, cursor, page_size))
+
+    def search_endpoint(argument, params):
+        query = text_param(params, "q")
+        limit = int_param(params, "limit", 10, 1, MAX_SEARCH_LIMIT)
+        return PreparedResponse(200, search(query, limit))
+
+    return {"by-name": by_name, "by-category": by_category, "search": search_endpoint}
+
+
+COLLECTIONS = {
+    "modules": Collection(
+        modules_data, "module_catalog",
+        fixed={
+            "names": modules_data.get_all_module_names,
+            "categories": modules_data.get_all_categories,
+            "distribution": modules_data.get_module_distribution,
+            "age-distribution": modules_data.get_age_distribution,
+        },
+        lookups=lookups(modules_data.get_module_by_name, modules_data.get_modules_page,
+                        modules_data.search_modules, "module")
+    ),
+    "apis": Collection(
+        api_integrations, "api_catalog",
+        fixed={
+            "names": api_integrations.get_all_api_names,
+            "categories": api_integrations.get_all_api_categories,
+            "distribution": api_integrations.get_api_distribution,
+            "complexity-distribution": api_integrations.get_complexity_distribution,
+        },
+        lookups=lookups(api_integrations.get_api_by_name, api_integrations.get_apis_page,
+                        api_integrations.search_apis, "API")
+    ),
+}
+
+NOT_FOUND = PreparedResponse(404, {"error": "Not found"})
+METHOD_NOT_ALLOWED = PreparedResponse(405, {"error": "Only GET and HEAD are supported"})
+
+
+# Find the response for a request path and query string
+def route(path, query_string):
+    parts = path.strip("/").split("/", 2)
+    if parts == ["version"]:
+        return PreparedResponse(200, {name: collection.version for name, collection in COLLECTIONS.items()})
+    collection = COLLECTIONS.get(parts[0])
+    if collection is None or len(parts) < 2:
+        return NOT_FOUND
+    # ASGI servers pass the path already percent-decoded
+    argument = parts[2] if len(parts) == 3 else None
+    params = parse_qs(query_string.decode("latin-1"))
+    return collection.respond(parts[1], argument, params) or NOT_FOUND
+
+
+# Check whether any ETag in an If-None-Match header matches
+def etag_matches(header, etag):
+    if header.strip() == "*":
+        return True
+    # The gzip variant's ETag has a -gz suffix before the closing quote
+    candidates = {tag.strip().removeprefix("W/").replace('-gz"', '"') for tag in header.split(",")}
+    return etag in candidates
+
+
+async def send_response(send, status, headers, body):
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            # Serialize the fixed listings before the first request
+            for collection in COLLECTIONS.values():
+                collection.refresh()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+
+    method = scope["method"]
+    response = route(scope["path"], scope["query_string"]) if method in ("GET", "HEAD") else METHOD_NOT_ALLOWED
+    request_headers = dict(scope["headers"])
+    accepts_gzip = b"gzip" in request_headers.get(b"accept-encoding", b"")
+    compress = accepts_gzip and len(response.body) >= MIN_GZIP_SIZE
+    etag = response.etag[:-1] + '-gz"' if compress else response.etag
+
+    headers = [
+        (b"content-type", b"application/json"),
+        (b"etag", etag.encode("ascii")),
+        (b"cache-control", b"no-cache"),
+        (b"vary", b"Accept-Encoding"),
+    ]
+    if_none_match = request_headers.get(b"if-none-match")
+    if response.status == 200 and if_none_match and etag_matches(if_none_match.decode("latin-1"), response.etag):
+        await send_response(send, 304, headers, b"")
+        return
+
+    body = response.gzipped if compress else response.body
+    if compress:
+        headers.append((b"content-encoding", b"gzip"))
+    headers.append((b"content-length", str(len(body)).encode("ascii")))
+    await send_response(send, response.status, headers, b"" if method == "HEAD" else body)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the EduVerse catalogs as a read-only JSON API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    try:
+        import uvicorn
+    except ImportError:
+        parser.error("uvicorn is required to serve the API (pip install -e '.[api]')")
+    uvicorn.run("catalog_api:app", host=args.host, port=args.port, workers=args.workers,
+                access_log=False, log_level="warning")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+"""
+This module load-tests the catalog HTTP API in catalog_api.py.
+
+It opens a number of keep-alive connections, sends requests over them
+back to back for a fixed time, and reports throughput and latency
+percentiles. Without --url it starts the API itself with uvicorn on a free
+local port:
+
+    python catalog_api_loadtest.py
+    python catalog_api_loadtest.py --connections 64 --duration 20 --workers 4
+    python catalog_api_loadtest.py --url http://127.0.0.1:8000 --gzip --revalidate
+
+The client is single-threaded asyncio, so on one machine it may saturate
+before the server does; compare runs with the same client settings.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from itertools import cycle
+from urllib.parse import quote, urlsplit
+
+from api_client import ConnectionPool
+from rerun_report import free_port
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+# Start the API with uvicorn and wait until it answers
+def start_server(port, workers):
+    server = subprocess.Popen(
+        [sys.executable, "catalog_api.py", "--port", str(port), "--workers", str(workers)],
+        cwd=APP_DIR
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("Catalog API exited before answering (is uvicorn installed? pip install -e '.[api]')")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/version"):
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("Catalog API did not start")
+
+
+# Build a request mix covering every kind of endpoint
+def request_paths(base_url):
+    with urllib.request.urlopen(f"{base_url}/modules/names") as response:
+        module_names = json.load(response)
+    with urllib.request.urlopen(f"{base_url}/apis/categories") as response:
+        api_categories = json.load(response)
+    paths = ["/modules/distribution", "/apis/complexity-distribution", "/modules/categories"]
+    paths += [f"/modules/by-name/{quote(name)}" for name in module_names[:20]]
+    paths += [f"/apis/by-category/{quote(category)}" for category in api_categories]
+    paths += ["/modules/search?q=interactive", "/apis/search?q=phishing+simulation", "/modules/search?q=math"]
+    return paths
+
+
+# Send requests over one connection until the deadline, recording latencies
+async def worker(pool, host, paths, deadline, headers, revalidate, latencies, statuses):
+    etags = {}
+    for path in paths:
+        if time.perf_counter() >= deadline:
+            return
+        request_headers = dict(headers)
+        if revalidate and path in etags:
+            request_headers["If-None-Match"] = etags[path]
+        started = time.perf_counter()
+        response = await pool.request("GET", path, request_headers, None, f"http://{host}{path}")
+        latencies.append(time.perf_counter() - started)
+        statuses[response.status] = statuses.get(response.status, 0) + 1
+        if "etag" in response.headers:
+            etags[path] = response.headers["etag"]
+
+
+async def run_load(base_url, paths, connections, duration, gzip, revalidate):
+    parts = urlsplit(base_url)
+    pool = ConnectionPool(parts.scheme, parts.hostname, parts.port or 80, max_connections=connections)
+    headers = {"Accept-Encoding": "gzip"} if gzip else {}
+    latencies = []
+    statuses = {}
+    started = time.perf_counter()
+    deadline = started + duration
+    try:
+        await asyncio.gather(*(
+            # Each worker starts at a different point in the mix
+            worker(pool, parts.netloc, cycle(paths[offset % len(paths):] + paths[:offset % len(paths)]),
+                   deadline, headers, revalidate, latencies, statuses)
+            for offset in range(connections)
+        ))
+    finally:
+        pool.close()
+    return latencies, statuses, time.perf_counter() - started
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the catalog HTTP API.")
+    parser.add_argument("--url", help="API to test; started locally with uvicorn when omitted")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers when starting the API")
+    parser.add_argument("--connections", type=int, default=32, help="concurrent keep-alive connections")
+    parser.add_argument("--duration", type=float, default=10, help="seconds to send requests for")
+    parser.add_argument("--gzip", action="store_true", help="accept gzip-encoded responses")
+    parser.add_argument("--revalidate", action="store_true",
+                        help="send If-None-Match with the last ETag seen for each path")
+    parser.add_argument("--json", help="also write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    server = None
+    base_url = args.url
+    if base_url is None:
+        port = free_port()
+        server = start_server(port, args.workers)
+        base_url = f"http://127.0.0.1:{port}"
+    try:
+        paths = request_paths(base_url.rstrip("/"))
+        # A short warm-up fills the server's response caches
+        asyncio.run(run_load(base_url, paths, args.connections, 1, args.gzip, args.revalidate))
+        latencies, statuses, elapsed = asyncio.run(
+            run_load(base_url, paths, args.connections, args.duration, args.gzip, args.revalidate)
+        )
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    ordered = sorted(latencies)
+    report = {
+        "requests": len(ordered),
+        "throughput_rps": len(ordered) / elapsed,
+        "p50_ms": statistics.median(ordered) * 1000,
+        "p99_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000,
+        "max_ms": ordered[-1] * 1000,
+        "statuses": statuses,
+    }
+    print(f"{report['requests']} requests in {elapsed:.1f}s over {args.connections} connections")
+    print(f"throughput {report['throughput_rps']:10.0f} req/s")
+    print(f"p50        {report['p50_ms']:10.2f} ms")
+    print(f"p99        {report['p99_ms']:10.2f} ms")
+    print("statuses   " + ", ".join(f"{status}: {count}" for status, count in sorted(statuses.items())))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
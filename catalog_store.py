@@ -0,0 +1,369 @@
+"""
+This module contains the persistent storage backends for the EduVerse
+catalogs.
+
+A store answers the same queries as an in-memory ``Catalog`` but reads its
+records from a JSON-lines or SQLite file. Records are streamed from disk
+rather than loaded up front, and the store reloads itself when the file's
+modification time changes.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from operator import itemgetter
+
+from age_index import AgeIndex
+from aggregates import AggregateView
+from catalog import Catalog, make_page
+from facets import FacetIndex, set_positions
+from search import SearchIndex
+
+
+class CatalogStore:
+    """Base class for file-backed catalogs.
+
+    Subclasses implement ``_load`` (called whenever the file changes) and the
+    query methods. Every public query first checks the file's mtime so edits
+    on disk are picked up without a restart. Aggregate views, the age index
+    and the facet index are refilled by streaming the records once per
+    reload; the indexes keep positions, not records. Subclasses also
+    implement ``_fetch`` to read records by position for age queries and
+    facet filters.
+    """
+
+    def __init__(self, path, views=None, facets=None):
+        self.path = path
+        self.views = {"category": AggregateView(itemgetter("category"))}
+        self.views.update(views or {})
+        self.age_index = AgeIndex()
+        self.facet_index = FacetIndex(facets or {})
+        self._stamp = None
+        self._version = None
+        self._search_index = None
+        self._lock = threading.Lock()
+        self._refresh()
+
+    # Reload the store if the backing file changed since the last query
+    def _refresh(self):
+        stat = os.stat(self.path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if stamp == self._stamp:
+            return
+        with self._lock:
+            if stamp == self._stamp:
+                return
+            self._search_index = None
+            self._load(stamp)
+            for view in self.views.values():
+                view.reset()
+            self.age_index.reset()
+            self.facet_index.reset()
+            for position, record in enumerate(self._iter_records()):
+                for view in self.views.values():
+                    view.add(record)
+                self.age_index.add(position, record)
+                self.facet_index.add(position, record)
+            self._stamp = stamp
+
+    def _load(self, stamp):
+        raise NotImplementedError
+
+    def __len__(self):
+        self._refresh()
+        return self._count()
+
+    def __iter__(self):
+        self._refresh()
+        return self._iter_records()
+
+    @property
+    def version(self):
+        self._refresh()
+        return self._version
+
+    @property
+    def search_index(self):
+        self._refresh()
+        index = self._search_index
+        if index is None:
+            index = self._search_index = SearchIndex(self._iter_records())
+        return index
+
+    # Get a snapshot of one of the aggregate views
+    def aggregate(self, view):
+        self._refresh()
+        return self.views[view].snapshot()
+
+    # Get records whose age range overlaps youngest..oldest, or covers
+    # youngest when oldest is not given
+    def get_by_age(self, youngest, oldest=None):
+        self._refresh()
+        return self._fetch(self.age_index.slots(youngest, oldest))
+
+    # Get one page of the records matching a facet filter
+    def filter(self, expression, cursor=0, page_size=20):
+        self._refresh()
+        bits = self.facet_index.select(expression)
+        records = self._fetch(set_positions(bits, cursor, page_size))
+        return make_page(records, bits.bit_count(), cursor)
+
+    # Get one page of the records matching a facet filter whose age range
+    # overlaps youngest..oldest, or covers youngest when oldest is not given
+    def filter_by_age(self, expression, youngest, oldest=None, cursor=0, page_size=20):
+        self._refresh()
+        bits = self.facet_index.select(expression) & self.age_index.bits(youngest, oldest)
+        records = self._fetch(set_positions(bits, cursor, page_size))
+        return make_page(records, bits.bit_count(), cursor)
+
+    # Count the records matching a facet filter per facet value, for the
+    # named facets or all of them
+    def facet_counts(self, expression, names=None):
+        self._refresh()
+        return self.facet_index.counts(self.facet_index.select(expression), names)
+
+    # Rank records against a free-text query
+    def search(self, query, limit=10):
+        return self.search_index.search(query, limit)
+
+    # Complete a partially typed name
+    def suggest(self, prefix, limit=10):
+        return self.search_index.suggest(prefix, limit)
+
+
+class JsonLinesStore(CatalogStore):
+    """Catalog stored as one JSON object per line.
+
+    Loading scans the file once and keeps only byte offsets per name and
+    category, so a lookup reads just the lines it returns.
+    """
+
+    def _load(self, stamp):
+        offsets = []
+        names = []
+        by_name = {}
+        by_category = {}
+        digest = hashlib.sha256()
+        with open(self.path, "rb") as handle:
+            offset = 0
+            for line in handle:
+                digest.update(line)
+                if line.strip():
+                    record = json.loads(line)
+                    by_name.setdefault(record["name"], offset)
+                    by_category.setdefault(record["category"], []).append(offset)
+                    names.append(record["name"])
+                    offsets.append(offset)
+                offset += len(line)
+        self._offsets = offsets
+        self._names = names
+        self._by_name = by_name
+        self._by_category = by_category
+        self._sorted_categories = sorted(by_category)
+        self._version = digest.hexdigest()[:16]
+
+    # Read the records stored at the given byte offsets
+    def _read(self, offsets):
+        records = []
+        with open(self.path, "rb") as handle:
+            for offset in offsets:
+                handle.seek(offset)
+                records.append(json.loads(handle.readline()))
+        return records
+
+    def _count(self):
+        return len(self._offsets)
+
+    def _fetch(self, positions):
+        return self._read([self._offsets[position] for position in positions])
+
+    def _iter_records(self):
+        with open(self.path, "rb") as handle:
+            for line in handle:
+                if line.strip():
+                    yield json.loads(line)
+
+    # Get record by name
+    def get_by_name(self, name):
+        self._refresh()
+        offset = self._by_name.get(name)
+        if offset is None:
+            return None
+        return self._read([offset])[0]
+
+    # Get records by category
+    def get_by_category(self, category):
+        self._refresh()
+        return self._read(self._by_category.get(category, ()))
+
+    # Get one page of records in a category, starting at the cursor offset
+    def get_page(self, category, cursor=0, page_size=20):
+        self._refresh()
+        offsets = self._by_category.get(category, [])
+        return make_page(self._read(offsets[cursor:cursor + page_size]), len(offsets), cursor)
+
+    # Get all categories, sorted
+    def categories(self):
+        self._refresh()
+        return list(self._sorted_categories)
+
+    # Get all record names in catalog order
+    def names(self):
+        self._refresh()
+        return list(self._names)
+
+    # Get category counts in order of first appearance
+    def distribution(self):
+        self._refresh()
+        return {
+            "categories": list(self._by_category.keys()),
+            "counts": [len(offsets) for offsets in self._by_category.values()]
+        }
+
+
+class SQLiteStore(CatalogStore):
+    """Catalog stored in a SQLite table with indexes on name and category.
+
+    Queries are pushed down to SQL, and each thread gets its own read-only
+    connection since Streamlit runs sessions on separate threads.
+    """
+
+    def __init__(self, path, views=None, facets=None):
+        self._local = threading.local()
+        self._generation = 0
+        super().__init__(path, views, facets)
+
+    def _connection(self):
+        # Connections opened before a reload may point at a replaced file
+        if getattr(self._local, "generation", None) != self._generation:
+            self._local.connection = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            self._local.generation = self._generation
+        return self._local.connection
+
+    def _load(self, stamp):
+        self._generation += 1
+        self._version = "%x-%x" % stamp
+        # Row positions in catalog order, so facet bits map back to rows
+        cursor = self._connection().execute("SELECT position FROM records ORDER BY position")
+        self._positions = [position for (position,) in cursor]
+
+    def _count(self):
+        return self._connection().execute("SELECT COUNT(*) FROM records").fetchone()[0]
+
+    def _iter_records(self):
+        cursor = self._connection().execute("SELECT data FROM records ORDER BY position")
+        for (data,) in cursor:
+            yield json.loads(data)
+
+    def _fetch(self, positions):
+        if not positions:
+            return []
+        rows = [self._positions[position] for position in positions]
+        cursor = self._connection().execute(
+            f"SELECT data FROM records WHERE position IN ({', '.join('?' * len(rows))}) ORDER BY position",
+            rows
+        )
+        return [json.loads(data) for (data,) in cursor]
+
+    # Get record by name
+    def get_by_name(self, name):
+        self._refresh()
+        row = self._connection().execute(
+            "SELECT data FROM records WHERE name = ? ORDER BY position LIMIT 1", (name,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    # Get records by category
+    def get_by_category(self, category):
+        self._refresh()
+        cursor = self._connection().execute(
+            "SELECT data FROM records WHERE category = ? ORDER BY position", (category,)
+        )
+        return [json.loads(data) for (data,) in cursor]
+
+    # Get one page of records in a category, starting at the cursor offset
+    def get_page(self, category, cursor=0, page_size=20):
+        self._refresh()
+        connection = self._connection()
+        total = connection.execute(
+            "SELECT COUNT(*) FROM records WHERE category = ?", (category,)
+        ).fetchone()[0]
+        rows = connection.execute(
+            "SELECT data FROM records WHERE category = ? ORDER BY position LIMIT ? OFFSET ?",
+            (category, page_size, cursor)
+        )
+        return make_page([json.loads(data) for (data,) in rows], total, cursor)
+
+    # Get all categories, sorted
+    def categories(self):
+        self._refresh()
+        cursor = self._connection().execute("SELECT DISTINCT category FROM records ORDER BY category")
+        return [category for (category,) in cursor]
+
+    # Get all record names in catalog order
+    def names(self):
+        self._refresh()
+        cursor = self._connection().execute("SELECT name FROM records ORDER BY position")
+        return [name for (name,) in cursor]
+
+    # Get category counts in order of first appearance
+    def distribution(self):
+        self._refresh()
+        rows = self._connection().execute(
+            "SELECT category, COUNT(*), MIN(position) AS first FROM records "
+            "GROUP BY category ORDER BY first"
+        ).fetchall()
+        return {
+            "categories": [category for category, _, _ in rows],
+            "counts": [count for _, count, _ in rows]
+        }
+
+
+# Write records to a JSON-lines file
+def write_jsonl(path, records):
+    with open(path, "w", encoding="utf-8") as handle:
+        for record in records:
+            handle.write(json.dumps(record, default=dict) + "\n")
+
+
+# Write records to a SQLite file, replacing any existing catalog table
+def write_sqlite(path, records):
+    connection = sqlite3.connect(path)
+    with connection:
+        connection.execute("DROP TABLE IF EXISTS records")
+        connection.execute(
+            "CREATE TABLE records ("
+            "position INTEGER PRIMARY KEY, name TEXT NOT NULL, "
+            "category TEXT NOT NULL, data TEXT NOT NULL)"
+        )
+        connection.executemany(
+            "INSERT INTO records (name, category, data) VALUES (?, ?, ?)",
+            ((record["name"], record["category"], json.dumps(record, default=dict)) for record in records)
+        )
+        connection.execute("CREATE INDEX records_name ON records (name, position)")
+        connection.execute("CREATE INDEX records_category ON records (category, position)")
+    connection.close()
+
+
+STORE_TYPES = {
+    ".jsonl": (JsonLinesStore, write_jsonl),
+    ".db": (SQLiteStore, write_sqlite),
+    ".sqlite": (SQLiteStore, write_sqlite),
+    ".sqlite3": (SQLiteStore, write_sqlite),
+}
+
+
+# Open the catalog stored at path, seeding a new file from the given records.
+# Without a path the seed records are served from an in-memory Catalog.
+def open_catalog(path, seed=(), views=None, facets=None):
+    if not path:
+        return Catalog(seed, views, facets)
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in STORE_TYPES:
+        raise ValueError(f"Unsupported catalog file type: {path}")
+    store_type, writer = STORE_TYPES[extension]
+    if not os.path.exists(path):
+        writer(path, seed)
+    return store_type(path, views, facets)
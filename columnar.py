@@ -0,0 +1,264 @@
+"""
+This module contains the compact columnar storage mode for catalog records.
+
+A ``ColumnarTable`` holds records column by column instead of as one dict per
+record. Free text is packed into a single UTF-8 buffer with offsets,
+repetitive strings such as categories and age ranges are dictionary-encoded
+into small integer codes, and list fields such as ``features`` are flattened
+into one code array with per-row offsets. Rows are read through ``RowView``
+objects that behave like the original read-only dicts.
+
+The saving depends on catalog size, and small catalogs can lose memory. A
+table has fixed overheads (dictionaries, offset arrays, interned strings),
+and module features are mostly distinct phrases that dictionary encoding
+cannot shrink. memory_report.py measures synthetic module tables about 11%
+larger than the list of dicts at 1,000 records, swinging either way up to a
+few thousand, and only about 30% smaller from 20,000 records on. API records
+save 30-40% at every size.
+"""
+
+import sys
+from array import array
+from collections.abc import Mapping
+
+# Column kinds that can be named in a schema
+TEXT = "text"
+CATEGORY = "category"
+LIST = "list"
+VALUE = "value"
+
+
+# Pick the smallest unsigned array type code that can hold the given maximum
+def _smallest_typecode(maximum):
+    for typecode in ("B", "H", "I", "Q"):
+        if maximum < 1 << (8 * array(typecode).itemsize):
+            return typecode
+    raise OverflowError(maximum)
+
+
+class _Column:
+    """Base column: tracks which rows have a value at all."""
+
+    def __init__(self):
+        self._present = bytearray()
+        self._complete = True
+
+    def append(self, value, present=True):
+        self._present.append(present)
+        if not present:
+            self._complete = False
+
+    def has(self, row):
+        return self._complete or self._present[row]
+
+    def finish(self):
+        # Rows that always have the field need no presence flags
+        if self._complete:
+            self._present = bytearray()
+
+    def nbytes(self):
+        return sys.getsizeof(self._present)
+
+
+class _TextColumn(_Column):
+    """Unique strings packed into one UTF-8 buffer."""
+
+    def __init__(self):
+        super().__init__()
+        self._buffer = bytearray()
+        self._offsets = array("Q", [0])
+
+    def append(self, value, present=True):
+        super().append(value, present)
+        if present:
+            self._buffer += value.encode("utf-8")
+        self._offsets.append(len(self._buffer))
+
+    def get(self, row):
+        return self._buffer[self._offsets[row]:self._offsets[row + 1]].decode("utf-8")
+
+    def finish(self):
+        super().finish()
+        self._buffer = bytes(self._buffer)
+        self._offsets = array(_smallest_typecode(self._offsets[-1]), self._offsets)
+
+    def nbytes(self):
+        return super().nbytes() + sys.getsizeof(self._buffer) + sys.getsizeof(self._offsets)
+
+
+class _Dictionary:
+    """Distinct values with a code for each."""
+
+    def __init__(self):
+        self.values = []
+        self._codes = {}
+
+    def encode(self, value):
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(sys.intern(value) if isinstance(value, str) else value)
+        return code
+
+    def finish(self):
+        self._codes = None
+
+    def nbytes(self):
+        return sys.getsizeof(self.values) + sum(sys.getsizeof(value) for value in self.values)
+
+
+class _CategoryColumn(_Column):
+    """Repetitive values stored as codes into a dictionary."""
+
+    def __init__(self):
+        super().__init__()
+        self._dictionary = _Dictionary()
+        self._codes = array("I")
+
+    def append(self, value, present=True):
+        super().append(value, present)
+        self._codes.append(self._dictionary.encode(value) if present else 0)
+
+    def get(self, row):
+        return self._dictionary.values[self._codes[row]]
+
+    def finish(self):
+        super().finish()
+        self._dictionary.finish()
+        self._codes = array(_smallest_typecode(len(self._dictionary.values)), self._codes)
+
+    def nbytes(self):
+        return super().nbytes() + self._dictionary.nbytes() + sys.getsizeof(self._codes)
+
+
+class _ListColumn(_Column):
+    """Lists flattened into one array of dictionary codes with row offsets."""
+
+    def __init__(self):
+        super().__init__()
+        self._dictionary = _Dictionary()
+        self._codes = array("I")
+        self._offsets = array("Q", [0])
+
+    def append(self, value, present=True):
+        super().append(value, present)
+        if present:
+            self._codes.extend(self._dictionary.encode(item) for item in value)
+        self._offsets.append(len(self._codes))
+
+    def get(self, row):
+        values = self._dictionary.values
+        return [values[code] for code in self._codes[self._offsets[row]:self._offsets[row + 1]]]
+
+    def finish(self):
+        super().finish()
+        self._dictionary.finish()
+        self._codes = array(_smallest_typecode(len(self._dictionary.values)), self._codes)
+        self._offsets = array(_smallest_typecode(self._offsets[-1]), self._offsets)
+
+    def nbytes(self):
+        return (super().nbytes() + self._dictionary.nbytes()
+                + sys.getsizeof(self._codes) + sys.getsizeof(self._offsets))
+
+
+class _ValueColumn(_Column):
+    """Fallback for fields without a compact encoding."""
+
+    def __init__(self):
+        super().__init__()
+        self._values = []
+
+    def append(self, value, present=True):
+        super().append(value, present)
+        self._values.append(value if present else None)
+
+    def get(self, row):
+        return self._values[row]
+
+    def nbytes(self):
+        return super().nbytes() + sys.getsizeof(self._values)
+
+
+COLUMN_TYPES = {
+    TEXT: _TextColumn,
+    CATEGORY: _CategoryColumn,
+    LIST: _ListColumn,
+    VALUE: _ValueColumn,
+}
+
+
+class RowView(Mapping):
+    """Read-only dict-like view of one row of a ColumnarTable."""
+
+    __slots__ = ("_table", "_row")
+
+    def __init__(self, table, row):
+        self._table = table
+        self._row = row
+
+    def __getitem__(self, key):
+        column = self._table._columns.get(key)
+        if column is None or not column.has(self._row):
+            raise KeyError(key)
+        return column.get(self._row)
+
+    def __iter__(self):
+        row = self._row
+        return (name for name, column in self._table._columns.items() if column.has(row))
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class ColumnarTable:
+    """Read-only sequence of records stored column by column.
+
+    ``schema`` maps field names to a column kind: ``"text"`` for free text,
+    ``"category"`` for repetitive values, ``"list"`` for lists of strings, or
+    ``"value"`` for anything else. Fields missing from the schema are stored
+    as ``"value"`` columns.
+    """
+
+    def __init__(self, records, schema):
+        self._columns = {name: COLUMN_TYPES[kind]() for name, kind in schema.items()}
+        self._length = 0
+        for record in records:
+            for name in record:
+                if name not in self._columns:
+                    # Backfill earlier rows that did not have this field
+                    column = self._columns[name] = _ValueColumn()
+                    for _ in range(self._length):
+                        column.append(None, present=False)
+            for name, column in self._columns.items():
+                present = name in record
+                column.append(record[name] if present else None, present)
+            self._length += 1
+        for column in self._columns.values():
+            column.finish()
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [RowView(self, index) for index in range(*row.indices(self._length))]
+        if row < 0:
+            row += self._length
+        if not 0 <= row < self._length:
+            raise IndexError(row)
+        return RowView(self, row)
+
+    def __iter__(self):
+        return (RowView(self, row) for row in range(self._length))
+
+    # Decode every value of one column
+    def column(self, name):
+        column = self._columns[name]
+        return [column.get(row) if column.has(row) else None for row in range(self._length)]
+
+    # Approximate memory held by the table, in bytes
+    def nbytes(self):
+        return sys.getsizeof(self) + sum(column.nbytes() for column in self._columns.values())
@@ -0,0 +1,516 @@
+"""
+This module contains the out-of-core ingestion of Urban Institute Education
+Data API datasets behind the "Education Data" tab of the dashboard.
+
+The API returns a dataset year as JSON pages of up to 10,000 rows linked by
+``next`` URLs, and a year of a large dataset runs to millions of rows. Pages
+are fetched through ApiClient one ahead of the page being converted, turned
+into Arrow record batches, and written out as Parquet part files of
+PART_ROWS rows, partitioned by year:
+
+    <data dir>/<dataset>/rows/year=2020/part-00000.parquet
+
+so memory stays bounded by a part whatever the size of the dataset. A year
+is written to a staging directory and swapped in when complete. Afterwards
+the group-by rollups the dashboard charts are rebuilt by scanning the Parquet
+files batch by batch and merging partial aggregates; they are small and kept
+as one Parquet file each under ``<data dir>/<dataset>/rollups``. The
+dashboard only ever reads the rollups.
+
+    python education_data.py ingest schools 2019 2020 2021
+    python education_data.py ingest colleges 2021 --data-dir /srv/eduverse/education
+    python education_data.py ingest schools 2020 --synthetic 500000
+    python education_data.py ingest schools 2019 2020 --replay tests/fixtures/education_data
+    python education_data.py record schools 2020 --fixtures fixtures/ --max-pages 3
+    python education_data.py rollups schools
+
+``record`` saves live API pages as fixture files, and ``--replay`` ingests
+from them through a local stub of the API; ``--synthetic`` does the same with
+generated pages. Urban Institute codes missing values as negative numbers
+(-1 missing, -2 not applicable, -3 suppressed); they are stored as nulls.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+import time
+from urllib.parse import parse_qs, urlsplit
+
+from api_client import ApiClient
+
+PROVIDER = "Urban Institute's Education Data API"
+
+DATA_DIR = os.environ.get(
+    "EDUVERSE_EDUCATION_DATA",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "education")
+)
+
+# Rows per Parquet part file, and so the most rows held in memory at once
+PART_ROWS = 250000
+
+# Rows per page the API and its stubs return
+PAGE_ROWS = 10000
+
+# Labels of the coded columns the dashboard groups by
+SCHOOL_LEVELS = {0: "Prekindergarten", 1: "Primary", 2: "Middle", 3: "High", 4: "Other"}
+
+SECTORS = {0: "Administrative unit", 1: "Public, 4-year", 2: "Private nonprofit, 4-year",
+           3: "Private for-profit, 4-year", 4: "Public, 2-year", 5: "Private nonprofit, 2-year",
+           6: "Private for-profit, 2-year", 7: "Public, under 2-year", 8: "Private nonprofit, under 2-year",
+           9: "Private for-profit, under 2-year"}
+
+# Endpoint, stored columns and their Arrow types, and what the dashboard
+# charts for each dataset. The year comes from the partition, not a column.
+# Every rollup is keyed by year and counts rows as "rows".
+DATASETS = {
+    "schools": {
+        "title": "Public schools (Common Core of Data)",
+        "path": "/schools/ccd/directory/{year}/",
+        "columns": {
+            "ncessch": "string",
+            "school_name": "string",
+            "state_location": "string",
+            "fips": "int16",
+            "school_level": "int8",
+            "charter": "int8",
+            "enrollment": "int32",
+            "teachers_fte": "float32",
+        },
+        "sums": ["enrollment", "teachers_fte"],
+        "state": "state_location",
+        "group": ("school_level", "School level", SCHOOL_LEVELS),
+        "measure": ("enrollment", "Students"),
+        "noun": "Schools",
+    },
+    "colleges": {
+        "title": "Colleges and universities (IPEDS)",
+        "path": "/college-university/ipeds/directory/{year}/",
+        "columns": {
+            "unitid": "int32",
+            "inst_name": "string",
+            "state_abbr": "string",
+            "fips": "int16",
+            "sector": "int8",
+            "hbcu": "int8",
+        },
+        "sums": [],
+        "state": "state_abbr",
+        "group": ("sector", "Sector", SECTORS),
+        "measure": ("rows", "Institutions"),
+        "noun": "Institutions",
+    },
+}
+
+
+# Get the group-by keys of each rollup of a dataset, besides the year
+def rollup_keys(dataset):
+    spec = DATASETS[dataset]
+    return {"by_state": [spec["state"]], "by_group": [spec["group"][0]]}
+
+
+def dataset_dir(dataset, data_dir=DATA_DIR):
+    return os.path.join(data_dir, dataset)
+
+
+def arrow_schema(dataset):
+    import pyarrow as pa
+
+    return pa.schema([(column, pa.type_for_alias(kind)) for column, kind in DATASETS[dataset]["columns"].items()])
+
+
+# Convert one page of rows into a record batch, with negative codes as nulls
+def rows_to_batch(rows, schema):
+    import pyarrow as pa
+
+    arrays = []
+    for field in schema:
+        values = [row.get(field.name) for row in rows]
+        if pa.types.is_integer(field.type) or pa.types.is_floating(field.type):
+            values = [value if isinstance(value, (int, float)) and value >= 0 else None for value in values]
+        else:
+            values = [None if value is None else str(value) for value in values]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.record_batch(arrays, schema=schema)
+
+
+def write_part(directory, number, batches, schema):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    pq.write_table(pa.Table.from_batches(batches, schema=schema),
+                   os.path.join(directory, f"part-{number:05d}.parquet"), compression="zstd")
+
+
+# Turn an absolute next-page URL into a path relative to the provider's base
+def relative_path(client, url):
+    base = client.url(PROVIDER, "")
+    if url.startswith(base):
+        return url[len(base):]
+    parts = urlsplit(url)
+    base_path = urlsplit(base).path
+    path = parts.path[len(base_path):] if parts.path.startswith(base_path) else parts.path
+    return path + (f"?{parts.query}" if parts.query else "")
+
+
+# Yield the rows of each page of a dataset year in order, fetching the next
+# page while the caller works on the current one
+async def fetch_pages(client, path):
+    pending = asyncio.ensure_future(client.get(PROVIDER, path))
+    try:
+        while pending is not None:
+            page = (await pending).json()
+            pending = None
+            if page.get("next"):
+                pending = asyncio.ensure_future(client.get(PROVIDER, relative_path(client, page["next"])))
+            yield page.get("results", [])
+    finally:
+        if pending is not None:
+            pending.cancel()
+
+
+class EducationDataReport:
+    """Counts and timing of one ingestion run."""
+
+    def __init__(self):
+        self.pages = 0
+        self.rows = 0
+        self.parts = 0
+        self.years = []
+        self.elapsed = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self):
+        return {
+            "pages": self.pages,
+            "rows": self.rows,
+            "parts": self.parts,
+            "years": self.years,
+            "elapsed_s": self.elapsed,
+            "rows_per_second": self.rows_per_second,
+        }
+
+
+# Fetch one year of a dataset into its Parquet partition, replacing any
+# earlier copy once the new one is complete
+async def ingest_year(client, dataset, year, report, data_dir=DATA_DIR, part_rows=PART_ROWS):
+    schema = arrow_schema(dataset)
+    rows_dir = os.path.join(dataset_dir(dataset, data_dir), "rows")
+    final = os.path.join(rows_dir, f"year={year}")
+    os.makedirs(rows_dir, exist_ok=True)
+    # Unique per call, so runs in other threads or processes cannot collide.
+    # The leading dot keeps readers of the dataset from seeing it.
+    staging = tempfile.mkdtemp(prefix=f".year={year}.", suffix=".tmp", dir=rows_dir)
+    # mkdtemp makes it private; the dashboard may read as another user
+    os.chmod(staging, 0o755)
+    retired = None
+    try:
+        batches = []
+        buffered = 0
+        parts = 0
+        async for rows in fetch_pages(client, DATASETS[dataset]["path"].format(year=year)):
+            report.pages += 1
+            if not rows:
+                continue
+            batch = rows_to_batch(rows, schema)
+            batches.append(batch)
+            buffered += batch.num_rows
+            report.rows += batch.num_rows
+            if buffered >= part_rows:
+                # Written in a thread so the next page keeps downloading
+                await asyncio.to_thread(write_part, staging, parts, batches, schema)
+                parts += 1
+                batches = []
+                buffered = 0
+        if batches:
+            await asyncio.to_thread(write_part, staging, parts, batches, schema)
+            parts += 1
+        report.parts += parts
+        if os.path.exists(final):
+            retired = f"{staging}.old"
+            os.rename(final, retired)
+        try:
+            os.rename(staging, final)
+        except OSError:
+            # Put the earlier copy back, unless another run swapped its own in
+            if retired is not None and not os.path.exists(final):
+                os.rename(retired, final)
+                retired = None
+            raise
+        report.years.append(year)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+        if retired is not None:
+            shutil.rmtree(retired, ignore_errors=True)
+
+
+# Aggregate the Parquet files of a dataset into its rollups. Returns the
+# rollup tables by name.
+def build_rollups(dataset, data_dir=DATA_DIR):
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+
+    directory = dataset_dir(dataset, data_dir)
+    rows = ds.dataset(
+        os.path.join(directory, "rows"), format="parquet",
+        partitioning=ds.partitioning(pa.schema([("year", pa.int16())]), flavor="hive")
+    )
+    sums = DATASETS[dataset]["sums"]
+    keys = rollup_keys(dataset)
+    columns = sorted({"year", *sums, *(key for group in keys.values() for key in group)})
+
+    # Aggregate each batch on its own, then merge the small partial results
+    partials = {name: [] for name in keys}
+    for batch in rows.to_batches(columns=columns):
+        table = pa.Table.from_batches([batch])
+        for name, group in keys.items():
+            partials[name].append(
+                table.group_by(["year", *group]).aggregate([([], "count_all"), *((s, "sum") for s in sums)])
+            )
+
+    rollups_dir = os.path.join(directory, "rollups")
+    os.makedirs(rollups_dir, exist_ok=True)
+    rollups = {}
+    for name, group in keys.items():
+        names = ["year", *group, "rows", *sums]
+        if partials[name]:
+            merged = pa.concat_tables(partials[name]).group_by(["year", *group]).aggregate(
+                [("count_all", "sum"), *((f"{s}_sum", "sum") for s in sums)]
+            )
+            rollup = pa.table({
+                **{column: merged.column(column) for column in ("year", *group)},
+                "rows": merged.column("count_all_sum"),
+                **{s: merged.column(f"{s}_sum_sum") for s in sums},
+            })
+            rollup = rollup.sort_by([(column, "ascending") for column in ("year", *group)])
+        else:
+            rollup = pa.table({column: [] for column in names})
+        descriptor, temporary = tempfile.mkstemp(prefix=f".{name}.", suffix=".tmp", dir=rollups_dir)
+        os.close(descriptor)
+        try:
+            os.chmod(temporary, 0o644)
+            pq.write_table(rollup, temporary)
+            os.replace(temporary, os.path.join(rollups_dir, f"{name}.parquet"))
+        except BaseException:
+            os.unlink(temporary)
+            raise
+        rollups[name] = rollup
+    return rollups
+
+
+# Get a version of a dataset's rollups that changes whenever they are
+# rebuilt, or None when there are none yet
+def rollups_version(dataset, data_dir=DATA_DIR):
+    paths = [os.path.join(dataset_dir(dataset, data_dir), "rollups", f"{name}.parquet") for name in rollup_keys(dataset)]
+    if not all(os.path.exists(path) for path in paths):
+        return None
+    return "-".join(str(os.stat(path).st_mtime_ns) for path in paths)
+
+
+# Read one rollup of a dataset as a pandas frame
+def read_rollup(dataset, name, data_dir=DATA_DIR):
+    import pyarrow.parquet as pq
+
+    return pq.read_table(os.path.join(dataset_dir(dataset, data_dir), "rollups", f"{name}.parquet")).to_pandas()
+
+
+# Ingest years of a dataset and rebuild its rollups. Returns an
+# EducationDataReport.
+def ingest(dataset, years, data_dir=DATA_DIR, part_rows=PART_ROWS, registry=None):
+    async def run():
+        async with ApiClient(registry=registry) as client:
+            for year in years:
+                await ingest_year(client, dataset, year, report, data_dir, part_rows)
+
+    report = EducationDataReport()
+    started = time.perf_counter()
+    asyncio.run(run())
+    build_rollups(dataset, data_dir)
+    report.elapsed = time.perf_counter() - started
+    return report
+
+
+# Match a request target to (dataset, year, page number)
+def parse_target(target):
+    parts = urlsplit(target)
+    for dataset, spec in DATASETS.items():
+        pattern = re.escape(spec["path"]).replace(re.escape("{year}"), r"(\d+)")
+        match = re.search(pattern + "$", parts.path if parts.path.endswith("/") else parts.path + "/")
+        if match:
+            page = int(parse_qs(parts.query).get("page", ["1"])[0])
+            return dataset, int(match.group(1)), page
+    return None
+
+
+# Generate one page of a synthetic dataset year of total rows
+def synthetic_page(dataset, year, page, total):
+    rng = random.Random(f"{dataset}-{year}-{page}")
+    first = (page - 1) * PAGE_ROWS
+    states = ["AL", "AK", "AZ", "CA", "CO", "FL", "GA", "IL", "MA", "MI", "NY", "OH", "PA", "TX", "WA"]
+    rows = []
+    for index in range(first, min(first + PAGE_ROWS, total)):
+        state = rng.choice(states)
+        if dataset == "schools":
+            rows.append({
+                "year": year, "ncessch": f"{index:012d}", "school_name": f"School {index}",
+                "state_location": state, "fips": states.index(state) + 1,
+                "school_level": rng.choice([1, 1, 1, 2, 3, 4]), "charter": int(rng.random() < 0.07),
+                # Some schools do not report, as in the real data
+                "enrollment": -1 if rng.random() < 0.03 else rng.randint(20, 2500),
+                "teachers_fte": round(rng.uniform(2, 150), 1),
+            })
+        else:
+            rows.append({
+                "year": year, "unitid": 100000 + index, "inst_name": f"College {index}", "state_abbr": state,
+                "fips": states.index(state) + 1, "sector": rng.randint(0, 9), "hbcu": int(rng.random() < 0.02),
+            })
+    return rows, first + PAGE_ROWS < total
+
+
+# Serve API pages on a local port for --replay and --synthetic. page_source
+# maps (dataset, year, page) to (rows, has_next), or None when missing.
+async def serve_pages(page_source):
+    async def handle(reader, writer):
+        try:
+            while request_line := await reader.readline():
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                target = request_line.split()[1].decode("ascii")
+                found = parse_target(target)
+                result = page_source(*found) if found else None
+                if result is None:
+                    head, body = "404 Not Found", b""
+                else:
+                    rows, has_next = result
+                    dataset, year, page = found
+                    next_url = None
+                    if has_next:
+                        next_url = base_url + DATASETS[dataset]["path"].format(year=year) + f"?page={page + 1}"
+                    head, body = "200 OK", json.dumps({"count": None, "next": next_url, "results": rows}).encode()
+                writer.write(f"HTTP/1.1 {head}\r\nContent-Type: application/json\r\n"
+                             f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body)
+                await writer.drain()
+        except asyncio.CancelledError:
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    base_url = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}/api/v1"
+    return server, base_url
+
+
+# Read a recorded fixture page: <fixtures>/<dataset>/<year>/page-0001.json
+def fixture_page(fixtures, dataset, year, page):
+    path = os.path.join(fixtures, dataset, str(year), f"page-{page:04d}.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as handle:
+        recorded = json.load(handle)
+    return recorded.get("results", []), bool(recorded.get("next"))
+
+
+# Ingest through a local stub of the API serving page_source
+def ingest_stubbed(dataset, years, page_source, data_dir=DATA_DIR, part_rows=PART_ROWS):
+    report = EducationDataReport()
+    started = time.perf_counter()
+
+    async def run():
+        server, base_url = await serve_pages(page_source)
+        registry = {PROVIDER: {"name": PROVIDER, "base_url": base_url}}.get
+        try:
+            async with ApiClient(registry=registry) as client:
+                for year in years:
+                    await ingest_year(client, dataset, year, report, data_dir, part_rows)
+        finally:
+            server.close()
+            await server.wait_closed()
+
+    asyncio.run(run())
+    build_rollups(dataset, data_dir)
+    report.elapsed = time.perf_counter() - started
+    return report
+
+
+# Save live API pages of a dataset year as fixture files
+async def record(dataset, year, fixtures, max_pages=None):
+    directory = os.path.join(fixtures, dataset, str(year))
+    os.makedirs(directory, exist_ok=True)
+    async with ApiClient() as client:
+        path = DATASETS[dataset]["path"].format(year=year)
+        page = 0
+        while path and (max_pages is None or page < max_pages):
+            response = await client.get(PROVIDER, path)
+            page += 1
+            with open(os.path.join(directory, f"page-{page:04d}.json"), "wb") as handle:
+                handle.write(response.body)
+            following = response.json().get("next")
+            path = relative_path(client, following) if following else None
+    return page
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest Education Data API datasets into Parquet rollups.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest_parser = commands.add_parser("ingest", help="fetch dataset years and rebuild the rollups")
+    ingest_parser.add_argument("dataset", choices=list(DATASETS))
+    ingest_parser.add_argument("years", type=int, nargs="+")
+    ingest_parser.add_argument("--data-dir", default=DATA_DIR)
+    ingest_parser.add_argument("--part-rows", type=int, default=PART_ROWS, help="rows per Parquet part file")
+    source = ingest_parser.add_mutually_exclusive_group()
+    source.add_argument("--replay", metavar="FIXTURES", help="serve recorded pages from this directory locally")
+    source.add_argument("--synthetic", type=int, metavar="ROWS", help="serve this many generated rows per year")
+    ingest_parser.add_argument("--json", help="also write the report to this JSON file")
+
+    rollups_parser = commands.add_parser("rollups", help="rebuild the rollups from the stored rows")
+    rollups_parser.add_argument("dataset", choices=list(DATASETS))
+    rollups_parser.add_argument("--data-dir", default=DATA_DIR)
+
+    record_parser = commands.add_parser("record", help="save live API pages as fixtures for --replay")
+    record_parser.add_argument("dataset", choices=list(DATASETS))
+    record_parser.add_argument("year", type=int)
+    record_parser.add_argument("--fixtures", required=True)
+    record_parser.add_argument("--max-pages", type=int)
+    args = parser.parse_args(argv)
+
+    if args.command == "rollups":
+        for name, rollup in build_rollups(args.dataset, args.data_dir).items():
+            print(f"{name}: {rollup.num_rows} rows")
+        return 0
+    if args.command == "record":
+        pages = asyncio.run(record(args.dataset, args.year, args.fixtures, args.max_pages))
+        print(f"Saved {pages} pages to {os.path.join(args.fixtures, args.dataset, str(args.year))}")
+        return 0
+
+    if args.replay:
+        report = ingest_stubbed(args.dataset, args.years, lambda *page: fixture_page(args.replay, *page),
+                                args.data_dir, args.part_rows)
+    elif args.synthetic:
+        def page_source(dataset, year, page):
+            return synthetic_page(dataset, year, page, args.synthetic)
+
+        report = ingest_stubbed(args.dataset, args.years, page_source, args.data_dir, args.part_rows)
+    else:
+        report = ingest(args.dataset, args.years, args.data_dir, args.part_rows)
+    print(f"Read {report.rows} rows in {report.pages} pages in {report.elapsed:.2f}s"
+          f" ({report.rows_per_second:,.0f} rows/s)")
+    print(f"Wrote {report.parts} part files for {', '.join(map(str, report.years))}"
+          f" to {os.path.join(dataset_dir(args.dataset, args.data_dir), 'rows')}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as handle:
+            json.dump(report.as_dict(), handle, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
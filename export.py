@@ -0,0 +1,181 @@
+"""
+This module contains the streaming bulk export of the module and API
+catalogs to Parquet, CSV and JSON Lines.
+
+Records are read from the live catalog in fixed-size batches and each batch
+is written out before the next one is read, so memory stays bounded by the
+batch size whatever the catalog size. Columns follow MODULE_COLUMNS and
+API_COLUMNS; list fields such as ``features`` and ``use_cases`` become list
+columns in Parquet, JSON arrays in CSV cells and plain arrays in JSON Lines.
+
+    python export.py modules parquet --output modules.parquet
+    python export.py apis csv --output apis.csv --batch-size 50000
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import tempfile
+from itertools import islice
+
+import api_integrations
+import modules_data
+
+# Records read and written at a time
+BATCH_SIZE = 10000
+
+# File suffix and media type of each export format
+EXPORT_FORMATS = {
+    "parquet": (".parquet", "application/vnd.apache.parquet"),
+    "csv": (".csv", "text/csv"),
+    "jsonl": (".jsonl", "application/x-ndjson"),
+}
+
+# Where finished exports are kept, one file per catalog version and format
+EXPORT_DIR = os.path.join(tempfile.gettempdir(), "eduverse-exports")
+
+
+# Get the live catalog and column layout of "modules" or "apis"
+def catalog_source(name):
+    if name == "modules":
+        return modules_data.module_catalog, modules_data.MODULE_COLUMNS
+    if name == "apis":
+        return api_integrations.api_catalog, api_integrations.API_COLUMNS
+    raise ValueError(f"Unknown catalog: {name}")
+
+
+# Split records into lists of at most batch_size records
+def record_batches(records, batch_size=BATCH_SIZE):
+    records = iter(records)
+    while batch := list(islice(records, batch_size)):
+        yield batch
+
+
+# Write records as one JSON object per line
+def write_jsonl(records, columns, handle, batch_size=BATCH_SIZE):
+    count = 0
+    for batch in record_batches(records, batch_size):
+        lines = [
+            json.dumps({column: record[column] for column in columns if column in record}, ensure_ascii=False)
+            for record in batch
+        ]
+        handle.write(("\n".join(lines) + "\n").encode("utf-8"))
+        count += len(batch)
+    return count
+
+
+# Write records as CSV with a header row, list fields as JSON arrays
+def write_csv(records, columns, handle, batch_size=BATCH_SIZE):
+    text = io.TextIOWrapper(handle, encoding="utf-8", newline="")
+    writer = csv.writer(text)
+    writer.writerow(columns)
+    count = 0
+    for batch in record_batches(records, batch_size):
+        writer.writerows(
+            [
+                json.dumps(list(record.get(column, ())), ensure_ascii=False)
+                if kind == "list" else record.get(column, "")
+                for column, kind in columns.items()
+            ]
+            for record in batch
+        )
+        count += len(batch)
+    # Leave the binary handle open for the caller
+    text.flush()
+    text.detach()
+    return count
+
+
+# Build the Arrow schema for a column layout
+def arrow_schema(columns):
+    import pyarrow as pa
+
+    types = {
+        "text": pa.string(),
+        "category": pa.string(),
+        "list": pa.list_(pa.string()),
+        # The only value column, requests_per_minute, holds whole numbers
+        "value": pa.int64(),
+    }
+    return pa.schema([(column, types[kind]) for column, kind in columns.items()])
+
+
+# Write records as Parquet, one row group per batch
+def write_parquet(records, columns, handle, batch_size=BATCH_SIZE):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = arrow_schema(columns)
+    count = 0
+    with pq.ParquetWriter(handle, schema, compression="zstd") as writer:
+        for batch in record_batches(records, batch_size):
+            arrays = [
+                pa.array([record.get(column) for record in batch], type=field.type)
+                for column, field in zip(columns, schema)
+            ]
+            writer.write_batch(pa.record_batch(arrays, schema=schema))
+            count += len(batch)
+    return count
+
+
+WRITERS = {"parquet": write_parquet, "csv": write_csv, "jsonl": write_jsonl}
+
+
+# Stream the "modules" or "apis" catalog to a binary handle in the given
+# format. Returns the number of records written.
+def export(name, export_format, handle, batch_size=BATCH_SIZE):
+    catalog, columns = catalog_source(name)
+    return WRITERS[export_format](catalog, columns, handle, batch_size)
+
+
+# Get where the export of the current catalog version is kept
+def export_path(name, export_format):
+    catalog, _ = catalog_source(name)
+    suffix, _ = EXPORT_FORMATS[export_format]
+    return os.path.join(EXPORT_DIR, f"{name}-{catalog.version}{suffix}")
+
+
+# Export the current catalog version to its file unless that already exists,
+# and return the path
+def export_file(name, export_format, batch_size=BATCH_SIZE):
+    path = export_path(name, export_format)
+    if not os.path.exists(path):
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        # Other sessions only ever see a complete file. Each call writes its
+        # own temporary file, so sessions exporting at once cannot collide.
+        descriptor, temporary = tempfile.mkstemp(dir=EXPORT_DIR, prefix=os.path.basename(path) + ".", suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "wb") as handle:
+                export(name, export_format, handle, batch_size)
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export a catalog to Parquet, CSV or JSON Lines.")
+    parser.add_argument("catalog", choices=["modules", "apis"])
+    parser.add_argument("format", choices=list(EXPORT_FORMATS))
+    parser.add_argument("--output", help="file to write; defaults to the catalog name with the format's suffix")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="records read and written at a time")
+    parser.add_argument("--synthetic", type=int, help="export synthetic catalogs with this many entries")
+    args = parser.parse_args(argv)
+
+    if args.synthetic:
+        import synthetic_catalog
+
+        synthetic_catalog.install(args.synthetic)
+    output = args.output or args.catalog + EXPORT_FORMATS[args.format][0]
+    with open(output, "wb") as handle:
+        count = export(args.catalog, args.format, handle, args.batch_size)
+    print(f"Wrote {count} {args.catalog} to {output} ({os.path.getsize(output)} bytes)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
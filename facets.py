@@ -0,0 +1,197 @@
+"""
+This module contains the bitmap-indexed facet filters behind the "Filter"
+tabs of the Module Explorer and API Integrations sections.
+
+Every facet value keeps a bitset with one bit per catalog slot. Filters are
+built from ``Facet`` terms combined with ``&``, ``|`` and ``~``, and are
+answered by bitwise operations on Python integers. Facet counts are
+popcounts of the intersection with the current selection.
+"""
+
+
+class Bitset:
+    """Growable bitset with O(1) updates and a cached integer form."""
+
+    __slots__ = ("_bytes", "_bits")
+
+    def __init__(self):
+        self._bytes = bytearray()
+        self._bits = 0
+
+    def set(self, position):
+        index = position >> 3
+        if index >= len(self._bytes):
+            self._bytes.extend(bytes(index + 1 - len(self._bytes)))
+        self._bytes[index] |= 1 << (position & 7)
+        self._bits = None
+
+    def clear(self, position):
+        self._bytes[position >> 3] &= ~(1 << (position & 7)) & 0xFF
+        self._bits = None
+
+    # Get the bitset as an int, where bit n is set for position n
+    @property
+    def bits(self):
+        if self._bits is None:
+            self._bits = int.from_bytes(self._bytes, "little")
+        return self._bits
+
+
+# Get the positions of the set bits, lowest first, skipping the first
+# `start` of them and stopping after `limit`
+def set_positions(bits, start=0, limit=None):
+    # bin() runs in C, so scanning its reversed digits beats shifting a
+    # large int once per bit
+    digits = bin(bits)[:1:-1]
+    positions = []
+    position = digits.find("1")
+    while position != -1 and (limit is None or len(positions) < limit):
+        if start:
+            start -= 1
+        else:
+            positions.append(position)
+        position = digits.find("1", position + 1)
+    return positions
+
+
+class Expression:
+    """Base class for filters; combine them with ``&``, ``|`` and ``~``."""
+
+    def __and__(self, other):
+        return And(self, other)
+
+    def __or__(self, other):
+        return Or(self, other)
+
+    def __invert__(self):
+        return Not(self)
+
+    def evaluate(self, index):
+        raise NotImplementedError
+
+
+class Everything(Expression):
+    """Matches every record in the catalog."""
+
+    def evaluate(self, index):
+        return index.universe
+
+
+class Facet(Expression):
+    """Matches records whose facet has the given value."""
+
+    def __init__(self, name, value):
+        self.name = name
+        self.value = value
+
+    def evaluate(self, index):
+        return index.bitmap(self.name, self.value)
+
+
+class And(Expression):
+    """Matches records matched by every term."""
+
+    def __init__(self, *terms):
+        self.terms = terms
+
+    def evaluate(self, index):
+        bits = index.universe
+        for term in self.terms:
+            bits &= term.evaluate(index)
+        return bits
+
+
+class Or(Expression):
+    """Matches records matched by any term."""
+
+    def __init__(self, *terms):
+        self.terms = terms
+
+    def evaluate(self, index):
+        bits = 0
+        for term in self.terms:
+            bits |= term.evaluate(index)
+        return bits
+
+
+class Not(Expression):
+    """Matches records not matched by the term."""
+
+    def __init__(self, term):
+        self.term = term
+
+    def evaluate(self, index):
+        return index.universe & ~self.term.evaluate(index)
+
+
+# Build the usual filter-panel expression: any of the picked values within a
+# facet, and every facet that has picks. Facets with no picks match all.
+def where(**selected):
+    groups = [Or(*(Facet(name, value) for value in values)) for name, values in selected.items() if values]
+    return And(*groups) if groups else Everything()
+
+
+class FacetIndex:
+    """One bitset per facet value over catalog slots.
+
+    ``facets`` maps facet names to functions that return the values a record
+    has for that facet; a record can have several, like the keywords of its
+    features. Adding or removing a record costs O(values of the record).
+    Evaluating a filter costs a few bitwise operations on n-bit integers.
+    """
+
+    def __init__(self, facets):
+        self.facets = dict(facets)
+        self.reset()
+
+    # Forget every indexed record
+    def reset(self):
+        self._bitsets = {name: {} for name in self.facets}
+        self._universe = Bitset()
+
+    # Get the bits of every indexed record
+    @property
+    def universe(self):
+        return self._universe.bits
+
+    # Index a record under each of its facet values
+    def add(self, slot, record):
+        self._universe.set(slot)
+        for name, values in self.facets.items():
+            bitsets = self._bitsets[name]
+            for value in set(values(record)):
+                bitset = bitsets.get(value)
+                if bitset is None:
+                    bitset = bitsets[value] = Bitset()
+                bitset.set(slot)
+
+    # Take a record out of the index
+    def remove(self, slot, record):
+        self._universe.clear(slot)
+        for name, values in self.facets.items():
+            bitsets = self._bitsets[name]
+            for value in set(values(record)):
+                bitsets[value].clear(slot)
+
+    # Get the bits of the records with the given facet value
+    def bitmap(self, name, value):
+        bitset = self._bitsets[name].get(value)
+        return bitset.bits if bitset is not None else 0
+
+    # Get the bits of the records matching a filter
+    def select(self, expression):
+        return expression.evaluate(self)
+
+    # Count the matches of each facet value within the selected bits, in
+    # order of first appearance, for the named facets or all of them. Values
+    # with no records left are dropped.
+    def counts(self, bits, names=None):
+        counts = {}
+        for name in self._bitsets if names is None else names:
+            bitsets = self._bitsets[name]
+            counts[name] = {
+                value: (bitset.bits & bits).bit_count()
+                for value, bitset in bitsets.items()
+                if bitset.bits
+            }
+        return counts
@@ -0,0 +1,295 @@
+"""
+This module contains the bulk ingestion pipeline for new module and API
+records delivered as JSON Lines files.
+
+Files are read in chunks of lines and each chunk is parsed and validated in
+a process pool: required fields and their types, the implementation
+complexity levels the dashboard charts, age ranges the age index can parse,
+and http(s) URLs. Valid records are checked for names already taken, by the
+existing catalog or by an earlier line in any file, since a duplicate name
+would be shadowed in get_*_by_name. The accepted records are merged after
+the existing catalog into a new .jsonl or SQLite catalog file (see
+catalog_store.py), and every rejected line is written to an error report:
+
+    python ingest.py modules new_modules.jsonl --output modules.jsonl --errors errors.jsonl
+    python ingest.py apis batch1.jsonl batch2.jsonl --output apis.db --workers 8
+    python ingest.py modules --synthetic 500000 --output /tmp/modules.jsonl
+
+Chunks are merged in file order, so of two records with the same name the
+earlier one is kept, as in the catalogs.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from urllib.parse import urlsplit
+
+import api_integrations
+import modules_data
+from age_index import parse_age_range
+from api_integrations import COMPLEXITY_LEVELS
+from catalog_store import STORE_TYPES
+
+# Lines validated per task sent to the pool
+CHUNK_LINES = 5000
+
+# Field types every record of a kind must have
+REQUIRED_FIELDS = {
+    "modules": {"name": str, "description": str, "features": list, "category": str, "age_range": str},
+    "apis": {
+        "name": str,
+        "category": str,
+        "description": str,
+        "use_cases": list,
+        "implementation_complexity": str,
+        "documentation_url": str,
+    },
+}
+
+# Field types a record may have
+OPTIONAL_FIELDS = {
+    "modules": {},
+    "apis": {"base_url": str, "requests_per_minute": int},
+}
+
+# Check that a value is an http(s) URL with a host
+def is_url(value):
+    parts = urlsplit(value)
+    return parts.scheme in ("http", "https") and bool(parts.hostname) and not any(c.isspace() for c in value)
+
+
+# Check one parsed record, returning (field, message) pairs for its problems
+def validate_record(kind, record):
+    problems = []
+    fields = REQUIRED_FIELDS[kind] | OPTIONAL_FIELDS[kind]
+    for field, expected in fields.items():
+        if field not in record:
+            if field in REQUIRED_FIELDS[kind]:
+                problems.append((field, "missing"))
+            continue
+        value = record[field]
+        # bool is an int subclass, but never a valid count
+        if not isinstance(value, expected) or isinstance(value, bool):
+            problems.append((field, f"expected {expected.__name__}, got {type(value).__name__}"))
+        elif expected is str and not value.strip():
+            problems.append((field, "empty"))
+        elif expected is list and not all(isinstance(item, str) and item.strip() for item in value):
+            problems.append((field, "expected a list of non-empty strings"))
+    if problems:
+        return problems
+
+    if kind == "modules":
+        # Accept exactly what the age index can place
+        if parse_age_range(record["age_range"]) is None:
+            problems.append(("age_range", f"cannot parse {record['age_range']!r}"))
+    else:
+        if record["implementation_complexity"] not in COMPLEXITY_LEVELS:
+            problems.append(("implementation_complexity", f"must be one of {', '.join(COMPLEXITY_LEVELS)}"))
+        for field in ("documentation_url", "base_url"):
+            if field in record and not is_url(record[field]):
+                problems.append((field, "not an http(s) URL"))
+        if record.get("requests_per_minute", 1) <= 0:
+            problems.append(("requests_per_minute", "must be positive"))
+    return problems
+
+
+# Parse and validate a chunk of lines, numbered from first_line. Returns the
+# (line, record) pairs that passed and the error entries for the rest. Runs
+# in a pool worker.
+def validate_chunk(kind, source, first_line, lines):
+    accepted = []
+    errors = []
+    for line_number, line in enumerate(lines, first_line):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as error:
+            errors.append({"source": source, "line": line_number, "name": None, "field": None,
+                           "error": f"invalid JSON: {error}"})
+            continue
+        if not isinstance(record, dict):
+            errors.append({"source": source, "line": line_number, "name": None, "field": None,
+                           "error": "expected a JSON object"})
+            continue
+        problems = validate_record(kind, record)
+        if problems:
+            name = record.get("name") if isinstance(record.get("name"), str) else None
+            errors.extend(
+                {"source": source, "line": line_number, "name": name, "field": field, "error": message}
+                for field, message in problems
+            )
+        else:
+            accepted.append((line_number, record))
+    return accepted, errors
+
+
+# Yield (first line number, lines) chunks of a file
+def read_chunks(path, chunk_lines=CHUNK_LINES):
+    with open(path, encoding="utf-8") as handle:
+        first_line = 1
+        while lines := list(islice(handle, chunk_lines)):
+            yield first_line, lines
+            first_line += len(lines)
+
+
+class IngestReport:
+    """Counts and timing of one ingestion run."""
+
+    def __init__(self):
+        self.lines = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.duplicates = 0
+        self.existing = 0
+        self.elapsed = 0.0
+
+    @property
+    def records_per_second(self):
+        return self.lines / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self):
+        return {
+            "lines": self.lines,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "duplicates": self.duplicates,
+            "existing": self.existing,
+            "elapsed_s": self.elapsed,
+            "records_per_second": self.records_per_second,
+        }
+
+
+# Validate the files in a process pool and yield the records to keep in
+# order: the existing records first, then the accepted new ones. Error
+# entries are passed to report_error as they are found.
+def merged_records(kind, paths, existing, report, report_error, workers=None, chunk_lines=CHUNK_LINES):
+    # Where each name was first seen, to point duplicates at it
+    seen = {}
+    for record in existing:
+        seen.setdefault(record["name"], "the existing catalog")
+        report.existing += 1
+        yield record
+
+    def chunks():
+        for path in paths:
+            for first_line, lines in read_chunks(path, chunk_lines):
+                report.lines += len(lines)
+                yield path, first_line, lines
+
+    workers = workers or os.cpu_count()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Keep a bounded number of chunks in flight and take results in
+        # submission order, so memory stays flat and the first record with a
+        # name is the one kept
+        in_flight = deque()
+        pending = chunks()
+        for path, first_line, lines in islice(pending, 2 * workers):
+            in_flight.append((path, pool.submit(validate_chunk, kind, path, first_line, lines)))
+        while in_flight:
+            path, future = in_flight.popleft()
+            accepted, errors = future.result()
+            for next_path, first_line, lines in islice(pending, 1):
+                in_flight.append((next_path, pool.submit(validate_chunk, kind, next_path, first_line, lines)))
+            for error in errors:
+                report_error(error)
+            report.rejected += len({error["line"] for error in errors})
+            for line_number, record in accepted:
+                first_seen = seen.get(record["name"])
+                if first_seen is not None:
+                    report.duplicates += 1
+                    report_error({"source": path, "line": line_number, "name": record["name"], "field": "name",
+                                  "error": f"duplicate name, first seen in {first_seen}"})
+                    continue
+                seen[record["name"]] = f"{path} line {line_number}"
+                report.accepted += 1
+                yield record
+
+
+# Ingest JSON Lines files of "modules" or "apis" records, writing the merged
+# catalog to output and the rejected lines to errors_path. Returns an
+# IngestReport.
+def ingest(kind, paths, output, errors_path, existing=(), workers=None, chunk_lines=CHUNK_LINES):
+    extension = os.path.splitext(output)[1].lower()
+    if extension not in STORE_TYPES:
+        raise ValueError(f"Unsupported catalog file type: {output}")
+    _, writer = STORE_TYPES[extension]
+    report = IngestReport()
+    started = time.perf_counter()
+    # Each run writes its own temporary file beside the output, so runs at
+    # once cannot collide, and readers only ever see a complete catalog
+    descriptor, temporary = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(output)), prefix=os.path.basename(output) + ".", suffix=".tmp" + extension
+    )
+    os.close(descriptor)
+    try:
+        # Give the catalog the usual permissions rather than mkstemp's 0600
+        os.chmod(temporary, 0o644)
+        with open(errors_path, "w", encoding="utf-8") as errors:
+            def report_error(error):
+                errors.write(json.dumps(error, ensure_ascii=False) + "\n")
+
+            writer(temporary, merged_records(kind, paths, existing, report, report_error, workers, chunk_lines))
+        os.replace(temporary, output)
+    finally:
+        # Only left behind when ingestion failed before the swap
+        if os.path.exists(temporary):
+            os.remove(temporary)
+    report.elapsed = time.perf_counter() - started
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate JSON Lines records and merge them into a catalog file.")
+    parser.add_argument("kind", choices=list(REQUIRED_FIELDS))
+    parser.add_argument("paths", nargs="*", help="JSON Lines files with one record per line")
+    parser.add_argument("--output", required=True, help="merged catalog to write (.jsonl, .db, .sqlite)")
+    parser.add_argument("--errors", default="ingest_errors.jsonl", help="where to write the rejected lines")
+    parser.add_argument("--workers", type=int, help="validation processes (default: one per CPU)")
+    parser.add_argument("--chunk-lines", type=int, default=CHUNK_LINES, help="lines validated per task")
+    parser.add_argument("--no-existing", action="store_true",
+                        help="do not merge with the existing catalog, only the new records")
+    parser.add_argument("--synthetic", type=int, help="also ingest this many generated records")
+    parser.add_argument("--json", help="also write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    paths = list(args.paths)
+    if args.synthetic:
+        import synthetic_catalog
+
+        generate = synthetic_catalog.generate_modules if args.kind == "modules" else synthetic_catalog.generate_apis
+        with tempfile.NamedTemporaryFile("w", suffix=".jsonl", delete=False, encoding="utf-8") as handle:
+            for record in generate(args.synthetic):
+                handle.write(json.dumps(record) + "\n")
+        paths.append(handle.name)
+    if not paths:
+        parser.error("give at least one file to ingest, or --synthetic")
+
+    existing = ()
+    if not args.no_existing:
+        existing = modules_data.module_catalog if args.kind == "modules" else api_integrations.api_catalog
+    try:
+        report = ingest(args.kind, paths, args.output, args.errors, existing, args.workers, args.chunk_lines)
+    finally:
+        if args.synthetic:
+            os.remove(paths[-1])
+
+    print(f"Read {report.lines} lines in {report.elapsed:.2f}s ({report.records_per_second:,.0f} records/s)")
+    print(f"accepted   {report.accepted:10d}")
+    print(f"rejected   {report.rejected:10d}  (see {args.errors})")
+    print(f"duplicates {report.duplicates:10d}")
+    print(f"Wrote {report.existing + report.accepted} {args.kind} to {args.output}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as handle:
+            json.dump(report.as_dict(), handle, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
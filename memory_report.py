@@ -0,0 +1,60 @@
+"""
+This module reports how much memory the catalog records take as a list of
+dicts compared with the compact columnar form.
+
+The columnar form is not smaller at every size, so measure at the sizes the
+catalog is actually served at before turning it on:
+
+    python memory_report.py --sizes 1000 20000 100000 1000000
+"""
+
+import argparse
+import gc
+import sys
+import tracemalloc
+
+import api_integrations
+import modules_data
+import synthetic_catalog
+from columnar import ColumnarTable
+
+
+# Measure the bytes still allocated after build() returns
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare catalog memory as dicts and as columns.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 20000, 100000, 1000000])
+    args = parser.parse_args(argv)
+
+    kinds = [
+        ("modules", synthetic_catalog.generate_modules, modules_data.MODULE_COLUMNS),
+        ("apis", synthetic_catalog.generate_apis, api_integrations.API_COLUMNS),
+    ]
+    print(f"{'records':>10s} {'kind':8s} {'list of dicts':>15s} {'columnar':>12s} {'per record':>18s} {'saved':>7s}")
+    for size in args.sizes:
+        for kind, generate, schema in kinds:
+            records, dict_bytes = measure(lambda: generate(size))
+            # Build the table from a copy that is dropped before measuring, so
+            # only memory owned by the table is counted
+            table, table_bytes = measure(lambda: ColumnarTable(generate(size), schema))
+            assert len(table) == len(records)
+            del records, table
+            print(
+                f"{size:10d} {kind:8s} {dict_bytes / 2**20:12.1f} MB {table_bytes / 2**20:9.1f} MB"
+                f" {dict_bytes / size:7.0f} B -> {table_bytes / size:4.0f} B"
+                f" {1 - table_bytes / dict_bytes:6.0%}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
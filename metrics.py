@@ -0,0 +1,230 @@
+"""
+This module contains the in-process performance registry behind the
+dashboard's "Performance" section.
+
+Catalog accessors are wrapped with ``timed``, and rendering blocks with
+``timed``, ``measure`` or ``start_timer``. Each records into a ``Histogram``
+keyed by a kind ("accessor", "section" or "block") and a name. A histogram
+only keeps a call count, a total and counts per latency bucket, so recording
+costs a clock read, a bisect and an uncontended lock, and memory does not
+grow with traffic. Percentiles are estimated from the buckets.
+
+When tracemalloc is tracing, which EDUVERSE_TRACE_ALLOCATIONS=1 turns on at
+import, the net bytes each call retains are recorded too: the traced memory
+when it returns minus the traced memory when it started. That is not the
+total a call allocated, since memory freed before returning is not counted,
+and it can be negative. Tracing slows every allocation down, so it is off by
+default.
+
+The registry can be exported as JSON or in the Prometheus text format.
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Upper bounds of the latency buckets in seconds: powers of sqrt(2) from 1µs
+# to about 90s, so an estimated percentile is within about 20% of the truth
+BUCKET_BOUNDS = tuple(1e-6 * 2 ** (step / 2) for step in range(54))
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+if os.environ.get("EDUVERSE_TRACE_ALLOCATIONS") and not tracemalloc.is_tracing():
+    tracemalloc.start()
+
+
+class Histogram:
+    """Call count, total latency and latency buckets of one timed block.
+
+    ``buckets[i]`` counts calls that took at most ``BUCKET_BOUNDS[i]``
+    seconds and more than the bound before it; the last entry counts calls
+    slower than every bound. ``retained`` is the total of the net bytes
+    traced calls left allocated, over ``traced`` calls. Sessions record from
+    their own threads, so updates and summaries hold a lock.
+    """
+
+    __slots__ = ("count", "total", "minimum", "maximum", "buckets", "retained", "traced", "_lock")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self.count = 0
+            self.total = 0.0
+            self.minimum = float("inf")
+            self.maximum = 0.0
+            self.buckets = [0] * (len(BUCKET_BOUNDS) + 1)
+            self.retained = 0
+            self.traced = 0
+
+    def observe(self, seconds, retained=None):
+        bucket = bisect_left(BUCKET_BOUNDS, seconds)
+        with self._lock:
+            self.count += 1
+            self.total += seconds
+            if seconds < self.minimum:
+                self.minimum = seconds
+            if seconds > self.maximum:
+                self.maximum = seconds
+            self.buckets[bucket] += 1
+            if retained is not None:
+                self.retained += retained
+                self.traced += 1
+
+    # Estimate the latency below which a fraction q of the calls fell,
+    # interpolating within the bucket it lands in and never leaving the
+    # range actually observed
+    def quantile(self, q):
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            if count and seen + count >= rank:
+                lower = max(BUCKET_BOUNDS[index - 1] if index else 0.0, self.minimum)
+                upper = min(BUCKET_BOUNDS[index] if index < len(BUCKET_BOUNDS) else self.maximum, self.maximum)
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.maximum
+
+    def summary(self):
+        with self._lock:
+            summary = {
+                "count": self.count,
+                "total_s": self.total,
+                "mean_s": self.total / self.count if self.count else None,
+                "max_s": self.maximum if self.count else None,
+            }
+            for q in QUANTILES:
+                summary[f"p{round(q * 100)}_s"] = self.quantile(q)
+            summary["mean_retained_bytes"] = self.retained / self.traced if self.traced else None
+        return summary
+
+    # Copy the counters under the lock, so a reader never sees half of a
+    # concurrent observation
+    def snapshot(self):
+        with self._lock:
+            return self.count, self.total, list(self.buckets), self.retained, self.traced
+
+
+class Registry:
+    """Histograms keyed by (kind, name), created on first use."""
+
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, kind, name):
+        key = (kind, name)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram())
+        return histogram
+
+    # Zero every histogram in place, since timed functions hold on to theirs
+    def reset(self):
+        with self._lock:
+            for histogram in self._histograms.values():
+                histogram.clear()
+
+    # Summaries of every histogram of a kind, or of all kinds, by name
+    def summaries(self, kind=None):
+        return {
+            (key_kind, name): histogram.summary()
+            for (key_kind, name), histogram in sorted(self._histograms.items())
+            if kind is None or key_kind == kind
+        }
+
+    def as_json(self):
+        return json.dumps(
+            [{"kind": kind, "name": name, **summary} for (kind, name), summary in self.summaries().items()],
+            indent=2
+        )
+
+    # Render every histogram in the Prometheus text exposition format
+    def prometheus_text(self):
+        lines = [
+            "# HELP eduverse_duration_seconds Latency of catalog accessors and dashboard rendering blocks.",
+            "# TYPE eduverse_duration_seconds histogram",
+        ]
+        retained = []
+        for (kind, name), histogram in sorted(self._histograms.items()):
+            labels = f'kind="{kind}",name="{_escape(name)}"'
+            count, total, buckets, retained_bytes, traced = histogram.snapshot()
+            cumulative = 0
+            for bound, bucket_count in zip(BUCKET_BOUNDS, buckets):
+                cumulative += bucket_count
+                lines.append(f'eduverse_duration_seconds_bucket{{{labels},le="{bound:.6g}"}} {cumulative}')
+            lines.append(f'eduverse_duration_seconds_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f"eduverse_duration_seconds_sum{{{labels}}} {total:.9f}")
+            lines.append(f"eduverse_duration_seconds_count{{{labels}}} {count}")
+            if traced:
+                retained.append(f"eduverse_retained_bytes_sum{{{labels}}} {retained_bytes}")
+                retained.append(f"eduverse_retained_bytes_count{{{labels}}} {traced}")
+        if retained:
+            lines.append("# HELP eduverse_retained_bytes Net bytes a traced call left allocated (tracemalloc).")
+            lines.append("# TYPE eduverse_retained_bytes summary")
+            lines.extend(retained)
+        return "\n".join(lines) + "\n"
+
+
+# Escape a label value for the Prometheus text format
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REGISTRY = Registry()
+
+
+# Start timing under (kind, name). Returns a function that records the time
+# (and, when tracing, the net bytes retained) since the start when called.
+def start_timer(kind, name, registry=REGISTRY):
+    histogram = registry.histogram(kind, name)
+    traced = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+    started = time.perf_counter()
+
+    def stop():
+        elapsed = time.perf_counter() - started
+        histogram.observe(elapsed, None if traced is None else tracemalloc.get_traced_memory()[0] - traced)
+
+    return stop
+
+
+# Record every call of the decorated function, under its module-qualified
+# name unless a name is given
+def timed(kind="accessor", name=None, registry=REGISTRY):
+    def decorate(fn):
+        histogram = registry.histogram(kind, name or f"{fn.__module__}.{fn.__qualname__}")
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            traced = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                retained = None if traced is None else tracemalloc.get_traced_memory()[0] - traced
+                histogram.observe(elapsed, retained)
+
+        return wrapper
+
+    return decorate
+
+
+# Record the latency of the block inside a with statement
+@contextmanager
+def measure(kind, name, registry=REGISTRY):
+    stop = start_timer(kind, name, registry)
+    try:
+        yield
+    finally:
+        stop()
@@ -2,6 +2,17 @@
 This module contains the structured data for EduVerse's educational modules.
 """
 
+import os
+
+from age_index import parse_age_range
+from aggregates import AggregateView
+from catalog_store import open_catalog
+from columnar import ColumnarTable
+from facets import where
+from metrics import timed
+from search import tokenize
+from snapshot import load_catalog
+
 # Define the educational modules data
 k12_modules = [
     {
@@ -141,39 +152,141 @@ engineering_modules = [
 # Compile all modules into a single list for easy access
 all_modules = k12_modules + cybersecurity_modules + engineering_modules
 
+# Column layout used when the catalog is kept in compact columnar form
+MODULE_COLUMNS = {
+    "name": "text",
+    "description": "text",
+    "features": "list",
+    "category": "category",
+    "age_range": "category"
+}
+
+# Store the modules column by column when EDUVERSE_COMPACT_CATALOG is set
+if os.environ.get("EDUVERSE_COMPACT_CATALOG"):
+    all_modules = ColumnarTable(all_modules, MODULE_COLUMNS)
+
+# Age groups used to bucket modules by the youngest age they target
+AGE_BUCKETS = [
+    ("Early elementary", 0),
+    ("Upper elementary", 8),
+    ("Middle school", 11),
+    ("High school", 14),
+    ("Adult", 18)
+]
+
+# Get the age group of a module from the start of its age range
+def age_bucket(module):
+    interval = parse_age_range(module.get("age_range"))
+    if interval is None:
+        return "Unspecified"
+    youngest = interval[0]
+    bucket = AGE_BUCKETS[0][0]
+    for label, start in AGE_BUCKETS:
+        if youngest >= start:
+            bucket = label
+    return bucket
+
+# Build the aggregate views kept up to date by the module catalog
+def module_views():
+    return {"age_bucket": AggregateView(age_bucket, [label for label, _ in AGE_BUCKETS])}
+
+# Get the keywords of a module's features
+def feature_keywords(module):
+    return tokenize(" ".join(module.get("features", ())))
+
+# Get the category of a module as a facet value
+def category_facet(module):
+    return [module["category"]]
+
+# Get the age group of a module as a facet value
+def age_bucket_facet(module):
+    return [age_bucket(module)]
+
+# Build the facets that module filters can combine
+def module_facets():
+    return {
+        "category": category_facet,
+        "age_bucket": age_bucket_facet,
+        "feature": feature_keywords
+    }
+
+# Build the name and category indexes once at import time, or load them
+# prebuilt from the catalog snapshot when it is up to date (see snapshot.py).
+# When EDUVERSE_MODULES_STORE points at a .jsonl or SQLite file the catalog is
+# served from that file instead, and the records above are only used to seed
+# a new one.
+modules_store = os.environ.get("EDUVERSE_MODULES_STORE")
+module_catalog = None if modules_store else load_catalog("modules")
+if module_catalog is None:
+    module_catalog = open_catalog(modules_store, all_modules, module_views(), module_facets())
+
 # Generate data for module categories and counts for visualization
+@timed("accessor")
 def get_module_distribution():
-    categories = {}
-    for module in all_modules:
-        category = module["category"]
-        if category in categories:
-            categories[category] += 1
-        else:
-            categories[category] = 1
-    
+    return module_catalog.distribution()
+
+# Get module counts per age group
+@timed("accessor")
+def get_age_distribution():
+    snapshot = module_catalog.aggregate("age_bucket")
     return {
-        "categories": list(categories.keys()),
-        "counts": list(categories.values())
+        "age_buckets": snapshot["buckets"],
+        "counts": snapshot["counts"]
     }
 
 # Get modules by category
+@timed("accessor")
 def get_modules_by_category(category):
-    return [module for module in all_modules if module["category"] == category]
+    return module_catalog.get_by_category(category)
+
+# Get one page of modules in a category, optionally only those suitable for
+# the given age
+@timed("accessor")
+def get_modules_page(category, cursor=0, page_size=20, age=None):
+    if age is None:
+        return module_catalog.get_page(category, cursor, page_size)
+    # The age bits are intersected with the category's facet bits, so only
+    # the records on the page are fetched
+    return module_catalog.filter_by_age(where(category=[category]), age, None, cursor, page_size)
+
+# Get modules whose age range covers the given age
+@timed("accessor")
+def get_modules_for_age(age):
+    return module_catalog.get_by_age(age)
+
+# Get modules whose age range overlaps the ages youngest..oldest
+@timed("accessor")
+def get_modules_for_ages(youngest, oldest):
+    return module_catalog.get_by_age(youngest, oldest)
 
 # Get module by name
+@timed("accessor")
 def get_module_by_name(name):
-    for module in all_modules:
-        if module["name"] == name:
-            return module
-    return None
+    return module_catalog.get_by_name(name)
 
 # Get all module categories
+@timed("accessor")
 def get_all_categories():
-    categories = set()
-    for module in all_modules:
-        categories.add(module["category"])
-    return sorted(list(categories))
+    return module_catalog.categories()
 
 # Get all module names
+@timed("accessor")
 def get_all_module_names():
-    return [module["name"] for module in all_modules]
+    return module_catalog.names()
+
+# Get one page of the modules matching a facet filter, built with facets.where
+# and combined with &, | and ~
+@timed("accessor")
+def filter_modules(expression, cursor=0, page_size=20):
+    return module_catalog.filter(expression, cursor, page_size)
+
+# Count the modules matching a facet filter per category, age group and feature
+# keyword, or only for the named facets
+@timed("accessor")
+def get_module_facet_counts(expression, names=None):
+    return module_catalog.facet_counts(expression, names)
+
+# Search modules by name, description and features
+@timed("accessor")
+def search_modules(query, limit=10):
+    return module_catalog.search(query, limit)
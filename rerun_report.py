@@ -0,0 +1,214 @@
+"""
+This module reports the rerun latency and websocket payload of widget
+interactions on the dashboard.
+
+It starts the app with ``streamlit run`` in headless mode, connects to it
+over the websocket the way a browser tab does, and replays a fixed set of
+interactions. For each one it reports the time until the rerun finishes,
+how many messages and bytes the server sent, and whether the whole script
+or only a fragment ran:
+
+    python rerun_report.py
+    python rerun_report.py --runs 5 --json reruns.json
+    python rerun_report.py --app ../baseline/streamlit_app.py
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "streamlit_app.py")
+
+# Interactions replayed in order: (description, widget label, new value).
+# Selectboxes and radios take an option index, multiselects a list of
+# indexes, number and text inputs their value.
+INTERACTIONS = [
+    ("Open Module Explorer", "Select a section:", 2),
+    ("Pick a module category", "Select a module category", 1),
+    ("Filter modules by age", "Suitable for age", 11),
+    ("Pick a module facet", "Categories", [0]),
+    ("Open API Integrations", "Select a section:", 3),
+    ("Pick an API category", "Select an API category", 1),
+    ("Search APIs", "Search APIs", "data"),
+    ("Pick a search result", "Select an API", 1),
+]
+
+WIDGET_TYPES = ("selectbox", "radio", "multiselect", "number_input", "text_input")
+
+
+# Find a free local port for the server
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+# Start the app headless and wait until it answers health checks
+def start_server(app_path, port):
+    server = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", os.path.basename(app_path),
+         "--server.headless", "true", "--server.port", str(port),
+         "--browser.gatherUsageStats", "false"],
+        cwd=os.path.dirname(os.path.abspath(app_path)),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health") as response:
+                if response.status == 200:
+                    return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("Streamlit server did not start")
+
+
+class Session:
+    """One browser-like websocket session against the app.
+
+    Keeps the latest state of every widget the app has rendered, sends all
+    of them with each rerun request as the frontend does, and scopes the
+    rerun to the widget's fragment when it has one. ``options`` holds the
+    number of options of each selectbox, radio and multiselect.
+    """
+
+    def __init__(self, connection):
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        self._back_msg = BackMsg
+        self._forward_msg = ForwardMsg
+        self._widget_state = WidgetState
+        self._connection = connection
+        self.widgets = {}
+        self.options = {}
+        self.states = {}
+
+    # Remember a rendered widget and seed its state with the default
+    def _register(self, element, fragment_id):
+        kind = element.WhichOneof("type")
+        if kind not in WIDGET_TYPES:
+            return
+        widget = getattr(element, kind)
+        self.widgets[widget.label] = (widget.id, kind, fragment_id)
+        if kind in ("selectbox", "radio", "multiselect"):
+            self.options[widget.label] = len(widget.options)
+        if widget.id in self.states:
+            return
+        state = self._widget_state(id=widget.id)
+        if kind in ("selectbox", "radio") and widget.HasField("default"):
+            state.int_value = widget.default
+        elif kind == "multiselect":
+            state.int_array_value.data.extend(widget.default)
+        elif kind == "text_input" and widget.HasField("default"):
+            state.string_value = widget.default
+        elif kind == "number_input" and widget.HasField("default"):
+            state.int_value = int(widget.default)
+        else:
+            return
+        self.states[widget.id] = state
+
+    # Request a rerun and read messages until it finishes
+    async def rerun(self, fragment_id=""):
+        message = self._back_msg()
+        message.rerun_script.widget_states.widgets.extend(self.states.values())
+        message.rerun_script.fragment_id = fragment_id
+        started = time.perf_counter()
+        await self._connection.write_message(message.SerializeToString(), binary=True)
+        count = 0
+        size = 0
+        while True:
+            data = await self._connection.read_message()
+            if data is None:
+                raise RuntimeError("Streamlit closed the connection")
+            count += 1
+            size += len(data)
+            forward = self._forward_msg.FromString(data)
+            kind = forward.WhichOneof("type")
+            if kind == "delta" and forward.delta.WhichOneof("type") == "new_element":
+                self._register(forward.delta.new_element, forward.delta.fragment_id)
+            elif kind == "script_finished":
+                break
+        return {
+            "latency_s": time.perf_counter() - started,
+            "messages": count,
+            "bytes": size,
+            "fragment": bool(fragment_id),
+        }
+
+    # Change a widget's value and rerun what the frontend would rerun
+    async def interact(self, label, value):
+        widget_id, kind, fragment_id = self.widgets[label]
+        state = self.states.setdefault(widget_id, self._widget_state(id=widget_id))
+        if kind == "multiselect":
+            state.int_array_value.data[:] = value
+        elif kind == "text_input":
+            state.string_value = value
+        else:
+            state.int_value = value
+        return await self.rerun(fragment_id)
+
+
+async def replay(port):
+    from tornado.websocket import websocket_connect
+
+    connection = await websocket_connect(
+        f"ws://127.0.0.1:{port}/_stcore/stream", subprotocols=["streamlit"]
+    )
+    session = Session(connection)
+    results = {"Initial load": await session.rerun()}
+    for description, label, value in INTERACTIONS:
+        results[description] = await session.interact(label, value)
+    connection.close()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report rerun latency and payload per widget interaction.")
+    parser.add_argument("--app", default=APP_PATH, help="path of the Streamlit script to measure")
+    parser.add_argument("--runs", type=int, default=3, help="sessions to replay")
+    parser.add_argument("--json", help="also write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    port = free_port()
+    server = start_server(args.app, port)
+    try:
+        # The first session warms up imports and caches
+        asyncio.run(replay(port))
+        runs = [asyncio.run(replay(port)) for _ in range(args.runs)]
+    finally:
+        server.terminate()
+        server.wait()
+
+    report = {}
+    for description in runs[0]:
+        samples = [run[description] for run in runs]
+        report[description] = {
+            "latency_s": statistics.median(sample["latency_s"] for sample in samples),
+            "messages": statistics.median(sample["messages"] for sample in samples),
+            "bytes": statistics.median(sample["bytes"] for sample in samples),
+            "fragment": samples[0]["fragment"],
+        }
+
+    print(f"{'Interaction':26s} {'latency':>9s} {'messages':>9s} {'payload':>10s}  scope")
+    for description, result in report.items():
+        scope = "fragment" if result["fragment"] else "full app"
+        print(f"{description:26s} {result['latency_s'] * 1000:7.1f}ms {result['messages']:9.0f}"
+              f" {result['bytes'] / 1024:8.1f}KB  {scope}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,489 @@
+"""
+This module contains the response cache for GET requests to the providers in
+api_integrations.py, used by ApiClient when it is given one.
+
+Responses are kept in two tiers: an in-process LRU bounded by bytes, in front
+of a SQLite file that survives restarts and is shared by every process on
+the machine. Each provider has a time to live (PROVIDER_TTLS) suited to how
+slowly its data changes. Once that has passed, a response is still served
+for a further stale window while one background request revalidates it,
+sending If-None-Match / If-Modified-Since so an unchanged resource costs an
+empty 304. After the stale window the revalidation happens before answering.
+When a refresh fails, the old response is served rather than an error, and
+the failure is counted and kept in ``ResponseCache.last_error``.
+
+The memory tier is read on the event loop. SQLite reads and writes block on
+disk and on other processes' write locks, so they run in worker threads
+through asyncio.to_thread, one at a time per connection.
+
+Concurrent misses for the same URL share one upstream request. Every lookup,
+and every background revalidation, is counted by outcome in
+``ResponseCache.stats()`` and timed in the metrics registry under the
+"api_cache" kind:
+
+    python response_cache.py stats
+    python response_cache.py clear
+    python response_cache.py demo
+
+``demo`` runs the cache against a local stub provider and prints what each
+step cost upstream.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from api_client import RETRY_STATUSES, ApiClientError, HttpError, Response
+from metrics import REGISTRY
+
+# Where responses are kept between runs
+CACHE_PATH = os.path.join(tempfile.gettempdir(), "eduverse-api-cache.sqlite")
+
+# Seconds a response is fresh, and seconds after that it may still be served
+# while it is revalidated
+DEFAULT_TTL = (3600, 600)
+PROVIDER_TTLS = {
+    # Course content and exercises are edited, not replaced
+    "Khan Academy API": (24 * 3600, 3600),
+    # Study sets change while their owners edit them
+    "Quizlet API": (6 * 3600, 1800),
+    # Statistics are released yearly
+    "Urban Institute's Education Data API": (7 * 24 * 3600, 24 * 3600),
+}
+
+MAX_MEMORY_BYTES = 64 * 2**20
+MAX_DISK_BYTES = 1024 * 2**20
+
+# Headers worth keeping with a stored response
+STORED_HEADERS = ("content-type", "etag", "last-modified", "cache-control")
+
+OUTCOMES = ("hit", "stale", "revalidated", "miss", "coalesced", "stale_on_error", "error")
+
+# Outcomes of the revalidations started in the background for stale entries
+REFRESH_OUTCOMES = ("updated", "revalidated", "failed")
+
+
+class CachedResponse:
+    """A stored response and the times it stays fresh and servable until."""
+
+    __slots__ = ("url", "status", "reason", "headers", "body", "expires_at", "stale_until")
+
+    def __init__(self, url, status, reason, headers, body, expires_at, stale_until):
+        self.url = url
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+        self.expires_at = expires_at
+        self.stale_until = stale_until
+
+    @property
+    def size(self):
+        return len(self.body) + len(self.url) + sum(len(name) + len(value) for name, value in self.headers.items())
+
+    def response(self):
+        return Response(self.url, self.status, self.reason, dict(self.headers), self.body)
+
+
+class MemoryCache:
+    """Least recently used entries up to a total size in bytes."""
+
+    def __init__(self, max_bytes=MAX_MEMORY_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key, entry):
+        self.discard(key)
+        # An entry bigger than the whole budget would only evict everything
+        if entry.size > self.max_bytes:
+            return
+        self._entries[key] = entry
+        self.size += entry.size
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= evicted.size
+
+    def discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry.size
+
+    def clear(self):
+        self._entries.clear()
+        self.size = 0
+
+
+class DiskCache:
+    """Entries in a SQLite file, least recently used removed past a size in bytes.
+
+    The running size is read when the file is opened, so with several
+    processes writing it is an estimate and the file may overshoot
+    ``max_bytes`` until each process has evicted. Methods may be called from
+    any thread; they take turns on the one connection.
+    """
+
+    def __init__(self, path=CACHE_PATH, max_bytes=MAX_DISK_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, url TEXT, status INTEGER, reason TEXT, headers TEXT, body BLOB,"
+            "expires_at REAL, stale_until REAL, accessed_at REAL, size INTEGER)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+        self._connection.commit()
+        self.size = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def get(self, key):
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT url, status, reason, headers, body, expires_at, stale_until FROM responses WHERE key = ?",
+                (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            with self._connection:
+                self._connection.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        url, status, reason, headers, body, expires_at, stale_until = row
+        return CachedResponse(url, status, reason, json.loads(headers), body, expires_at, stale_until)
+
+    def put(self, key, entry):
+        with self._lock:
+            with self._connection:
+                old = self._connection.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, entry.url, entry.status, entry.reason, json.dumps(entry.headers), entry.body,
+                     entry.expires_at, entry.stale_until, time.time(), entry.size)
+                )
+            self.size += entry.size - (old[0] if old else 0)
+            if self.size > self.max_bytes:
+                self._evict()
+
+    # Remove the least recently used entries until the file is under budget
+    def _evict(self):
+        with self._connection:
+            while self.size > self.max_bytes:
+                rows = self._connection.execute(
+                    "SELECT key, size FROM responses ORDER BY accessed_at LIMIT 100"
+                ).fetchall()
+                if not rows:
+                    self.size = 0
+                    break
+                for key, size in rows:
+                    self._connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self.size -= size
+                    if self.size <= self.max_bytes:
+                        break
+
+    def clear(self):
+        with self._lock:
+            with self._connection:
+                self._connection.execute("DELETE FROM responses")
+            self._connection.execute("VACUUM")
+            self.size = 0
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+class ResponseCache:
+    """Two-tier cache of provider GET responses with revalidation.
+
+    Share one instance between ApiClients on the same event loop::
+
+        cache = ResponseCache()
+        async with ApiClient(cache=cache) as client:
+            response = await client.get("Khan Academy API", "/topic/math")
+    """
+
+    def __init__(self, path=CACHE_PATH, max_memory_bytes=MAX_MEMORY_BYTES, max_disk_bytes=MAX_DISK_BYTES,
+                 ttls=None, clock=time.time):
+        self.memory = MemoryCache(max_memory_bytes)
+        self.disk = DiskCache(path, max_disk_bytes)
+        self.ttls = PROVIDER_TTLS if ttls is None else ttls
+        self.clock = clock
+        self.counts = Counter()
+        self.refreshes = Counter()
+        # The most recent upstream failure hidden behind a stored response
+        self.last_error = None
+        # Upstream requests in progress by key, awaited by every concurrent miss
+        self._in_flight = {}
+
+    def close(self):
+        self.disk.close()
+
+    def clear(self):
+        self.memory.clear()
+        self.disk.clear()
+
+    # Key a request by provider, URL and any headers the caller set
+    @staticmethod
+    def key(provider, url, headers=None):
+        key = f"{provider} {url}"
+        if headers:
+            key += " " + json.dumps(sorted((name.lower(), value) for name, value in headers.items()))
+        return key
+
+    # Find an entry in memory, or on disk and then keep it in memory
+    async def lookup(self, key):
+        entry = self.memory.get(key)
+        if entry is None:
+            entry = await asyncio.to_thread(self.disk.get, key)
+            if entry is not None:
+                self.memory.put(key, entry)
+        return entry
+
+    async def store(self, key, entry):
+        self.memory.put(key, entry)
+        await asyncio.to_thread(self.disk.put, key, entry)
+
+    def _record(self, provider, outcome, started):
+        self.counts[outcome] += 1
+        REGISTRY.histogram("api_cache", f"{provider}: {outcome}").observe(time.perf_counter() - started)
+
+    def _record_refresh(self, provider, outcome, started):
+        self.refreshes[outcome] += 1
+        REGISTRY.histogram("api_cache", f"{provider}: refresh {outcome}").observe(time.perf_counter() - started)
+
+    # Get a response through the cache: fresh entries are returned as they
+    # are, stale ones are returned while a background request revalidates
+    # them, and anything older waits for the upstream
+    async def get(self, client, provider, path, params=None, headers=None):
+        started = time.perf_counter()
+        key = self.key(provider, client.url(provider, path, params), headers)
+        entry = await self.lookup(key)
+        now = self.clock()
+        if entry is not None and now < entry.expires_at:
+            self._record(provider, "hit", started)
+            return entry.response()
+        if entry is not None and now < entry.stale_until:
+            if key not in self._in_flight:
+                self._start_refresh(key, client, provider, path, params, headers, entry, background=True)
+            self._record(provider, "stale", started)
+            return entry.response()
+
+        task = self._in_flight.get(key)
+        coalesced = task is not None
+        if task is None:
+            task = self._start_refresh(key, client, provider, path, params, headers, entry)
+        try:
+            response, outcome = await asyncio.shield(task)
+        except Exception:
+            self._record(provider, "error", started)
+            raise
+        # Only the request that went upstream counts as its outcome
+        self._record(provider, "coalesced" if coalesced else outcome, started)
+        return response
+
+    # Start the upstream request for a key. Nobody awaits a background
+    # revalidation, so its outcome is recorded here when it finishes.
+    def _start_refresh(self, key, client, provider, path, params, headers, entry, background=False):
+        started = time.perf_counter()
+        task = asyncio.ensure_future(self._refresh(key, client, provider, path, params, headers, entry))
+        self._in_flight[key] = task
+
+        def done(task):
+            self._in_flight.pop(key, None)
+            if task.cancelled():
+                return
+            error = task.exception()
+            if not background:
+                return
+            if error is not None:
+                self.last_error = f"{provider} {path}: {error}"
+                outcome = "failed"
+            else:
+                outcome = {"miss": "updated", "revalidated": "revalidated"}.get(task.result()[1], "failed")
+            self._record_refresh(provider, outcome, started)
+
+        task.add_done_callback(done)
+        return task
+
+    # Fetch a response from upstream, conditionally when there is an entry,
+    # and store it. Returns the response and how it was obtained.
+    async def _refresh(self, key, client, provider, path, params, headers, entry):
+        request_headers = dict(headers or {})
+        if entry is not None:
+            if "etag" in entry.headers:
+                request_headers["If-None-Match"] = entry.headers["etag"]
+            if "last-modified" in entry.headers:
+                request_headers["If-Modified-Since"] = entry.headers["last-modified"]
+        try:
+            response = await client.request(provider, "GET", path, params=params, headers=request_headers)
+        except HttpError as error:
+            if entry is None:
+                raise
+            if error.response.status == 304:
+                # Keep the stored body, with any validators the 304 updated
+                entry = self._entry(provider, entry.url, entry.status, entry.reason,
+                                    {**entry.headers, **self._stored_headers(error.response.headers)}, entry.body)
+                await self.store(key, entry)
+                return entry.response(), "revalidated"
+            if error.response.status not in RETRY_STATUSES:
+                raise
+            self.last_error = f"{provider} {path}: {error}"
+            return entry.response(), "stale_on_error"
+        except ApiClientError as error:
+            if entry is None:
+                raise
+            self.last_error = f"{provider} {path}: {error}"
+            return entry.response(), "stale_on_error"
+
+        # Other status codes raised HttpError above
+        if "no-store" not in response.headers.get("cache-control", ""):
+            await self.store(key, self._entry(provider, response.url, response.status, response.reason,
+                                              self._stored_headers(response.headers), response.body))
+        return response, "miss"
+
+    @staticmethod
+    def _stored_headers(headers):
+        return {name: headers[name] for name in STORED_HEADERS if name in headers}
+
+    # Build an entry stamped with the provider's TTL. A server's own max-age
+    # is not used: providers often send short ones for data that changes
+    # once a year.
+    def _entry(self, provider, url, status, reason, headers, body):
+        ttl, stale = self.ttls.get(provider, DEFAULT_TTL)
+        now = self.clock()
+        return CachedResponse(url, status, reason, headers, body, now + ttl, now + ttl + stale)
+
+    def stats(self):
+        lookups = sum(self.counts[outcome] for outcome in OUTCOMES)
+        served_from_cache = self.counts["hit"] + self.counts["stale"] + self.counts["stale_on_error"]
+        return {
+            **{outcome: self.counts[outcome] for outcome in OUTCOMES},
+            "lookups": lookups,
+            "hit_ratio": served_from_cache / lookups if lookups else None,
+            "refreshes": {outcome: self.refreshes[outcome] for outcome in REFRESH_OUTCOMES},
+            "last_error": self.last_error,
+            "memory_entries": len(self.memory),
+            "memory_bytes": self.memory.size,
+            "disk_entries": len(self.disk),
+            "disk_bytes": self.disk.size,
+        }
+
+
+# Start a local provider stub that serves a small JSON body with an ETag,
+# answers If-None-Match with 304 and counts the requests it gets
+async def start_stub(delay=0.1):
+    served = Counter()
+
+    async def handle(reader, writer):
+        try:
+            while request_line := await reader.readline():
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                path = request_line.split()[1].decode("ascii")
+                await asyncio.sleep(delay)
+                etag = f'"{path}-v1"'
+                if headers.get("if-none-match") == etag:
+                    served["304"] += 1
+                    head, body = f"HTTP/1.1 304 Not Modified\r\nETag: {etag}\r\n\r\n", b""
+                else:
+                    served["200"] += 1
+                    body = json.dumps({"path": path, "rows": list(range(100))}).encode("utf-8")
+                    head = (f"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nETag: {etag}\r\n"
+                            f"Content-Length: {len(body)}\r\n\r\n")
+                writer.write(head.encode("latin-1") + body)
+                await writer.drain()
+        except asyncio.CancelledError:
+            # The demo is over while a client connection was still open
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[1], served
+
+
+async def demo():
+    from api_client import ApiClient
+
+    provider = "Urban Institute's Education Data API"
+    server, port, served = await start_stub()
+    now = [time.time()]
+    ttl, stale = PROVIDER_TTLS[provider]
+    registry = {provider: {"name": provider, "base_url": f"http://127.0.0.1:{port}/api/v1"}}.get
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ResponseCache(os.path.join(directory, "cache.sqlite"), clock=lambda: now[0])
+        async with ApiClient(registry=registry, cache=cache) as client:
+            async def step(title, requests=1):
+                before = sum(served.values()), dict(cache.counts)
+                started = time.perf_counter()
+                await asyncio.gather(*(client.get(provider, "/schools/ccd/enrollment/2020") for _ in range(requests)))
+                elapsed = time.perf_counter() - started
+                # Let a background revalidation finish before counting
+                await asyncio.sleep(0.3)
+                outcomes = {outcome: count - before[1].get(outcome, 0)
+                            for outcome, count in cache.counts.items() if count != before[1].get(outcome, 0)}
+                print(f"{title:48s} {elapsed * 1000:7.1f}ms  upstream calls {sum(served.values()) - before[0]}"
+                      f"  {outcomes}")
+
+            await step("20 concurrent first requests", 20)
+            await step("repeat within the TTL")
+            cache.memory.clear()
+            await step("repeat after a restart (disk tier)")
+            now[0] += ttl + stale / 2
+            await step("past the TTL, within the stale window")
+            await step("again, after the background revalidation")
+            now[0] += ttl + stale + 1
+            await step("past the stale window")
+        print(json.dumps(cache.stats(), indent=2))
+        print(f"Stub served {served['200']} full responses and {served['304']} not-modified")
+        cache.close()
+    server.close()
+    await server.wait_closed()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect the provider response cache or demonstrate it.")
+    parser.add_argument("command", choices=["stats", "clear", "demo"])
+    parser.add_argument("--path", default=CACHE_PATH, help="cache file for stats and clear")
+    args = parser.parse_args(argv)
+
+    if args.command == "demo":
+        asyncio.run(demo())
+        return 0
+    cache = ResponseCache(args.path)
+    try:
+        if args.command == "clear":
+            cache.clear()
+            print(f"Cleared {args.path}")
+        else:
+            print(f"{len(cache.disk)} responses, {cache.disk.size / 2**20:.1f} MiB in {args.path}")
+    finally:
+        cache.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,217 @@
+"""
+This module contains the full-text search index behind the "Search Modules"
+and "Search APIs" tabs.
+"""
+
+import heapq
+import math
+import re
+from bisect import bisect_left
+
+# Fields that are indexed, with the weight given to a term found in each
+SEARCH_FIELDS = {
+    "name": 3,
+    "description": 1,
+    "features": 1,
+    "use_cases": 1,
+}
+
+# Very common words that would only make postings lists longer
+STOP_WORDS = frozenset(
+    "a an and are as at be by for from in into is it its of on or the their "
+    "them through to with".split()
+)
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+# Split text into lowercase search terms
+def tokenize(text):
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOP_WORDS]
+
+
+class SearchIndex:
+    """Inverted index over catalog records ranked with BM25.
+
+    Records are added one at a time, so the index can be kept up to date as
+    the catalog grows instead of being rebuilt. The last query term can be
+    matched as a prefix for typeahead.
+
+    Per-term BM25 scores are computed lazily and kept sorted by score, so a
+    query can stop reading postings once no unseen record can make the top
+    results (Fagin's threshold algorithm). The expansions of a prefix are
+    merged into a single list, so that short prefixes, whose expansions each
+    match many records, still stop early. Adding a record changes the
+    collection statistics and drops these cached scores.
+    """
+
+    def __init__(self, records=(), k1=1.2, b=0.75, max_expansions=8):
+        self.k1 = k1
+        self.b = b
+        self.max_expansions = max_expansions
+        self._records = []
+        self._lengths = []
+        self._total_length = 0
+        self._postings = {}
+        self._terms = []
+        self._names = []
+        self._terms_sorted = True
+        self._names_sorted = True
+        self._norms = None
+        self._impacts = {}
+        for record in records:
+            self.add(record)
+
+    def __len__(self):
+        return len(self._records)
+
+    # Index a new record
+    def add(self, record):
+        doc_id = len(self._records)
+        frequencies = {}
+        for field, weight in SEARCH_FIELDS.items():
+            value = record.get(field)
+            if not value:
+                continue
+            text = value if isinstance(value, str) else " ".join(value)
+            for term in tokenize(text):
+                frequencies[term] = frequencies.get(term, 0) + weight
+
+        self._norms = None
+        self._impacts.clear()
+        self._records.append(record)
+        length = sum(frequencies.values())
+        self._lengths.append(length)
+        self._total_length += length
+        for term, frequency in frequencies.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                self._terms.append(term)
+                self._terms_sorted = False
+            postings[doc_id] = frequency
+
+        self._names.append((record["name"].lower(), doc_id))
+        self._names_sorted = False
+        return doc_id
+
+    # Expand a prefix to the most common indexed terms that start with it
+    def _expand(self, prefix):
+        if not self._terms_sorted:
+            self._terms.sort()
+            self._terms_sorted = True
+        start = bisect_left(self._terms, prefix)
+        candidates = []
+        for term in self._terms[start:]:
+            if not term.startswith(prefix):
+                break
+            candidates.append(term)
+        if len(candidates) > self.max_expansions:
+            candidates = heapq.nlargest(
+                self.max_expansions, candidates, key=lambda term: len(self._postings[term])
+            )
+        return candidates
+
+    # Get the BM25 scores of a term's postings, best first
+    def _term_impacts(self, term):
+        cached = self._impacts.get(term)
+        if cached is not None:
+            return cached
+        postings = self._postings.get(term)
+        if not postings:
+            return None
+        count = len(self._records)
+        if self._norms is None:
+            average_length = self._total_length / count or 1
+            self._norms = [self.k1 * (1 - self.b + self.b * length / average_length) for length in self._lengths]
+        norms = self._norms
+        idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+        boost = idf * (self.k1 + 1)
+        scores = {doc_id: boost * frequency / (frequency + norms[doc_id]) for doc_id, frequency in postings.items()}
+        ranked = sorted(scores, key=scores.__getitem__, reverse=True)
+        self._impacts[term] = cached = (ranked, scores)
+        return cached
+
+    # Get the summed BM25 scores of a prefix's expansions as one list, best
+    # first, so a short prefix adds one list to the walk instead of eight
+    def _merged_impacts(self, terms):
+        if len(terms) == 1:
+            return self._term_impacts(terms[0])
+        cached = self._impacts.get(terms)
+        if cached is not None:
+            return cached
+        scores = {}
+        for term in terms:
+            for doc_id, score in self._term_impacts(term)[1].items():
+                scores[doc_id] = scores.get(doc_id, 0.0) + score
+        ranked = sorted(scores, key=scores.__getitem__, reverse=True)
+        self._impacts[terms] = cached = (ranked, scores)
+        return cached
+
+    # Rank records against a query, returning (score, record) pairs
+    def search_scored(self, query, limit=10, prefix=True):
+        terms = tokenize(query)
+        if not terms or not self._records or limit <= 0:
+            return []
+        expansions = None
+        # Treat the last term as a prefix unless the query ends with a space
+        if prefix and not query[-1:].isspace():
+            *terms, last = terms
+            expansions = [term for term in self._expand(last) if term not in terms] or None
+            if expansions is None and last not in terms:
+                terms.append(last)
+
+        lists = []
+        for term in dict.fromkeys(terms):
+            impacts = self._term_impacts(term)
+            if impacts is not None:
+                lists.append(impacts)
+        if expansions is not None:
+            lists.append(self._merged_impacts(tuple(expansions)))
+
+        # Walk all lists in step, fully scoring each record the first time it
+        # is seen, until the best unseen record could not beat the top results
+        top = []
+        seen = set()
+        depth = 0
+        while True:
+            threshold = 0.0
+            exhausted = True
+            for ranked, scores in lists:
+                if depth >= len(ranked):
+                    continue
+                exhausted = False
+                doc_id = ranked[depth]
+                threshold += scores[doc_id]
+                if doc_id in seen:
+                    continue
+                seen.add(doc_id)
+                score = sum(other.get(doc_id, 0.0) for _, other in lists)
+                if len(top) < limit:
+                    heapq.heappush(top, (score, doc_id))
+                elif score > top[0][0]:
+                    heapq.heapreplace(top, (score, doc_id))
+            if exhausted or (len(top) >= limit and top[0][0] >= threshold):
+                break
+            depth += 1
+
+        top.sort(reverse=True)
+        return [(score, self._records[doc_id]) for score, doc_id in top]
+
+    # Rank records against a query
+    def search(self, query, limit=10, prefix=True):
+        return [record for _, record in self.search_scored(query, limit, prefix)]
+
+    # Complete a partially typed name
+    def suggest(self, prefix, limit=10):
+        if not self._names_sorted:
+            self._names.sort()
+            self._names_sorted = True
+        prefix = prefix.lower()
+        start = bisect_left(self._names, (prefix, -1))
+        suggestions = []
+        for name, doc_id in self._names[start:start + limit]:
+            if not name.startswith(prefix):
+                break
+            suggestions.append(self._records[doc_id]["name"])
+        return suggestions
@@ -0,0 +1,302 @@
+"""
+This module contains the recommendation index that links modules to related
+modules and to the API integrations that could power them.
+
+Every module and API is turned into a TF-IDF vector over the words of its
+description, features and use cases. Both catalogs share one vocabulary, so
+a module and an API that talk about the same things end up close together.
+The rows are L2-normalized, which makes the dot product of two rows their
+cosine similarity, and the top matches for every entry are precomputed with
+sparse matrix products over blocks of rows.
+
+To keep that product sparse on large catalogs, each term only keeps the
+documents where it weighs most (``max_postings``). An entry is compared
+with the documents that rank high for at least one of its terms, which
+finds the same neighbours as the exhaustive product whenever no term is
+shared by more than ``max_postings`` entries, as in the bundled catalogs.
+An entry left with no candidates at all is scored against every document
+of the other catalog instead.
+
+    python similarity.py --synthetic 100000
+
+times a full recomputation on synthetic catalogs of that size.
+"""
+
+import argparse
+import re
+import sys
+import threading
+import time
+
+import api_integrations
+import modules_data
+from search import STOP_WORDS, TOKEN_PATTERN
+
+# Search terms, or the newline that ends a record
+RECORD_TOKENS = re.compile(TOKEN_PATTERN.pattern + "|\n")
+
+# Fields whose words make up an entry's vector
+TEXT_FIELDS = ("description", "features", "use_cases")
+
+# Matches kept for every entry in each recommendation table
+TOP_K = 5
+
+# Documents kept per term when scoring candidates (see the module docstring)
+MAX_POSTINGS = 32
+
+# Rows multiplied at a time when ranking neighbours
+BLOCK_ROWS = 2048
+
+
+# Get the text of a record that its vector is built from
+def record_text(record):
+    parts = []
+    for field in TEXT_FIELDS:
+        value = record.get(field)
+        if value:
+            parts.append(value if isinstance(value, str) else " ".join(value))
+    return " ".join(parts)
+
+
+# Build L2-normalized TF-IDF rows for the given records over a shared
+# vocabulary, as one CSR matrix. Terms are split as search.tokenize does.
+def tfidf_matrix(records):
+    import numpy as np
+    from scipy import sparse
+
+    # Tokenizing the whole corpus at once is much faster than record by
+    # record. A newline, which no term contains, ends each record.
+    tokens = RECORD_TOKENS.findall("".join(record_text(record).lower() + "\n" for record in records))
+    vocabulary = {term: column for column, term in enumerate(dict.fromkeys(tokens))}
+    ids = np.fromiter(map(vocabulary.__getitem__, tokens), dtype=np.int64, count=len(tokens))
+    ends = ids == vocabulary.get("\n", -1)
+    # Each token belongs to the record whose end marker comes next
+    row_ids = np.cumsum(ends) - ends
+    kept = ~ends
+    for word in STOP_WORDS & vocabulary.keys():
+        kept &= ids != vocabulary[word]
+    rows = len(records)
+    # Repeated terms are summed into their term frequency
+    counts = sparse.csr_matrix(
+        (np.ones(int(kept.sum()), dtype=np.float32), (row_ids[kept], ids[kept])),
+        shape=(rows, len(vocabulary))
+    )
+    document_frequency = np.bincount(counts.indices, minlength=len(vocabulary))
+    idf = np.log((1 + rows) / (1 + document_frequency)).astype(np.float32) + 1
+    # Sublinear term frequency keeps long feature lists from dominating
+    counts.data = (1 + np.log(counts.data)) * idf[counts.indices]
+    norms = np.sqrt(np.asarray(counts.multiply(counts).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.csr_matrix(sparse.diags(1 / norms) @ counts, dtype=np.float32)
+
+
+# Keep the max_postings largest weights of every column, so that no term
+# links more than that many documents
+def prune_postings(matrix, max_postings):
+    import numpy as np
+    from scipy import sparse
+
+    columns = matrix.tocsc()
+    lengths = np.diff(columns.indptr)
+    if lengths.max(initial=0) <= max_postings:
+        return matrix
+    column_ids = np.repeat(np.arange(columns.shape[1]), lengths)
+    # Order every entry by column, then by descending weight. Weights are
+    # at most 1, so one key holds both.
+    order = np.argsort(column_ids - columns.data.astype(np.float64) / 2, kind="stable")
+    rank = np.arange(len(order)) - columns.indptr[column_ids[order]]
+    kept = order[rank < max_postings]
+    pruned = sparse.csc_matrix(
+        (columns.data[kept], (columns.indices[kept], column_ids[kept])), shape=columns.shape
+    )
+    return pruned.tocsr()
+
+
+# Pick the k highest scores of every row of a sparse CSR block, skipping the
+# column given for each row in own_columns. Returns (columns, scores) arrays
+# of shape (rows, k), with column -1 where a row has fewer than k matches.
+def top_k(block, k, own_columns=None):
+    import numpy as np
+
+    rows = block.shape[0]
+    starts = block.indptr[:-1]
+    lengths = np.diff(block.indptr)
+    data = block.data
+    if own_columns is not None:
+        # Rule out each entry's similarity to itself
+        data = np.where(block.indices == np.repeat(own_columns, lengths), -1, data)
+    # Lay each row's scores out in a padded dense array and partition that
+    width = max(k, lengths.max(initial=0))
+    scores = np.full((rows, width), -1, dtype=np.float32)
+    scores.ravel()[np.arange(len(data)) + np.repeat(np.arange(rows) * width - starts, lengths)] = data
+    best = np.argpartition(-scores, k - 1, axis=1)[:, :k] if width > k else np.tile(np.arange(k), (rows, 1))
+    best_scores = np.take_along_axis(scores, best, axis=1)
+    order = np.argsort(-best_scores, axis=1, kind="stable")
+    best = np.take_along_axis(best, order, axis=1)
+    best_scores = np.take_along_axis(best_scores, order, axis=1)
+    missing = best_scores <= 0
+    columns = block.indices[np.where(missing, 0, starts[:, None] + best)] if len(data) else np.zeros_like(best)
+    columns[missing] = -1
+    return columns.astype(np.int32), best_scores
+
+
+# Recommendation tables: which catalog each has a row for, and which catalog
+# its matches come from
+TABLES = {
+    "similar_modules": ("modules", "modules"),
+    "suggested_apis": ("modules", "apis"),
+    "related_modules": ("apis", "modules"),
+    "similar_apis": ("apis", "apis"),
+}
+
+
+class Recommendations:
+    """Precomputed neighbours of every module and API.
+
+    ``tables`` maps each of ``TABLES`` to a pair of arrays with one row per
+    entry: the positions of its ``k`` best matches (-1 past the last match)
+    and their cosine scores, best first. ``names`` maps "modules" and "apis"
+    to the entry names those positions index.
+    """
+
+    def __init__(self, modules, apis, k=TOP_K, max_postings=MAX_POSTINGS):
+        import numpy as np
+
+        modules = list(modules)
+        apis = list(apis)
+        self.k = k
+        self.names = {
+            "modules": [module["name"] for module in modules],
+            "apis": [api["name"] for api in apis],
+        }
+        # The first entry with a given name wins, as in the catalogs
+        self._positions = {}
+        for catalog, names in self.names.items():
+            positions = self._positions[catalog] = {}
+            for position, name in enumerate(names):
+                positions.setdefault(name, position)
+
+        vectors = tfidf_matrix(modules + apis)
+        rows = {"modules": vectors[:len(modules)], "apis": vectors[len(modules):]}
+        # Terms are pruned per catalog, so a large module catalog cannot
+        # crowd the APIs out of a term's postings
+        candidates = {catalog: prune_postings(matrix, max_postings).T.tocsr() for catalog, matrix in rows.items()}
+        exhaustive = {}
+        results = {table: ([], []) for table in TABLES}
+        for catalog, matrix in rows.items():
+            for start in range(0, matrix.shape[0], BLOCK_ROWS):
+                block = matrix[start:start + BLOCK_ROWS]
+                own = np.arange(start, start + block.shape[0])
+                for table, (row_catalog, match_catalog) in TABLES.items():
+                    if row_catalog != catalog:
+                        continue
+                    own_columns = own if match_catalog == catalog else None
+                    scored = (block @ candidates[match_catalog]).tocsr()
+                    columns, scores = top_k(scored, k, own_columns)
+                    # Rows whose terms were all pruned away get no candidates,
+                    # so they are scored against every entry instead
+                    empty = np.flatnonzero(columns[:, 0] < 0)
+                    if len(empty):
+                        if match_catalog not in exhaustive:
+                            exhaustive[match_catalog] = rows[match_catalog].T.tocsr()
+                        rescored = (block[empty] @ exhaustive[match_catalog]).tocsr()
+                        columns[empty], scores[empty] = top_k(
+                            rescored, k, None if own_columns is None else own_columns[empty]
+                        )
+                    results[table][0].append(columns)
+                    results[table][1].append(scores)
+        self.tables = {}
+        for table, (columns, scores) in results.items():
+            if columns:
+                self.tables[table] = (np.vstack(columns), np.vstack(scores))
+            else:
+                self.tables[table] = (np.empty((0, k), dtype=np.int32), np.empty((0, k), dtype=np.float32))
+
+    # Get (name, score) pairs for the best matches of the named entry in a
+    # table, or an empty list when the name is unknown
+    def neighbours(self, table, name, limit=None):
+        row_catalog, match_catalog = TABLES[table]
+        row = self._positions[row_catalog].get(name)
+        if row is None:
+            return []
+        names = self.names[match_catalog]
+        columns, scores = self.tables[table]
+        return [
+            (names[column], float(score))
+            for column, score in zip(columns[row][:limit], scores[row][:limit])
+            if column >= 0
+        ]
+
+
+_recommendations = None
+_recommendations_lock = threading.Lock()
+
+
+# Get the recommendations for the live catalogs, recomputing them when
+# either catalog has changed since they were built. Concurrent sessions wait
+# for one build instead of each starting their own.
+def recommendations():
+    global _recommendations
+    key = (modules_data.module_catalog.version, api_integrations.api_catalog.version)
+    current = _recommendations
+    if current is not None and current[0] == key:
+        return current[1]
+    with _recommendations_lock:
+        if _recommendations is None or _recommendations[0] != key:
+            _recommendations = (key, Recommendations(modules_data.module_catalog, api_integrations.api_catalog))
+        return _recommendations[1]
+
+
+# Look up the records of (name, score) pairs
+def _with_records(pairs, get_by_name):
+    return [(get_by_name(name), score) for name, score in pairs]
+
+
+# Get (module, score) pairs for the modules most similar to a module
+def get_similar_modules(name, limit=TOP_K):
+    pairs = recommendations().neighbours("similar_modules", name, limit)
+    return _with_records(pairs, modules_data.get_module_by_name)
+
+
+# Get (api, score) pairs for the APIs that best match a module
+def get_suggested_apis(name, limit=TOP_K):
+    pairs = recommendations().neighbours("suggested_apis", name, limit)
+    return _with_records(pairs, api_integrations.get_api_by_name)
+
+
+# Get (module, score) pairs for the modules an API could power
+def get_related_modules(name, limit=TOP_K):
+    pairs = recommendations().neighbours("related_modules", name, limit)
+    return _with_records(pairs, modules_data.get_module_by_name)
+
+
+# Get (api, score) pairs for the APIs most similar to an API
+def get_similar_apis(name, limit=TOP_K):
+    pairs = recommendations().neighbours("similar_apis", name, limit)
+    return _with_records(pairs, api_integrations.get_api_by_name)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time a full recomputation of the recommendations.")
+    parser.add_argument("--synthetic", type=int, help="use synthetic catalogs with this many modules and APIs")
+    parser.add_argument("--k", type=int, default=TOP_K, help="matches kept per entry and table")
+    parser.add_argument("--max-postings", type=int, default=MAX_POSTINGS,
+                        help="documents kept per term when scoring candidates")
+    args = parser.parse_args(argv)
+
+    if args.synthetic:
+        import synthetic_catalog
+
+        synthetic_catalog.install(args.synthetic)
+    started = time.perf_counter()
+    built = Recommendations(modules_data.module_catalog, api_integrations.api_catalog, args.k, args.max_postings)
+    elapsed = time.perf_counter() - started
+    print(f"Ranked {len(built.names['modules'])} modules and {len(built.names['apis'])} APIs in {elapsed:.2f}s")
+    for name in built.names["modules"][:3]:
+        suggestions = ", ".join(f"{api} ({score:.2f})" for api, score in built.neighbours("suggested_apis", name))
+        print(f"{name}: {suggestions}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+"""
+This module contains the precompiled catalog snapshot used for fast cold
+starts.
+
+    python snapshot.py
+
+builds the module and API catalogs from modules_data.py and
+api_integrations.py, together with their name, category, age, facet and
+search indexes, and writes them to one file. At startup the data modules
+memory-map that file and unpickle the ready-made catalogs instead of
+indexing the records again.
+
+The file is keyed by a hash of every source file the catalogs and their
+indexes are built from. When the key no longer matches, for instance after
+a record was edited, the snapshot is ignored and the catalogs are rebuilt
+from the records as before. The snapshot is a pickle, so only load files
+written by this build step.
+"""
+
+import argparse
+import functools
+import hashlib
+import json
+import mmap
+import os
+import pickle
+import sys
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_PATH = os.path.join(APP_DIR, "catalog.snapshot")
+
+# Bump when the file layout changes
+SNAPSHOT_FORMAT = 1
+MAGIC = b"EDUVERSE-SNAPSHOT"
+
+# Files whose content determines the records or how they are indexed
+SOURCE_FILES = [
+    "modules_data.py",
+    "api_integrations.py",
+    "catalog.py",
+    "search.py",
+    "age_index.py",
+    "facets.py",
+    "aggregates.py",
+    "columnar.py",
+    "snapshot.py",
+]
+
+
+# Get the snapshot path, which EDUVERSE_SNAPSHOT can override
+def snapshot_path():
+    return os.environ.get("EDUVERSE_SNAPSHOT", DEFAULT_PATH)
+
+
+# Hash the sources of the catalogs and the settings that change their records
+def snapshot_key():
+    digest = hashlib.sha256(f"{SNAPSHOT_FORMAT}:{bool(os.environ.get('EDUVERSE_COMPACT_CATALOG'))}".encode())
+    for name in SOURCE_FILES:
+        with open(os.path.join(APP_DIR, name), "rb") as handle:
+            digest.update(handle.read())
+    return digest.hexdigest()
+
+
+# Read the header of the snapshot file. Returns where the pickled data
+# starts and the [start, end) range of each catalog within it, or None when
+# the file is missing or stale.
+@functools.cache
+def read_header(path):
+    try:
+        with open(path, "rb") as handle:
+            line = handle.readline()
+    except FileNotFoundError:
+        return None
+    magic, _, header = line.partition(b" ")
+    if magic != MAGIC:
+        return None
+    header = json.loads(header)
+    if header["key"] != snapshot_key():
+        return None
+    return len(line), header["sections"]
+
+
+# Get one prebuilt catalog ("modules" or "apis"), or None when it has to be
+# rebuilt from the records. Only that catalog's section is unpickled,
+# straight from the memory-mapped file.
+def load_catalog(name):
+    path = snapshot_path()
+    header = read_header(path)
+    if header is None or name not in header[1]:
+        return None
+    data_start, sections = header
+    start, end = sections[name]
+    with open(path, "rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        with memoryview(mapped) as view, view[data_start + start:data_start + end] as payload:
+            return pickle.loads(payload)
+
+
+# Build both catalogs with every index filled in and write them to path
+def build(path):
+    from catalog import Catalog
+    import api_integrations
+    import modules_data
+
+    catalogs = {
+        "modules": Catalog(modules_data.all_modules, modules_data.module_views(), modules_data.module_facets()),
+        "apis": Catalog(api_integrations.api_integrations, api_integrations.api_views(),
+                        api_integrations.api_facets()),
+    }
+    for catalog in catalogs.values():
+        # Fill the lazily built parts so loading skips them too
+        catalog.version
+        catalog.names()
+        catalog.search_index
+    # The header line records where each catalog's pickle starts and ends,
+    # counted from the end of the header
+    payloads = {name: pickle.dumps(catalog, protocol=pickle.HIGHEST_PROTOCOL) for name, catalog in catalogs.items()}
+    sections = {}
+    offset = 0
+    for name, payload in payloads.items():
+        sections[name] = [offset, offset + len(payload)]
+        offset += len(payload)
+    header = json.dumps({"key": snapshot_key(), "sections": sections})
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as handle:
+        handle.write(MAGIC + b" " + header.encode("ascii") + b"\n")
+        for payload in payloads.values():
+            handle.write(payload)
+    os.replace(temporary, path)
+    # Importing the data modules above may have cached this path's old header
+    read_header.cache_clear()
+    return catalogs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the precompiled catalog snapshot.")
+    parser.add_argument("--output", default=snapshot_path(), help="where to write the snapshot")
+    args = parser.parse_args(argv)
+
+    catalogs = build(args.output)
+    counts = ", ".join(f"{len(catalog)} {name}" for name, catalog in catalogs.items())
+    print(f"Wrote {counts} to {args.output} ({os.path.getsize(args.output)} bytes)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""
+This module reports dashboard cold-start cost per section.
+
+Each section is rendered once in a fresh interpreter started with
+``python -X importtime``, so the numbers include every import the section
+pulls in. The report lists the time to first render and the cumulative
+import time of the heavy packages:
+
+    python startup_report.py
+    python startup_report.py --runs 5 --json startup.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+SECTIONS = ["Overview", "Performance", "Module Explorer", "API Integrations"]
+HEAVY_PACKAGES = ["streamlit", "pandas", "numpy", "pyarrow", "plotly", "altair"]
+
+# Rendered in the child interpreter: time the first run of one section
+RENDER_SECTION = """
+import sys, time
+started = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file("streamlit_app.py", default_timeout=120)
+app.session_state["section"] = sys.argv[1]
+app.run()
+elapsed = time.perf_counter() - started
+# A section that raised has not rendered, so its time means nothing
+if app.exception:
+    sys.exit(f"{sys.argv[1]} raised: {app.exception[0].value}")
+print("first_render_s", elapsed)
+"""
+
+
+# Sum cumulative import time of top-level packages from -X importtime output
+def parse_importtime(stderr):
+    totals = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if name.startswith("  ") or not cumulative.strip().isdigit():
+            continue
+        package = name.strip().split(".")[0]
+        totals[package] = totals.get(package, 0) + int(cumulative) / 1e6
+    return totals
+
+
+# Render one section in a fresh interpreter and collect its timings
+def measure(section):
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", RENDER_SECTION, section],
+        cwd=APP_DIR, capture_output=True, text=True
+    )
+    if completed.returncode:
+        lines = completed.stderr.strip().splitlines()
+        raise RuntimeError(lines[-1] if lines else f"rendering {section} failed")
+    first_render = None
+    for line in completed.stdout.splitlines():
+        if line.startswith("first_render_s"):
+            first_render = float(line.split()[1])
+    imports = parse_importtime(completed.stderr)
+    return first_render, imports
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report cold-start time per dashboard section.")
+    parser.add_argument("--runs", type=int, default=3, help="fresh interpreters per section")
+    parser.add_argument("--json", help="also write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    report = {}
+    for section in SECTIONS:
+        renders = []
+        imports = {}
+        for _ in range(args.runs):
+            first_render, run_imports = measure(section)
+            renders.append(first_render)
+            for package in HEAVY_PACKAGES:
+                imports.setdefault(package, []).append(run_imports.get(package, 0.0))
+        report[section] = {
+            "first_render_s": statistics.median(renders),
+            "imports_s": {package: statistics.median(times) for package, times in imports.items()},
+        }
+
+    print(f"{'Section':20s} {'first render':>13s}  " + "  ".join(f"{p:>9s}" for p in HEAVY_PACKAGES))
+    for section, result in report.items():
+        imports = "  ".join(f"{result['imports_s'][p] * 1000:7.0f}ms" for p in HEAVY_PACKAGES)
+        print(f"{section:20s} {result['first_render_s'] * 1000:11.0f}ms  {imports}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,591 @@
+import os
+
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import altair as alt
-from modules_data import (all_modules, get_module_distribution, get_modules_by_category, 
-                         get_module_by_name, get_all_categories, get_all_module_names)
-from api_integrations import (api_integrations, get_all_api_categories, get_apis_by_category,
-                             get_api_by_name, get_api_distribution, get_all_api_names,
-                             get_complexity_distribution)
+from export import EXPORT_FORMATS, export_file, export_path
+from facets import where
+from metrics import REGISTRY, measure, start_timer, timed
+from modules_data import (module_catalog, get_module_distribution, get_age_distribution, get_module_by_name,
+                          get_all_categories, get_modules_page, search_modules, filter_modules,
+                          get_module_facet_counts)
+from api_integrations import (api_catalog, get_all_api_categories, get_api_by_name, get_api_distribution,
+                              get_complexity_distribution, get_apis_page, search_apis, filter_apis,
+                              get_api_facet_counts)
+from similarity import get_similar_modules, get_suggested_apis, get_related_modules, get_similar_apis
+from education_data import DATASETS, read_rollup, rollups_version
+
+# Derived frames and charts are cached across reruns and sessions. Each cached
+# function takes the catalog version it was built from as its cache key, and
+# max_entries bounds how many versions are kept around.
+#
+# pandas, Altair and Plotly are imported inside the functions that use them so
+# that sections without charts, like the Module Explorer, start without them.
+@st.cache_data(max_entries=4)
+def load_module_distribution_frame(catalog_version):
+    import pandas as pd
+    
+    distribution = get_module_distribution()
+    return pd.DataFrame({
+        "Category": distribution["categories"],
+        "Number of Modules": distribution["counts"]
+    })
+
+@st.cache_data(max_entries=4)
+def load_age_distribution_frame(catalog_version):
+    import pandas as pd
+    
+    age_dist = get_age_distribution()
+    return pd.DataFrame({
+        "Age Group": age_dist["age_buckets"],
+        "Number of Modules": age_dist["counts"]
+    })
+
+@st.cache_data(max_entries=4)
+def load_api_distribution_frame(catalog_version):
+    import pandas as pd
+    
+    api_dist = get_api_distribution()
+    return pd.DataFrame({
+        "Category": api_dist["categories"],
+        "Number of APIs": api_dist["counts"]
+    })
+
+@st.cache_data(max_entries=4)
+def load_complexity_frame(catalog_version):
+    import pandas as pd
+    
+    complexity = get_complexity_distribution()
+    return pd.DataFrame({
+        "Complexity": complexity["complexities"],
+        "Number of APIs": complexity["counts"]
+    })
+
+@st.cache_resource(max_entries=4)
+def build_module_distribution_chart(catalog_version):
+    import altair as alt
+    
+    df_distribution = load_module_distribution_frame(catalog_version)
+    return alt.Chart(df_distribution).mark_bar().encode(
+        x=alt.X('Category', sort='-y'),
+        y='Number of Modules',
+        color=alt.Color('Category', scale=alt.Scale(scheme='category10'))
+    ).properties(
+        height=400
+    )
+
+@st.cache_resource(max_entries=4)
+def build_age_distribution_chart(catalog_version):
+    import altair as alt
+    
+    df_age_dist = load_age_distribution_frame(catalog_version)
+    return alt.Chart(df_age_dist).mark_bar().encode(
+        x=alt.X('Age Group', sort=None),
+        y='Number of Modules'
+    ).properties(
+        height=300
+    )
+
+@st.cache_resource(max_entries=4)
+def build_api_distribution_chart(catalog_version):
+    import plotly.express as px
+    
+    df_api_dist = load_api_distribution_frame(catalog_version)
+    return px.pie(
+        df_api_dist, 
+        values="Number of APIs", 
+        names="Category",
+        title="API Distribution by Category",
+        color_discrete_sequence=px.colors.qualitative.Safe
+    )
+
+@st.cache_resource(max_entries=4)
+def build_complexity_chart(catalog_version):
+    import plotly.express as px
+    
+    df_complexity = load_complexity_frame(catalog_version)
+    return px.bar(
+        df_complexity,
+        x="Complexity",
+        y="Number of APIs",
+        color="Complexity",
+        color_discrete_map={
+            "Low": "#4CAF50",
+            "Medium": "#FFC107",
+            "High": "#F44336"
+        }
+    )
+
+# Education Data API rollups are keyed by the version of the rollup files
+# written by education_data.py, since they change apart from the catalogs
+@st.cache_data(max_entries=8)
+def load_education_rollup(dataset, name, rollups_version):
+    return read_rollup(dataset, name)
+
+@st.cache_resource(max_entries=8)
+def build_education_state_chart(dataset, year, rollups_version):
+    import plotly.express as px
+    
+    spec = DATASETS[dataset]
+    column, label = spec["measure"]
+    df_states = load_education_rollup(dataset, "by_state", rollups_version)
+    df_states = df_states[df_states["year"] == year].copy()
+    hover = [spec["noun"]]
+    if "teachers_fte" in df_states:
+        df_states["Students per teacher"] = (df_states["enrollment"] / df_states["teachers_fte"]).round(1)
+        hover.append("Students per teacher")
+    df_states = df_states.rename(columns={spec["state"]: "State", "rows": spec["noun"], column: label})
+    return px.bar(
+        df_states.sort_values(label, ascending=False),
+        x="State",
+        y=label,
+        hover_data=hover,
+        title=f"{label} by state, {year}"
+    )
+
+@st.cache_resource(max_entries=8)
+def build_education_trend_chart(dataset, rollups_version):
+    import altair as alt
+    
+    spec = DATASETS[dataset]
+    column, group_label, labels = spec["group"]
+    df_groups = load_education_rollup(dataset, "by_group", rollups_version)
+    df_groups[group_label] = df_groups[column].map(
+        lambda code: "Missing" if code != code else labels.get(code, f"Code {int(code)}")
+    )
+    df_groups = df_groups.rename(columns={"year": "Year", "rows": spec["noun"]})
+    return alt.Chart(df_groups).mark_line(point=True).encode(
+        x='Year:O',
+        y=f'sum({spec["noun"]}):Q',
+        color=group_label
+    ).properties(
+        title=f"{spec['noun']} by {group_label.lower()} and year",
+        height=350
+    )
+
+@st.cache_resource
+def last_seen_catalog_versions():
+    return {}
+
+# Drop every cached frame and chart once a catalog's content has changed
+def invalidate_stale_caches():
+    seen = last_seen_catalog_versions()
+    current = {"modules": module_catalog.version, "apis": api_catalog.version}
+    if seen and seen != current:
+        for cached in (load_module_distribution_frame, load_age_distribution_frame,
+                       load_api_distribution_frame, load_complexity_frame,
+                       build_module_distribution_chart, build_age_distribution_chart,
+                       build_api_distribution_chart, build_complexity_chart):
+            cached.clear()
+    seen.update(current)
+
+# Category listings are paged so each rerun renders a bounded number of elements
+LISTING_PAGE_SIZE = 20
+
+# Get the cursor of the page currently picked for a listing
+def page_cursor(page_key):
+    return (st.session_state.get(page_key, 1) - 1) * LISTING_PAGE_SIZE
+
+# Describe which slice of a listing is on screen
+def describe_page(page, noun, scope="in this category"):
+    if not page["total"]:
+        return f"No {noun} {scope}."
+    first = page["cursor"] + 1
+    last = page["cursor"] + len(page["records"])
+    return f"Showing {first}-{last} of {page['total']} {noun}"
+
+# Show a page picker once a listing spans more than one page
+def render_page_picker(page, page_key):
+    page_count = -(-page["total"] // LISTING_PAGE_SIZE)
+    if page_count > 1:
+        st.number_input("Page", min_value=1, max_value=page_count, step=1, key=page_key)
+
+# Label facet values with how many records have them
+def facet_label(counts):
+    return lambda value: f"{value} ({counts.get(value, 0)})"
+
+# Summarize how the filtered records spread over one facet's values
+def describe_facet(counts):
+    return " · ".join(f"{value} ({count})" for value, count in counts.items() if count)
+
+# Render items as a single markdown bullet list
+def bullet_list(items):
+    return "\n".join(f"- {item}" for item in items)
+
+# Show recommended records with their category and how closely they match
+def render_matches(title, matches):
+    if matches:
+        st.markdown(f"**{title}:**\n" + bullet_list(
+            f"{record['name']} ({record['category']}) · {score:.0%} match" for record, score in matches
+        ))
+
+# Labels of the export formats offered for download
+EXPORT_LABELS = {"parquet": "Parquet", "csv": "CSV", "jsonl": "JSON Lines"}
+
+# Offer the whole catalog as a file. The export is streamed to disk in
+# batches once per catalog version and format, only when first asked for,
+# and the download button reads it from there.
+@st.fragment
+@timed("block", "Catalog export")
+def render_catalog_export(name, noun):
+    export_format = st.radio(
+        "Export format",
+        list(EXPORT_FORMATS),
+        format_func=EXPORT_LABELS.get,
+        horizontal=True,
+        key=f"{name}_export_format"
+    )
+    path = export_path(name, export_format)
+    if not os.path.exists(path):
+        st.caption(f"Exports all {noun}, with list fields as list columns.")
+        if not st.button(f"Export {noun}", key=f"{name}_export_prepare"):
+            return
+        import pyarrow as pa
+
+        try:
+            with st.spinner(f"Exporting {noun}..."):
+                path = export_file(name, export_format)
+        except (OSError, pa.ArrowException) as error:
+            st.error(f"Could not export {noun}: {error}")
+            return
+    suffix, mime = EXPORT_FORMATS[export_format]
+    with open(path, "rb") as handle:
+        st.download_button(
+            f"Download {noun} ({EXPORT_LABELS[export_format]})",
+            handle,
+            file_name=f"eduverse-{name}{suffix}",
+            mime=mime,
+            key=f"{name}_export_download"
+        )
+
+# Tables of the recorded latencies, one per kind of timed block
+PERFORMANCE_TABLES = [
+    ("section", "Sections", "Section"),
+    ("block", "Rendering blocks", "Block"),
+    ("accessor", "Catalog accessors", "Function"),
+]
+
+# Show p50/p95/p99 latency per section, block and accessor, refreshed while
+# the section is open
+@st.fragment(run_every=5)
+def render_performance():
+    import pandas as pd
+    
+    for kind, title, label in PERFORMANCE_TABLES:
+        st.subheader(title)
+        # Blocks and accessors are registered before their first call
+        summaries = {name: summary for (_, name), summary in REGISTRY.summaries(kind).items() if summary["count"]}
+        if not summaries:
+            st.info("Nothing recorded yet.")
+            continue
+        rows = []
+        for name, summary in summaries.items():
+            row = {
+                label: name,
+                "Calls": summary["count"],
+                "p50 (ms)": summary["p50_s"] * 1000,
+                "p95 (ms)": summary["p95_s"] * 1000,
+                "p99 (ms)": summary["p99_s"] * 1000,
+                "Max (ms)": summary["max_s"] * 1000,
+            }
+            if summary["mean_retained_bytes"] is not None:
+                row["Mean retained (KiB)"] = summary["mean_retained_bytes"] / 1024
+            rows.append(row)
+        st.dataframe(pd.DataFrame(rows), hide_index=True, use_container_width=True)
+        if any("Mean retained (KiB)" in row for row in rows):
+            st.caption("Mean retained is the net memory a call left allocated, as traced by tracemalloc; "
+                       "memory freed before the call returned is not counted.")
+
+# Each explorer tab is a fragment: changing one of its widgets reruns and
+# resends only that tab, not the page config, sidebar or the other tabs.
+# Switching sections still reruns the whole app.
+
+# Browse modules one category at a time
+@st.fragment
+@timed("block", "Module Explorer: Browse by Category")
+def render_module_browser():
+    # Category selection
+    category = st.selectbox(
+        "Select a module category",
+        get_all_categories()
+    )
+    
+    # Optional age filter, answered from the age-range interval index
+    age = st.number_input(
+        "Suitable for age",
+        min_value=0,
+        max_value=99,
+        value=None,
+        step=1,
+        placeholder="Any age"
+    )
+    
+    # Display modules in the selected category
+    st.subheader(f"Modules in {category}")
+    
+    # Only the current page of the category is fetched and rendered
+    module_page_key = f"module_page_{category}_{age}"
+    module_page = get_modules_page(
+        category,
+        page_cursor(module_page_key),
+        LISTING_PAGE_SIZE,
+        age
+    )
+    st.caption(describe_page(module_page, "modules"))
+    
+    with measure("block", "Module Explorer: module expanders"):
+        for module in module_page["records"]:
+            with st.expander(f"{module['name']} - {module['age_range']}"):
+                st.markdown(f"**Description:** {module['description']}")
+                
+                st.markdown("**Key Features:**\n" + bullet_list(module['features']))
+    
+    render_page_picker(module_page, module_page_key)
+
+# Search the module catalog
+@st.fragment
+@timed("block", "Module Explorer: Search Modules")
+def render_module_search():
+    # Full-text search over names, descriptions and features
+    module_query = st.text_input(
+        "Search modules",
+        placeholder="Try a module name, topic or feature"
+    )
+    
+    if module_query:
+        matches = search_modules(module_query, limit=25)
+        module = None
+        if matches:
+            module_name = st.selectbox(
+                "Select a module",
+                [match['name'] for match in matches]
+            )
+            module = get_module_by_name(module_name)
+        
+        if module:
+            st.subheader(module['name'])
+            st.markdown(f"**Category:** {module['category']}")
+            st.markdown(f"**Age Range:** {module['age_range']}")
+            st.markdown(f"**Description:** {module['description']}")
+        
+            st.markdown("**Key Features:**")
+            for feature in module['features']:
+                st.markdown(f"- {feature}")
+        
+            render_matches("Suggested APIs", get_suggested_apis(module['name']))
+            render_matches("Similar Modules", get_similar_modules(module['name']))
+        else:
+            st.error("No modules match your search.")
+    else:
+        st.info("Type a name, topic or feature to search the module catalog.")
+
+# Filter modules by several facets at once
+@st.fragment
+@timed("block", "Module Explorer: Filter Modules")
+def render_module_filters():
+    # Values picked within a facet are ORed, facets are ANDed, and
+    # excluded keywords are NOTed, all as bitmap operations
+    module_totals = get_module_facet_counts(where())
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        picked_categories = st.multiselect(
+            "Categories",
+            list(module_totals["category"]),
+            format_func=facet_label(module_totals["category"])
+        )
+        picked_age_buckets = st.multiselect(
+            "Age groups",
+            list(module_totals["age_bucket"]),
+            format_func=facet_label(module_totals["age_bucket"])
+        )
+    with col2:
+        feature_options = sorted(module_totals["feature"])
+        picked_features = st.multiselect(
+            "Feature keywords",
+            feature_options,
+            format_func=facet_label(module_totals["feature"])
+        )
+        excluded_features = st.multiselect(
+            "Exclude feature keywords",
+            feature_options,
+            format_func=facet_label(module_totals["feature"])
+        )
+    
+    module_filter = where(category=picked_categories, age_bucket=picked_age_buckets, feature=picked_features)
+    if excluded_features:
+        module_filter = module_filter & ~where(feature=excluded_features)
+    
+    # Only the category and age group counts are shown, so the feature
+    # keyword popcounts are skipped
+    module_counts = get_module_facet_counts(module_filter, ["category", "age_bucket"])
+    st.caption(f"By category: {describe_facet(module_counts['category'])}")
+    st.caption(f"By age group: {describe_facet(module_counts['age_bucket'])}")
+    
+    filter_page_key = f"module_filter_page_{picked_categories}_{picked_age_buckets}_{picked_features}_{excluded_features}"
+    filter_page = filter_modules(module_filter, page_cursor(filter_page_key), LISTING_PAGE_SIZE)
+    st.caption(describe_page(filter_page, "modules", "match these filters"))
+    
+    for module in filter_page["records"]:
+        with st.expander(f"{module['name']} - {module['age_range']}"):
+            st.markdown(f"**Category:** {module['category']}")
+            st.markdown(f"**Description:** {module['description']}")
+            
+            st.markdown("**Key Features:**\n" + bullet_list(module['features']))
+    
+    render_page_picker(filter_page, filter_page_key)
+
+# Browse APIs one category at a time
+@st.fragment
+@timed("block", "API Integrations: Browse by Category")
+def render_api_browser():
+    # Category selection
+    api_category = st.selectbox(
+        "Select an API category",
+        get_all_api_categories()
+    )
+    
+    # Display APIs in the selected category
+    st.subheader(f"APIs in {api_category}")
+    
+    # Only the current page of the category is fetched and rendered
+    api_page_key = f"api_page_{api_category}"
+    api_page = get_apis_page(
+        api_category,
+        page_cursor(api_page_key),
+        LISTING_PAGE_SIZE
+    )
+    st.caption(describe_page(api_page, "APIs"))
+    
+    with measure("block", "API Integrations: API expanders"):
+        for api in api_page["records"]:
+            with st.expander(api['name']):
+                st.markdown(f"**Description:** {api['description']}")
+                
+                st.markdown("**Use Cases:**\n" + bullet_list(api['use_cases']))
+                
+                st.markdown(f"**Implementation Complexity:** {api['implementation_complexity']}")
+                st.markdown(f"**Documentation:** [Link]({api['documentation_url']})")
+    
+    render_page_picker(api_page, api_page_key)
+
+# Search the API catalog
+@st.fragment
+@timed("block", "API Integrations: Search APIs")
+def render_api_search():
+    # Full-text search over names, descriptions and use cases
+    api_query = st.text_input(
+        "Search APIs",
+        placeholder="Try an API name, topic or use case"
+    )
+    
+    if api_query:
+        matches = search_apis(api_query, limit=25)
+        api = None
+        if matches:
+            api_name = st.selectbox(
+                "Select an API",
+                [match['name'] for match in matches]
+            )
+            api = get_api_by_name(api_name)
+        
+        if api:
+            st.subheader(api['name'])
+            st.markdown(f"**Category:** {api['category']}")
+            st.markdown(f"**Description:** {api['description']}")
+        
+            st.markdown("**Use Cases:**")
+            for use_case in api['use_cases']:
+                st.markdown(f"- {use_case}")
+        
+            st.markdown(f"**Implementation Complexity:** {api['implementation_complexity']}")
+            st.markdown(f"**Documentation:** [Link]({api['documentation_url']})")
+        
+            render_matches("Related Modules", get_related_modules(api['name']))
+            render_matches("Similar APIs", get_similar_apis(api['name']))
+        else:
+            st.error("No APIs match your search.")
+    else:
+        st.info("Type a name, topic or use case to search the API catalog.")
+
+# Chart the Education Data API datasets ingested with education_data.py.
+# Only their small precomputed rollups are read, never the rows.
+@st.fragment
+@timed("block", "API Integrations: Education Data")
+def render_education_data():
+    dataset = st.selectbox(
+        "Dataset",
+        list(DATASETS),
+        format_func=lambda name: DATASETS[name]["title"]
+    )
+    
+    version = rollups_version(dataset)
+    if version is None:
+        st.info(
+            f"No {DATASETS[dataset]['title']} data has been ingested yet. "
+            f"Run `python education_data.py ingest {dataset} <year>` to fetch it."
+        )
+        return
+    
+    years = sorted(load_education_rollup(dataset, "by_state", version)["year"].unique(), reverse=True)
+    year = st.selectbox("Year", [int(year) for year in years])
+    
+    st.plotly_chart(build_education_state_chart(dataset, year, version), use_container_width=True)
+    st.altair_chart(build_education_trend_chart(dataset, version), use_container_width=True)
+
+# Filter APIs by several facets at once
+@st.fragment
+@timed("block", "API Integrations: Filter APIs")
+def render_api_filters():
+    # Values picked within a facet are ORed, facets are ANDed, and
+    # excluded keywords are NOTed, all as bitmap operations
+    api_totals = get_api_facet_counts(where())
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        picked_api_categories = st.multiselect(
+            "Categories",
+            list(api_totals["category"]),
+            format_func=facet_label(api_totals["category"])
+        )
+        picked_complexities = st.multiselect(
+            "Implementation complexity",
+            list(api_totals["complexity"]),
+            format_func=facet_label(api_totals["complexity"])
+        )
+    with col2:
+        use_case_options = sorted(api_totals["use_case"])
+        picked_use_cases = st.multiselect(
+            "Use-case keywords",
+            use_case_options,
+            format_func=facet_label(api_totals["use_case"])
+        )
+        excluded_use_cases = st.multiselect(
+            "Exclude use-case keywords",
+            use_case_options,
+            format_func=facet_label(api_totals["use_case"])
+        )
+    
+    api_filter = where(category=picked_api_categories, complexity=picked_complexities, use_case=picked_use_cases)
+    if excluded_use_cases:
+        api_filter = api_filter & ~where(use_case=excluded_use_cases)
+    
+    api_counts = get_api_facet_counts(api_filter, ["category", "complexity"])
+    st.caption(f"By category: {describe_facet(api_counts['category'])}")
+    st.caption(f"By complexity: {describe_facet(api_counts['complexity'])}")
+    
+    api_filter_page_key = f"api_filter_page_{picked_api_categories}_{picked_complexities}_{picked_use_cases}_{excluded_use_cases}"
+    api_filter_page = filter_apis(api_filter, page_cursor(api_filter_page_key), LISTING_PAGE_SIZE)
+    st.caption(describe_page(api_filter_page, "APIs", "match these filters"))
+    
+    for api in api_filter_page["records"]:
+        with st.expander(api['name']):
+            st.markdown(f"**Category:** {api['category']}")
+            st.markdown(f"**Description:** {api['description']}")
+            
+            st.markdown("**Use Cases:**\n" + bullet_list(api['use_cases']))
+            
+            st.markdown(f"**Implementation Complexity:** {api['implementation_complexity']}")
+    
+    render_page_picker(api_filter_page, api_filter_page_key)
 
 # Configure the page
 st.set_page_config(
@@ -16,6 +595,9 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Runs after set_page_config, which must be the first Streamlit command
+invalidate_stale_caches()
+
 # Title and logo
 col1, col2 = st.columns([1, 3])
 with col1:
@@ -28,9 +610,13 @@ with col2:
 st.sidebar.header("Navigation")
 section = st.sidebar.radio(
     "Select a section:",
-    ["Overview", "Module Explorer", "API Integrations"]
+    ["Overview", "Performance", "Module Explorer", "API Integrations"],
+    key="section"
 )
 
+# Full runs of each section are timed; fragment reruns are timed per tab
+stop_section_timer = start_timer("section", section)
+
 # Overview section
 if section == "Overview":
     st.header("🎓 EduVerse Overview")
@@ -45,40 +631,26 @@ if section == "Overview":
     # Display module distribution chart
     st.subheader("Module Distribution by Category")
     
-    distribution = get_module_distribution()
-    df_distribution = pd.DataFrame({
-        "Category": distribution["categories"],
-        "Number of Modules": distribution["counts"]
-    })
+    with measure("block", "Overview: module distribution chart"):
+        chart = build_module_distribution_chart(module_catalog.version)
+        
+        st.altair_chart(chart, use_container_width=True)
     
-    chart = alt.Chart(df_distribution).mark_bar().encode(
-        x=alt.X('Category', sort='-y'),
-        y='Number of Modules',
-        color=alt.Color('Category', scale=alt.Scale(scheme='category10'))
-    ).properties(
-        height=400
-    )
+    # Display module distribution by age group
+    st.subheader("Modules by Age Group")
     
-    st.altair_chart(chart, use_container_width=True)
+    with measure("block", "Overview: age group chart"):
+        age_chart = build_age_distribution_chart(module_catalog.version)
+        
+        st.altair_chart(age_chart, use_container_width=True)
     
     # Display API integration distribution
     st.subheader("API Integration Categories")
     
-    api_dist = get_api_distribution()
-    df_api_dist = pd.DataFrame({
-        "Category": api_dist["categories"],
-        "Number of APIs": api_dist["counts"]
-    })
-    
-    api_chart = px.pie(
-        df_api_dist, 
-        values="Number of APIs", 
-        names="Category",
-        title="API Distribution by Category",
-        color_discrete_sequence=px.colors.qualitative.Safe
-    )
-    
-    st.plotly_chart(api_chart, use_container_width=True)
+    with measure("block", "Overview: API category chart"):
+        api_chart = build_api_distribution_chart(api_catalog.version)
+        
+        st.plotly_chart(api_chart, use_container_width=True)
     
     # Technology stack
     st.subheader("Technology Stack")
@@ -105,52 +677,55 @@ if section == "Overview":
         st.markdown("**Gamification**")
         st.write("Pygame or Unity integration for advanced features")
 
+# Performance section
+elif section == "Performance":
+    st.header("⏱️ Performance")
+    
+    st.write("""
+    Latency of every dashboard section, rendering block and catalog accessor
+    served by this process since it started. Percentiles are estimated from
+    latency histograms, and the tables refresh every few seconds.
+    """)
+    
+    render_performance()
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.download_button(
+            "Download Prometheus metrics",
+            REGISTRY.prometheus_text(),
+            file_name="eduverse-metrics.prom",
+            mime="text/plain"
+        )
+    with col2:
+        st.download_button(
+            "Download JSON metrics",
+            REGISTRY.as_json(),
+            file_name="eduverse-metrics.json",
+            mime="application/json"
+        )
+    with col3:
+        if st.button("Reset measurements"):
+            REGISTRY.reset()
+            st.rerun()
+
 # Module Explorer section
 elif section == "Module Explorer":
     st.header("📚 Module Explorer")
     
-    tab1, tab2 = st.tabs(["Browse by Category", "Search Modules"])
+    tab1, tab2, tab3, tab4 = st.tabs(["Browse by Category", "Search Modules", "Filter Modules", "Export"])
     
     with tab1:
-        # Category selection
-        category = st.selectbox(
-            "Select a module category",
-            get_all_categories()
-        )
-        
-        # Display modules in the selected category
-        st.subheader(f"Modules in {category}")
-        
-        modules = get_modules_by_category(category)
-        
-        for i, module in enumerate(modules):
-            with st.expander(f"{module['name']} - {module['age_range']}"):
-                st.markdown(f"**Description:** {module['description']}")
-                
-                st.markdown("**Key Features:**")
-                for feature in module['features']:
-                    st.markdown(f"- {feature}")
+        render_module_browser()
     
     with tab2:
-        # Search by module name
-        module_name = st.selectbox(
-            "Select a module",
-            get_all_module_names()
-        )
-        
-        module = get_module_by_name(module_name)
-        
-        if module:
-            st.subheader(module['name'])
-            st.markdown(f"**Category:** {module['category']}")
-            st.markdown(f"**Age Range:** {module['age_range']}")
-            st.markdown(f"**Description:** {module['description']}")
-            
-            st.markdown("**Key Features:**")
-            for feature in module['features']:
-                st.markdown(f"- {feature}")
-        else:
-            st.error("Module not found. Please select a valid module name.")
+        render_module_search()
+    
+    with tab3:
+        render_module_filters()
+    
+    with tab4:
+        render_catalog_export("modules", "modules")
 
 # API Integrations section
 elif section == "API Integrations":
@@ -161,77 +736,27 @@ elif section == "API Integrations":
     and provide rich educational experiences. Explore the available API integrations below.
     """)
     
-    tab1, tab2, tab3 = st.tabs(["Browse by Category", "Search APIs", "Implementation Complexity"])
+    tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(
+        ["Browse by Category", "Search APIs", "Filter APIs", "Implementation Complexity", "Education Data", "Export"]
+    )
     
     with tab1:
-        # Category selection
-        api_category = st.selectbox(
-            "Select an API category",
-            get_all_api_categories()
-        )
-        
-        # Display APIs in the selected category
-        st.subheader(f"APIs in {api_category}")
-        
-        apis = get_apis_by_category(api_category)
-        
-        for api in apis:
-            with st.expander(api['name']):
-                st.markdown(f"**Description:** {api['description']}")
-                
-                st.markdown("**Use Cases:**")
-                for use_case in api['use_cases']:
-                    st.markdown(f"- {use_case}")
-                
-                st.markdown(f"**Implementation Complexity:** {api['implementation_complexity']}")
-                st.markdown(f"**Documentation:** [Link]({api['documentation_url']})")
+        render_api_browser()
     
     with tab2:
-        # Search by API name
-        api_name = st.selectbox(
-            "Select an API",
-            get_all_api_names()
-        )
-        
-        api = get_api_by_name(api_name)
-        
-        if api:
-            st.subheader(api['name'])
-            st.markdown(f"**Category:** {api['category']}")
-            st.markdown(f"**Description:** {api['description']}")
-            
-            st.markdown("**Use Cases:**")
-            for use_case in api['use_cases']:
-                st.markdown(f"- {use_case}")
-            
-            st.markdown(f"**Implementation Complexity:** {api['implementation_complexity']}")
-            st.markdown(f"**Documentation:** [Link]({api['documentation_url']})")
-        else:
-            st.error("API not found. Please select a valid API name.")
+        render_api_search()
     
     with tab3:
+        render_api_filters()
+    
+    with tab4:
         # Display API complexity distribution
         st.subheader("API Implementation Complexity")
         
-        complexity = get_complexity_distribution()
-        df_complexity = pd.DataFrame({
-            "Complexity": complexity["complexities"],
-            "Number of APIs": complexity["counts"]
-        })
-        
-        complexity_chart = px.bar(
-            df_complexity,
-            x="Complexity",
-            y="Number of APIs",
-            color="Complexity",
-            color_discrete_map={
-                "Low": "#4CAF50",
-                "Medium": "#FFC107",
-                "High": "#F44336"
-            }
-        )
-        
-        st.plotly_chart(complexity_chart, use_container_width=True)
+        with measure("block", "API Integrations: complexity chart"):
+            complexity_chart = build_complexity_chart(api_catalog.version)
+            
+            st.plotly_chart(complexity_chart, use_container_width=True)
         
         # Implementation notes
         st.markdown("### Implementation Notes")
@@ -244,6 +769,14 @@ elif section == "API Integrations":
         
         All API integrations should implement proper error handling, rate limiting consideration, and caching where appropriate.
         """)
+    
+    with tab5:
+        render_education_data()
+    
+    with tab6:
+        render_catalog_export("apis", "APIs")
+
+stop_section_timer()
 
 # Footer
 st.markdown("---")
@@ -0,0 +1,229 @@
+"""
+This module load-tests the dashboard with many concurrent browser sessions
+to find how many one Streamlit process can serve.
+
+It starts the app with ``streamlit run`` in headless mode and, for each
+concurrency level, opens that many websocket sessions at once (see
+rerun_report.Session). Every session follows its own seeded script the way
+a visitor would: it switches sidebar sections, picks categories and ages
+to browse by, pausing for a random think time between actions.
+Opening an expander happens in the browser without a rerun, so it only
+shows up as think time.
+
+For each level the report gives the rerun latency percentiles, the server's
+CPU use, how many such sessions one core sustains, and how much the server's
+resident memory grew per session. The concurrency limit is the last level
+whose p95 latency stayed within --slo:
+
+    python streamlit_loadtest.py
+    python streamlit_loadtest.py --sessions 1 10 25 50 100 --duration 30 --think 2
+    python streamlit_loadtest.py --json load.json
+
+Server CPU and memory are read from /proc, so the tool runs on Linux. The
+sessions are driven from one asyncio client process that shares the machine
+with the server; its CPU use is reported too.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+from rerun_report import APP_PATH, Session, free_port, start_server
+
+# Sidebar options sessions move between, by their index in the radio.
+# Performance refreshes itself on a timer, which would muddle the timings.
+SECTION_LABEL = "Select a section:"
+SECTIONS = {"Overview": 0, "Module Explorer": 2, "API Integrations": 3}
+
+# What a session can do in each section: (weight, widget label, kind of
+# value to pick)
+ACTIONS = {
+    "Overview": [],
+    "Module Explorer": [
+        (4, "Select a module category", "option"),
+        (1, "Suitable for age", "age"),
+    ],
+    "API Integrations": [
+        (4, "Select an API category", "option"),
+    ],
+}
+
+# Chance that a session switches section instead of acting within one
+SWITCH_PROBABILITY = 0.3
+
+
+# Read the CPU seconds and resident bytes of a process from /proc
+def process_usage(pid):
+    with open(f"/proc/{pid}/stat", encoding="ascii") as handle:
+        # Fields after the command name, which may contain spaces
+        fields = handle.read().rsplit(")", 1)[1].split()
+    cpu_seconds = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    with open(f"/proc/{pid}/statm", encoding="ascii") as handle:
+        resident_pages = int(handle.read().split()[1])
+    return cpu_seconds, resident_pages * os.sysconf("SC_PAGE_SIZE")
+
+
+# Pick the next (label, value) for a session in a section, or None to
+# switch to another section
+def next_action(session, section, rng):
+    choices = [action for action in ACTIONS[section] if action[1] in session.widgets]
+    if not choices or rng.random() < SWITCH_PROBABILITY:
+        return None
+    _, label, kind = rng.choices(choices, weights=[weight for weight, _, _ in choices])[0]
+    if kind == "option":
+        return label, rng.randrange(session.options.get(label, 1))
+    return label, rng.randint(5, 18)
+
+
+# Drive one session until the deadline, appending each rerun's latency
+async def run_session(port, seed, deadline, think, latencies, errors):
+    from tornado.websocket import websocket_connect
+
+    rng = random.Random(seed)
+    # Sessions arrive spread over the first think time, not all at once
+    await asyncio.sleep(rng.uniform(0, think))
+    try:
+        connection = await websocket_connect(
+            f"ws://127.0.0.1:{port}/_stcore/stream", subprotocols=["streamlit"]
+        )
+    except OSError as error:
+        errors.append(f"connect: {error}")
+        return
+    session = Session(connection)
+    section = "Overview"
+    try:
+        latencies.append((await session.rerun())["latency_s"])
+        while True:
+            await asyncio.sleep(rng.expovariate(1 / think) if think else 0)
+            if time.perf_counter() >= deadline:
+                return
+            action = next_action(session, section, rng)
+            if action is None:
+                section = rng.choice([name for name in SECTIONS if name != section])
+                action = SECTION_LABEL, SECTIONS[section]
+            result = await session.interact(*action)
+            latencies.append(result["latency_s"])
+    except Exception as error:
+        errors.append(f"{type(error).__name__}: {error}")
+    finally:
+        connection.close()
+
+
+# Run one concurrency level and sample the server while it runs
+async def run_level(port, server_pid, sessions, duration, think, seed):
+    latencies = []
+    errors = []
+    samples = []
+    cpu_before, rss_before = process_usage(server_pid)
+    client_before = time.process_time()
+    started = time.perf_counter()
+    deadline = started + duration
+
+    async def sample():
+        while time.perf_counter() < deadline:
+            samples.append(process_usage(server_pid)[1])
+            await asyncio.sleep(0.5)
+
+    sampler = asyncio.ensure_future(sample())
+    await asyncio.gather(*(
+        run_session(port, seed * 100003 + index, deadline, think, latencies, errors)
+        for index in range(sessions)
+    ))
+    await sampler
+    elapsed = time.perf_counter() - started
+    cpu_after, rss_after = process_usage(server_pid)
+    return {
+        "sessions": sessions,
+        "latencies": latencies,
+        "errors": errors,
+        "elapsed_s": elapsed,
+        "server_cpu_s": cpu_after - cpu_before,
+        "client_cpu_s": time.process_time() - client_before,
+        "rss_before": rss_before,
+        "rss_peak": max(samples + [rss_after]),
+    }
+
+
+# Reduce one level's raw results to the reported figures
+def summarize(level):
+    ordered = sorted(level["latencies"])
+
+    def percentile(q):
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q))] if ordered else None
+
+    cores_used = level["server_cpu_s"] / level["elapsed_s"]
+    return {
+        "sessions": level["sessions"],
+        "reruns": len(ordered),
+        "reruns_per_s": len(ordered) / level["elapsed_s"],
+        "p50_s": statistics.median(ordered) if ordered else None,
+        "p95_s": percentile(0.95),
+        "p99_s": percentile(0.99),
+        "errors": len(level["errors"]),
+        "server_cores": cores_used,
+        "sessions_per_core": level["sessions"] / cores_used if cores_used else None,
+        "client_cores": level["client_cpu_s"] / level["elapsed_s"],
+        "rss_growth_per_session_bytes": (level["rss_peak"] - level["rss_before"]) / level["sessions"],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find how many concurrent sessions one dashboard process serves.")
+    parser.add_argument("--app", default=APP_PATH, help="path of the Streamlit script to load-test")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 5, 10, 25, 50],
+                        help="concurrency levels to run, in order")
+    parser.add_argument("--duration", type=float, default=20, help="seconds each level runs for")
+    parser.add_argument("--think", type=float, default=1.0, help="mean seconds a session waits between actions")
+    parser.add_argument("--slo", type=float, default=0.5, help="p95 rerun latency in seconds a level must meet")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    port = free_port()
+    server = start_server(args.app, port)
+    levels = []
+    try:
+        # One session warms up imports and caches before anything is measured
+        asyncio.run(run_level(port, server.pid, 1, 3, 0.2, args.seed))
+        for sessions in args.sessions:
+            level = summarize(asyncio.run(run_level(port, server.pid, sessions, args.duration, args.think, args.seed)))
+            levels.append(level)
+            print(f"{sessions:4d} sessions: p95 {level['p95_s'] * 1000 if level['p95_s'] else float('nan'):8.1f}ms"
+                  f"  {level['errors']} errors", file=sys.stderr)
+    finally:
+        server.terminate()
+        server.wait()
+
+    limit = None
+    for level in levels:
+        if level["errors"] or level["p95_s"] is None or level["p95_s"] > args.slo:
+            break
+        limit = level["sessions"]
+
+    print(f"{'sessions':>8s} {'reruns/s':>9s} {'p50':>8s} {'p95':>8s} {'p99':>8s} {'errors':>6s}"
+          f" {'server cores':>12s} {'sessions/core':>13s} {'RSS/session':>11s}")
+    for level in levels:
+        def ms(value):
+            return f"{value * 1000:6.1f}ms" if value is not None else f"{'-':>8s}"
+
+        per_core = f"{level['sessions_per_core']:13.1f}" if level["sessions_per_core"] else f"{'-':>13s}"
+        print(f"{level['sessions']:8d} {level['reruns_per_s']:9.1f} {ms(level['p50_s'])} {ms(level['p95_s'])}"
+              f" {ms(level['p99_s'])} {level['errors']:6d} {level['server_cores']:12.2f} {per_core}"
+              f" {level['rss_growth_per_session_bytes'] / 2**20:9.2f}MB")
+    if limit is None:
+        print(f"No level kept p95 within {args.slo * 1000:.0f}ms")
+    else:
+        print(f"Concurrency limit: {limit} sessions with p95 within {args.slo * 1000:.0f}ms")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as handle:
+            json.dump({"slo_s": args.slo, "think_s": args.think, "limit": limit, "levels": levels}, handle, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
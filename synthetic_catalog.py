@@ -0,0 +1,82 @@
+"""
+This module generates synthetic module and API catalogs for benchmarks and
+load tests.
+
+Synthetic records are built from the real ones in modules_data.py and
+api_integrations.py, so they have the same shape and realistic text. The
+generator is seeded, so every run at a given size produces the same catalog.
+"""
+
+import random
+
+import api_integrations
+import modules_data
+from catalog import Catalog
+from columnar import ColumnarTable
+
+
+# Collect the vocabulary used by a list of records
+def _vocabulary(records, fields):
+    words = set()
+    for record in records:
+        for field in fields:
+            value = record.get(field, "")
+            text = value if isinstance(value, str) else " ".join(value)
+            words.update(text.split())
+    return sorted(words)
+
+
+# Generate count module records shaped like the seed modules
+def generate_modules(count, seed=0):
+    rng = random.Random(seed)
+    templates = modules_data.all_modules
+    words = _vocabulary(templates, ("description", "features"))
+    modules = []
+    for i in range(count):
+        template = templates[i % len(templates)]
+        modules.append({
+            "name": f"{template['name']} {i}",
+            "description": " ".join(rng.choices(words, k=14)),
+            "features": [" ".join(rng.choices(words, k=3)) for _ in range(3)],
+            "category": template["category"],
+            "age_range": template["age_range"]
+        })
+    return modules
+
+
+# Generate count API records shaped like the seed integrations
+def generate_apis(count, seed=0):
+    rng = random.Random(seed)
+    templates = api_integrations.api_integrations
+    words = _vocabulary(templates, ("description", "use_cases"))
+    apis = []
+    for i in range(count):
+        template = templates[i % len(templates)]
+        apis.append({
+            "name": f"{template['name']} {i}",
+            "category": template["category"],
+            "description": " ".join(rng.choices(words, k=10)),
+            "use_cases": [" ".join(rng.choices(words, k=6)) for _ in range(3)],
+            "implementation_complexity": rng.choice(api_integrations.COMPLEXITY_LEVELS),
+            "documentation_url": template["documentation_url"]
+        })
+    return apis
+
+
+# Swap the live catalogs for synthetic ones of the given sizes. Code that
+# imports modules_data / api_integrations afterwards, including
+# streamlit_app.py on its next rerun, sees the synthetic data. With compact
+# set the records are stored in columnar form.
+def install(module_count, api_count=None, seed=0, compact=False):
+    if api_count is None:
+        api_count = module_count
+    modules = generate_modules(module_count, seed)
+    apis = generate_apis(api_count, seed)
+    if compact:
+        modules = ColumnarTable(modules, modules_data.MODULE_COLUMNS)
+        apis = ColumnarTable(apis, api_integrations.API_COLUMNS)
+    modules_data.all_modules = modules
+    modules_data.module_catalog = Catalog(modules, modules_data.module_views(), modules_data.module_facets())
+    api_integrations.api_integrations = apis
+    api_integrations.api_catalog = Catalog(apis, api_integrations.api_views(), api_integrations.api_facets())
+    return modules, apis
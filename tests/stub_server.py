@@ -0,0 +1,70 @@
+import asyncio
+import json
+
+
+class StubServer:
+    """Local HTTP/1.1 server answering from a handler, for client tests.
+
+    ``handler(request)`` gets a dict with the method, target, lowercased
+    headers and the number of the request on the server, and returns
+    ``(status, headers, body)``; it may be a coroutine function. Keep-alive
+    is honoured, and every request and connection is counted.
+    """
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.requests = []
+        self.connections = 0
+        self._server = None
+        self._writers = set()
+
+    async def __aenter__(self):
+        self._server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{self.port}"
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self._server.close()
+        for writer in self._writers:
+            writer.close()
+        await self._server.wait_closed()
+
+    # A registry lookup for ApiClient that points every provider at the stub
+    def registry(self, requests_per_minute=None):
+        def lookup(name):
+            return {"name": name, "base_url": self.base_url, "requests_per_minute": requests_per_minute}
+
+        return lookup
+
+    async def _serve(self, reader, writer):
+        self.connections += 1
+        self._writers.add(writer)
+        try:
+            while request_line := await reader.readline():
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                if "content-length" in headers:
+                    await reader.readexactly(int(headers["content-length"]))
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                request = {"method": method, "target": target, "headers": headers, "number": len(self.requests)}
+                self.requests.append(request)
+                result = self.handler(request)
+                if asyncio.iscoroutine(result):
+                    result = await result
+                status, response_headers, body = result
+                if isinstance(body, (dict, list)):
+                    body = json.dumps(body).encode("utf-8")
+                lines = [f"HTTP/1.1 {status} Stub"]
+                lines += [f"{name}: {value}" for name, value in response_headers.items()]
+                if status != 304:
+                    lines.append(f"Content-Length: {len(body)}")
+                writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + (b"" if status == 304 else body))
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
@@ -0,0 +1,144 @@
+import math
+import random
+
+import pytest
+
+from age_index import AgeIndex, parse_age_range
+from catalog import Catalog
+from facets import where
+from modules_data import module_facets
+
+
+# Make a random age range in one of the forms the catalog uses
+def random_age_range(rng):
+    youngest = rng.randint(0, 25)
+    form = rng.randrange(5)
+    if form == 0:
+        return f"{youngest}-{youngest + rng.randint(0, 10)} years"
+    if form == 1:
+        return f"{youngest} to {youngest + rng.randint(0, 10)}"
+    if form == 2:
+        return f"{youngest}+ years"
+    if form == 3:
+        return f"{youngest} years"
+    return rng.choice(["All ages", "", None])
+
+
+def random_records(rng, count, start=0):
+    return [
+        {"name": f"Module {index}", "category": rng.choice("ABC"), "age_range": random_age_range(rng)}
+        for index in range(start, start + count)
+    ]
+
+
+# Get the slots whose age range overlaps youngest..oldest by checking each one
+def linear(records, youngest, oldest=None):
+    if oldest is None:
+        oldest = youngest
+    matches = []
+    for slot, record in records.items():
+        interval = parse_age_range(record["age_range"])
+        if interval is not None and interval[0] <= oldest and interval[1] >= youngest:
+            matches.append(slot)
+    return sorted(matches)
+
+
+def random_queries(rng, count):
+    queries = []
+    for _ in range(count):
+        youngest = rng.randint(-2, 40)
+        queries.append((youngest, None))
+        queries.append((youngest, youngest + rng.randint(0, 15)))
+    return queries + [(0, math.inf), (30, math.inf)]
+
+
+@pytest.mark.parametrize("text, interval", [
+    ("5-12 years", (5, 12)),
+    ("5 – 12", (5, 12)),
+    ("5 to 12", (5, 12)),
+    ("12-5", (5, 12)),
+    ("14+ years", (14, math.inf)),
+    ("16 years", (16, 16)),
+    ("All ages", None),
+    ("", None),
+    (None, None),
+])
+def test_age_ranges_parse_to_inclusive_intervals(text, interval):
+    assert parse_age_range(text) == interval
+
+
+def test_queries_match_a_linear_filter():
+    rng = random.Random(0)
+    records = dict(enumerate(random_records(rng, 400)))
+    index = AgeIndex()
+    for slot, record in records.items():
+        index.add(slot, record)
+    assert len(index) == len(linear(records, 0, math.inf))
+    for youngest, oldest in random_queries(rng, 100):
+        assert index.slots(youngest, oldest) == linear(records, youngest, oldest)
+
+
+def test_open_ended_and_single_ages():
+    index = AgeIndex()
+    for slot, age_range in enumerate(["14+ years", "16 years", "5-12 years", "All ages"]):
+        index.add(slot, {"age_range": age_range})
+    assert index.slots(99) == [0]
+    assert index.slots(16) == [0, 1]
+    assert index.slots(15) == [0]
+    assert index.slots(13) == []
+    assert index.slots(12, 14) == [0, 2]
+    assert index.slots(0, 4) == []
+
+
+def test_removing_slots_matches_a_linear_filter():
+    rng = random.Random(1)
+    records = dict(enumerate(random_records(rng, 300)))
+    index = AgeIndex()
+    for slot, record in records.items():
+        index.add(slot, record)
+    next_slot = len(records)
+    for step in range(300):
+        if rng.random() < 0.6 and records:
+            slot = rng.choice(list(records))
+            index.remove(slot, records.pop(slot))
+        else:
+            records[next_slot] = random_records(rng, 1, next_slot)[0]
+            index.add(next_slot, records[next_slot])
+            next_slot += 1
+        if step % 20 == 0:
+            for youngest, oldest in random_queries(rng, 10):
+                assert index.slots(youngest, oldest) == linear(records, youngest, oldest)
+    # Emptied intervals are dropped rather than kept with no slots
+    for slot in list(records):
+        index.remove(slot, records.pop(slot))
+    assert len(index) == 0 and index.intervals(0, math.inf) == []
+
+
+def test_catalog_changes_keep_age_queries_in_step():
+    rng = random.Random(2)
+    catalog = Catalog(random_records(rng, 200), facets=module_facets())
+    for step in range(300):
+        names = catalog.names()
+        action = rng.random()
+        if action < 0.2:
+            catalog.remove(rng.choice(names))
+        elif action < 0.4:
+            catalog.add(random_records(rng, 1, 1000 + step)[0])
+        else:
+            catalog.update(rng.choice(names), age_range=random_age_range(rng))
+        if step % 20 == 0:
+            records = dict(enumerate(catalog))
+            for youngest, oldest in random_queries(rng, 10):
+                expected = [records[slot] for slot in linear(records, youngest, oldest)]
+                assert catalog.get_by_age(youngest, oldest) == expected
+                page = catalog.filter_by_age(where(category=["A", "B"]), youngest, oldest, 0, 1000)
+                assert page["records"] == [record for record in expected if record["category"] in "AB"]
+                assert page["total"] == len(page["records"])
+
+
+def test_filter_by_age_pages_through_the_matches():
+    catalog = Catalog(random_records(random.Random(3), 200), facets=module_facets())
+    everything = catalog.filter_by_age(where(), 10, None, 0, 1000)["records"]
+    pages = [catalog.filter_by_age(where(), 10, None, cursor, 7) for cursor in range(0, len(everything), 7)]
+    assert [record for page in pages for record in page["records"]] == everything
+    assert all(page["total"] == len(everything) for page in pages)
@@ -0,0 +1,75 @@
+import random
+from collections import Counter
+from operator import itemgetter
+
+from aggregates import AggregateView
+from catalog import Catalog
+from modules_data import AGE_BUCKETS, age_bucket, module_views
+from synthetic_catalog import generate_modules
+
+
+def counts(snapshot):
+    return dict(zip(snapshot["buckets"], snapshot["counts"]))
+
+
+def test_fixed_buckets_are_always_reported_in_order():
+    view = AggregateView(itemgetter("size"), ["small", "large"])
+    assert view.snapshot() == {"buckets": ["small", "large"], "counts": [0, 0]}
+    view.add({"size": "huge"})
+    view.add({"size": "large"})
+    assert view.snapshot() == {"buckets": ["small", "large", "huge"], "counts": [0, 1, 1]}
+    view.remove({"size": "large"})
+    view.remove({"size": "huge"})
+    # Other buckets go once empty; the fixed ones stay at zero
+    assert view.snapshot() == {"buckets": ["small", "large"], "counts": [0, 0]}
+
+
+def test_reset_forgets_every_record():
+    view = AggregateView(itemgetter("size"), ["small"])
+    view.add({"size": "small"})
+    view.add({"size": "large"})
+    view.reset()
+    assert view.snapshot() == {"buckets": ["small"], "counts": [0]}
+
+
+def test_incremental_counts_match_a_recount():
+    rng = random.Random(0)
+    records = generate_modules(300)
+    catalog = Catalog(records[:200], module_views())
+    pending = records[200:]
+    categories = sorted({record["category"] for record in records}) + ["Brand New"]
+    ages = ["5-7 years", "9-12 years", "15+ years", "19 years", "someday"]
+
+    for step in range(500):
+        action = rng.random()
+        if action < 0.3 and pending:
+            catalog.add(pending.pop())
+        elif action < 0.6 and len(catalog):
+            catalog.remove(rng.choice(catalog.names()))
+        elif len(catalog):
+            name = rng.choice(catalog.names())
+            if rng.random() < 0.5:
+                catalog.update(name, category=rng.choice(categories))
+            else:
+                catalog.update(name, age_range=rng.choice(ages))
+
+        if step % 25 == 0:
+            current = list(catalog)
+            assert counts(catalog.aggregate("category")) == Counter(record["category"] for record in current)
+            by_age = catalog.aggregate("age_bucket")
+            # Age groups keep their order and stay even when empty
+            assert by_age["buckets"][:len(AGE_BUCKETS)] == [label for label, _ in AGE_BUCKETS]
+            expected = dict.fromkeys(by_age["buckets"][:len(AGE_BUCKETS)], 0)
+            expected.update(Counter(age_bucket(record) for record in current))
+            assert counts(by_age) == expected
+
+
+def test_distribution_uses_the_category_view():
+    catalog = Catalog(generate_modules(40))
+    catalog.update(catalog.names()[0], category="Brand New")
+    catalog.remove(catalog.names()[1])
+    assert catalog.distribution() == {
+        "categories": catalog.aggregate("category")["buckets"],
+        "counts": catalog.aggregate("category")["counts"],
+    }
+    assert counts(catalog.aggregate("category")) == Counter(record["category"] for record in catalog)
@@ -0,0 +1,148 @@
+import asyncio
+import time
+
+import pytest
+
+from api_client import ApiClient, ApiClientError, HttpError, TokenBucket
+from stub_server import StubServer
+
+
+def ok(request):
+    return 200, {"Content-Type": "application/json"}, {"target": request["target"]}
+
+
+def test_connections_are_reused():
+    async def run():
+        async with StubServer(ok) as server:
+            async with ApiClient(registry=server.registry()) as client:
+                for index in range(5):
+                    response = await client.get("Stub", f"/items/{index}", params={"page": 2})
+                    assert response.json() == {"target": f"/items/{index}?page=2"}
+            return server.connections, len(server.requests)
+
+    assert asyncio.run(run()) == (1, 5)
+
+
+def test_token_bucket_paces_after_the_burst():
+    async def run():
+        bucket = TokenBucket(rate=20, capacity=1)
+        started = time.monotonic()
+        for _ in range(5):
+            await bucket.acquire()
+        return time.monotonic() - started
+
+    # One token up front, then one every 50ms
+    assert asyncio.run(run()) >= 0.19
+
+
+def test_provider_rate_limit_paces_requests():
+    async def run():
+        async with StubServer(ok) as server:
+            # 120 a minute is 2 a second with a burst of 2
+            async with ApiClient(registry=server.registry(requests_per_minute=120)) as client:
+                started = time.monotonic()
+                await client.fetch_many("Stub", ["/a", "/b", "/c", "/d"])
+                return time.monotonic() - started
+
+    assert asyncio.run(run()) >= 0.9
+
+
+@pytest.mark.parametrize("status", [500, 502, 503, 504])
+def test_server_errors_are_retried(status):
+    def flaky(request):
+        if request["number"] < 2:
+            return status, {}, b"busy"
+        return ok(request)
+
+    async def run():
+        async with StubServer(flaky) as server:
+            async with ApiClient(registry=server.registry(), backoff=0.01) as client:
+                response = await client.get("Stub", "/items")
+            return response.status, len(server.requests)
+
+    assert asyncio.run(run()) == (200, 3)
+
+
+def test_retry_after_is_honoured_on_429():
+    def limited(request):
+        if request["number"] == 0:
+            return 429, {"Retry-After": "1"}, b""
+        return ok(request)
+
+    async def run():
+        async with StubServer(limited) as server:
+            async with ApiClient(registry=server.registry(), backoff=0.01) as client:
+                started = time.monotonic()
+                response = await client.get("Stub", "/items")
+                return response.status, time.monotonic() - started
+
+    status, elapsed = asyncio.run(run())
+    assert status == 200
+    assert elapsed >= 0.95
+
+
+def test_exhausted_retries_raise_http_error():
+    async def run():
+        async with StubServer(lambda request: (503, {}, b"down")) as server:
+            async with ApiClient(registry=server.registry(), retries=2, backoff=0.01) as client:
+                with pytest.raises(HttpError) as error:
+                    await client.get("Stub", "/items")
+            return error.value.response.status, len(server.requests)
+
+    assert asyncio.run(run()) == (503, 3)
+
+
+def test_client_errors_are_not_retried():
+    async def run():
+        async with StubServer(lambda request: (404, {}, b"missing")) as server:
+            async with ApiClient(registry=server.registry(), backoff=0.01) as client:
+                with pytest.raises(HttpError):
+                    await client.get("Stub", "/missing")
+            return len(server.requests)
+
+    assert asyncio.run(run()) == 1
+
+
+def test_slow_responses_time_out():
+    async def slow(request):
+        await asyncio.sleep(1)
+        return ok(request)
+
+    async def run():
+        async with StubServer(slow) as server:
+            async with ApiClient(registry=server.registry(), timeout=0.1, retries=1, backoff=0.01) as client:
+                started = time.monotonic()
+                with pytest.raises(ApiClientError):
+                    await client.get("Stub", "/items")
+                return time.monotonic() - started, len(server.requests)
+
+    elapsed, requests = asyncio.run(run())
+    assert elapsed < 0.9
+    assert requests == 2
+
+
+def test_not_modified_is_an_http_error():
+    def conditional(request):
+        return 304, {"ETag": '"v1"'}, b""
+
+    async def run():
+        async with StubServer(conditional) as server:
+            async with ApiClient(registry=server.registry()) as client:
+                with pytest.raises(HttpError) as error:
+                    await client.get("Stub", "/items", headers={"If-None-Match": '"v1"'})
+            return error.value.response, server.requests[0]["headers"]
+
+    response, headers = asyncio.run(run())
+    assert response.status == 304
+    assert response.body == b""
+    assert response.headers["etag"] == '"v1"'
+    assert headers["if-none-match"] == '"v1"'
+
+
+def test_unknown_provider_is_rejected():
+    async def run():
+        async with ApiClient(registry=lambda name: None) as client:
+            await client.get("Nobody", "/")
+
+    with pytest.raises(ApiClientError):
+        asyncio.run(run())
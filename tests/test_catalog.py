@@ -0,0 +1,96 @@
+import pytest
+
+from catalog import Catalog
+
+
+def record(name, category, **fields):
+    return {"name": name, "category": category, **fields}
+
+
+@pytest.fixture
+def catalog():
+    return Catalog([
+        record("Fractions", "Math"),
+        record("Volcanoes", "Science"),
+        record("Decimals", "Math"),
+        record("Geometry", "Math"),
+    ])
+
+
+def names(records):
+    return [record["name"] for record in records]
+
+
+def test_lookups_follow_catalog_order(catalog):
+    assert catalog.get_by_name("Decimals") == record("Decimals", "Math")
+    assert catalog.get_by_name("Nothing") is None
+    assert names(catalog.get_by_category("Math")) == ["Fractions", "Decimals", "Geometry"]
+    assert catalog.categories() == ["Math", "Science"]
+    assert catalog.names() == ["Fractions", "Volcanoes", "Decimals", "Geometry"]
+
+
+def test_update_keeps_a_record_in_place_within_its_category(catalog):
+    catalog.update("Decimals", description="Place value")
+    assert names(catalog.get_by_category("Math")) == ["Fractions", "Decimals", "Geometry"]
+    assert catalog.get_by_name("Decimals")["description"] == "Place value"
+    assert names(catalog) == ["Fractions", "Volcanoes", "Decimals", "Geometry"]
+    page = catalog.get_page("Math", cursor=1, page_size=1)
+    assert names(page["records"]) == ["Decimals"]
+
+
+def test_changing_category_moves_to_the_end_of_the_new_one(catalog):
+    catalog.update("Fractions", category="Science")
+    assert names(catalog.get_by_category("Math")) == ["Decimals", "Geometry"]
+    assert names(catalog.get_by_category("Science")) == ["Volcanoes", "Fractions"]
+    # The catalog order itself does not change
+    assert catalog.names() == ["Fractions", "Volcanoes", "Decimals", "Geometry"]
+    assert catalog.distribution() == {"categories": ["Math", "Science"], "counts": [2, 2]}
+
+
+def test_remove_clears_the_name_and_category_indexes(catalog):
+    removed = catalog.remove("Volcanoes")
+    assert removed["name"] == "Volcanoes"
+    assert catalog.get_by_name("Volcanoes") is None
+    assert "Volcanoes" not in catalog._by_name
+    assert "Science" not in catalog._by_category
+    assert catalog.categories() == ["Math"]
+    assert catalog.get_by_category("Science") == []
+    assert len(catalog) == 3
+    with pytest.raises(KeyError):
+        catalog.remove("Volcanoes")
+
+    catalog.remove("Decimals")
+    assert list(catalog._by_category["Math"].values()) == [record("Fractions", "Math"), record("Geometry", "Math")]
+
+
+def test_removing_the_first_of_two_names_exposes_the_second():
+    catalog = Catalog([record("Quiz", "Math", level=1), record("Quiz", "Science", level=2)])
+    assert catalog.get_by_name("Quiz")["level"] == 1
+    catalog.remove("Quiz")
+    assert catalog.get_by_name("Quiz")["level"] == 2
+    catalog.remove("Quiz")
+    assert catalog._by_name == {}
+
+
+def test_version_changes_on_every_change(catalog):
+    seen = [catalog.version]
+    catalog.add(record("Maps", "Geography"))
+    seen.append(catalog.version)
+    catalog.update("Maps", description="Atlases")
+    seen.append(catalog.version)
+    catalog.update("Maps", category="Science")
+    seen.append(catalog.version)
+    catalog.remove("Maps")
+    seen.append(catalog.version)
+    assert all(before != after for before, after in zip(seen, seen[1:]))
+    # The version is a hash of the content, so it is stable between reads
+    assert catalog.version == seen[-1]
+    assert Catalog(list(catalog)).version == catalog.version
+
+
+def test_search_sees_records_after_changes(catalog):
+    assert names(catalog.search("volcanoes")) == ["Volcanoes"]
+    catalog.add(record("Eruptions", "Science", description="Volcanoes and lava"))
+    assert "Eruptions" in names(catalog.search("volcanoes"))
+    catalog.remove("Volcanoes")
+    assert names(catalog.search("volcanoes")) == ["Eruptions"]
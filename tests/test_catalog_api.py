@@ -0,0 +1,129 @@
+import asyncio
+import gzip
+import json
+
+import pytest
+
+import catalog_api
+import modules_data
+
+
+# Send one request straight to the ASGI app and collect the response
+def request(path, query="", method="GET", headers=None):
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "query_string": query.encode("latin-1"),
+        "headers": [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in (headers or {}).items()],
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(catalog_api.app(scope, receive, send))
+    start, body = messages
+    return start["status"], {name.decode(): value.decode() for name, value in start["headers"]}, body["body"]
+
+
+def test_names_are_served_as_json():
+    status, headers, body = request("/modules/names")
+    assert status == 200
+    assert headers["content-type"] == "application/json"
+    assert int(headers["content-length"]) == len(body)
+    assert json.loads(body) == modules_data.get_all_module_names()
+
+
+def test_matching_etag_answers_not_modified():
+    _, headers, _ = request("/modules/categories")
+    status, revalidated, body = request("/modules/categories", headers={"If-None-Match": headers["etag"]})
+    assert status == 304
+    assert body == b""
+    assert revalidated["etag"] == headers["etag"]
+    assert "content-length" not in revalidated
+
+
+def test_stale_etag_gets_the_full_body():
+    status, _, body = request("/modules/categories", headers={"If-None-Match": '"stale"'})
+    assert status == 200
+    assert json.loads(body) == modules_data.get_all_categories()
+
+
+def test_large_bodies_are_gzipped_when_accepted(monkeypatch):
+    # The bundled catalogs are small, so gzip every body
+    monkeypatch.setattr(catalog_api, "MIN_GZIP_SIZE", 0)
+    status, headers, body = request("/modules/names", headers={"Accept-Encoding": "gzip, br"})
+    assert status == 200
+    assert headers["content-encoding"] == "gzip"
+    assert headers["etag"].endswith('-gz"')
+    assert headers["vary"] == "Accept-Encoding"
+    assert int(headers["content-length"]) == len(body)
+    assert json.loads(gzip.decompress(body)) == modules_data.get_all_module_names()
+
+
+def test_gzip_etag_revalidates_either_variant(monkeypatch):
+    monkeypatch.setattr(catalog_api, "MIN_GZIP_SIZE", 0)
+    _, headers, _ = request("/modules/names", headers={"Accept-Encoding": "gzip"})
+    status, _, _ = request("/modules/names", headers={"If-None-Match": headers["etag"]})
+    assert status == 304
+
+
+def test_small_bodies_are_not_gzipped():
+    status, headers, body = request("/version", headers={"Accept-Encoding": "gzip"})
+    assert status == 200
+    assert len(body) < catalog_api.MIN_GZIP_SIZE
+    assert "content-encoding" not in headers
+    assert headers["etag"].endswith('"') and not headers["etag"].endswith('-gz"')
+
+
+def test_head_sends_headers_only():
+    status, headers, body = request("/modules/names", method="HEAD")
+    assert status == 200
+    assert body == b""
+    assert int(headers["content-length"]) > 0
+
+
+def test_lookup_by_name():
+    name = modules_data.get_all_module_names()[0]
+    status, _, body = request(f"/modules/by-name/{name}")
+    assert status == 200
+    assert json.loads(body)["name"] == name
+
+
+@pytest.mark.parametrize("path", [
+    "/nowhere",
+    "/modules",
+    "/modules/unknown-endpoint",
+    "/modules/names/extra",
+    "/modules/by-name/No such module",
+    "/apis/by-name/No such API",
+])
+def test_unknown_paths_are_not_found(path):
+    status, _, body = request(path)
+    assert status == 404
+    assert "error" in json.loads(body)
+
+
+@pytest.mark.parametrize("path, query", [
+    ("/modules/search", ""),
+    ("/modules/search", "q=%20"),
+    ("/modules/search", "q=math&limit=0"),
+    ("/modules/search", "q=math&limit=ten"),
+    ("/apis/search", f"q=quiz&limit={catalog_api.MAX_SEARCH_LIMIT + 1}"),
+    ("/modules/by-category/Math", "page_size=0"),
+    ("/modules/by-category/Math", "cursor=-1"),
+    ("/modules/by-name", ""),
+])
+def test_malformed_parameters_are_bad_requests(path, query):
+    status, _, body = request(path, query)
+    assert status == 400
+    assert "error" in json.loads(body)
+
+
+def test_only_get_and_head_are_allowed():
+    status, _, _ = request("/modules/names", method="POST")
+    assert status == 405
@@ -0,0 +1,101 @@
+import os
+
+import pytest
+
+from catalog import Catalog
+from catalog_store import STORE_TYPES, open_catalog
+from facets import where
+from modules_data import module_facets, module_views
+from synthetic_catalog import generate_modules
+
+
+@pytest.fixture(params=[".jsonl", ".db"])
+def suffix(request):
+    return request.param
+
+
+@pytest.fixture
+def records():
+    return generate_modules(150)
+
+
+@pytest.fixture
+def store(tmp_path, suffix, records):
+    return open_catalog(str(tmp_path / f"modules{suffix}"), records, module_views(), module_facets())
+
+
+@pytest.fixture
+def catalog(records):
+    return Catalog(records, module_views(), module_facets())
+
+
+# Rewrite a store's file with new records, moving its mtime on so the
+# change is seen even within the filesystem's timestamp resolution
+def rewrite(store, suffix, records):
+    stat = os.stat(store.path)
+    STORE_TYPES[suffix][1](store.path, records)
+    os.utime(store.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_lookups_match_the_catalog(store, catalog, records):
+    assert len(store) == len(catalog)
+    assert list(store) == list(catalog)
+    assert store.names() == catalog.names()
+    assert store.categories() == catalog.categories()
+    assert store.distribution() == catalog.distribution()
+    for name in (records[0]["name"], records[77]["name"], "Nothing"):
+        assert store.get_by_name(name) == catalog.get_by_name(name)
+    for category in catalog.categories() + ["Nothing"]:
+        assert store.get_by_category(category) == catalog.get_by_category(category)
+
+
+@pytest.mark.parametrize("cursor, page_size", [(0, 5), (5, 5), (12, 20), (1000, 5)])
+def test_pages_match_the_catalog(store, catalog, cursor, page_size):
+    for category in catalog.categories():
+        assert store.get_page(category, cursor, page_size) == catalog.get_page(category, cursor, page_size)
+
+
+def test_filters_match_the_catalog(store, catalog):
+    categories = catalog.categories()
+    expressions = [
+        where(category=categories[:2]),
+        where(category=["K-12 Foundational Learning", "Cybersecurity Education"], age_bucket=["Upper elementary"]),
+        ~where(category=categories[:1]),
+        where(feature=["interactive"]) | where(category=categories[-1:]),
+    ]
+    for expression in expressions:
+        for cursor in (0, 7):
+            assert store.filter(expression, cursor, 10) == catalog.filter(expression, cursor, 10)
+        assert store.facet_counts(expression) == catalog.facet_counts(expression)
+        assert store.filter_by_age(expression, 9, 15) == catalog.filter_by_age(expression, 9, 15)
+    assert store.get_by_age(7) == catalog.get_by_age(7)
+    assert store.get_by_age(3, 9) == catalog.get_by_age(3, 9)
+    assert store.aggregate("age_bucket") == catalog.aggregate("age_bucket")
+
+
+def test_changes_on_disk_are_reloaded(store, suffix, records):
+    version = store.version
+    store.search("interactive")
+    rewrite(store, suffix, records[:10] + [{**records[10], "name": "Renamed"}])
+
+    assert len(store) == 11
+    assert store.version != version
+    assert store.get_by_name("Renamed")["category"] == records[10]["category"]
+    assert store.get_by_name(records[20]["name"]) is None
+    assert store.names() == [record["name"] for record in records[:10]] + ["Renamed"]
+    assert store.aggregate("category")["counts"] == Catalog(records[:11]).aggregate("category")["counts"]
+    assert store.search("renamed") == [{**records[10], "name": "Renamed"}]
+    assert store.facet_counts(where())["category"] == Catalog(records[:11], facets=module_facets()).facet_counts(
+        where()
+    )["category"]
+
+
+def test_unchanged_files_are_not_reloaded(store, monkeypatch):
+    store.names()
+
+    def fail(stamp):
+        raise AssertionError("reloaded an unchanged file")
+
+    monkeypatch.setattr(store, "_load", fail)
+    store.names()
+    store.get_by_age(8)
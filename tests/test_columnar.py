@@ -0,0 +1,87 @@
+import json
+
+import pytest
+
+from api_integrations import API_COLUMNS
+from columnar import ColumnarTable, RowView
+from modules_data import MODULE_COLUMNS
+from synthetic_catalog import generate_apis, generate_modules
+
+RECORDS = [
+    {"name": "Fractions", "description": "Parts of a whole", "features": ["Pizza", "Quiz"], "category": "Math"},
+    {"name": "Volcanoes", "description": "", "features": [], "category": "Science", "age_range": "8-12 years"},
+    {"name": "Geometry", "features": ["Quiz"], "category": "Math", "level": 3},
+    {"name": "Émile", "description": "Ünïcödé ✓", "features": ["Pizza"], "category": "Français", "level": None},
+]
+
+
+@pytest.fixture
+def table():
+    return ColumnarTable(RECORDS, MODULE_COLUMNS)
+
+
+def test_rows_read_back_as_the_original_records(table):
+    assert len(table) == len(RECORDS)
+    for row, record in zip(table, RECORDS):
+        assert isinstance(row, RowView)
+        assert dict(row) == record
+        assert row == record
+        assert len(row) == len(record)
+        assert set(row) == set(record)
+
+
+def test_fields_are_read_like_a_dict(table):
+    row = table[0]
+    assert row["name"] == "Fractions"
+    assert row["features"] == ["Pizza", "Quiz"]
+    assert row.get("age_range") is None
+    assert row.get("age_range", "All ages") == "All ages"
+    assert "age_range" not in row and "age_range" in table[1]
+    with pytest.raises(KeyError):
+        row["age_range"]
+    with pytest.raises(KeyError):
+        row["unknown"]
+    # Fields outside the schema are kept, and only rows that had them show them
+    assert table[2]["level"] == 3
+    assert "level" not in table[0]
+    assert table[3]["level"] is None and "level" in table[3]
+    assert dict(table[3].items()) == RECORDS[3]
+
+
+def test_rows_compare_by_content(table):
+    assert table[0] == ColumnarTable(RECORDS, MODULE_COLUMNS)[0]
+    assert table[0] != table[2]
+    assert table[0] != {**RECORDS[0], "category": "Science"}
+    assert table[0] != {key: value for key, value in RECORDS[0].items() if key != "features"}
+    assert repr(table[0]) == repr(RECORDS[0])
+
+
+def test_rows_serialize_like_dicts(table):
+    assert json.loads(json.dumps(table[1], default=dict)) == RECORDS[1]
+    assert [dict(row) for row in table] == RECORDS
+
+
+def test_indexing_and_columns(table):
+    assert table[-1] == RECORDS[-1]
+    assert table[1:3] == RECORDS[1:3]
+    with pytest.raises(IndexError):
+        table[len(RECORDS)]
+    with pytest.raises(IndexError):
+        table[-len(RECORDS) - 1]
+    assert table.column("category") == ["Math", "Science", "Math", "Français"]
+    assert table.column("age_range") == [None, "8-12 years", None, None]
+
+
+def test_empty_table():
+    table = ColumnarTable([], MODULE_COLUMNS)
+    assert len(table) == 0
+    assert list(table) == []
+    assert table.column("name") == []
+
+
+@pytest.mark.parametrize("generate, schema", [(generate_modules, MODULE_COLUMNS), (generate_apis, API_COLUMNS)])
+def test_synthetic_catalogs_round_trip(generate, schema):
+    records = generate(500)
+    table = ColumnarTable(records, schema)
+    assert [dict(row) for row in table] == records
+    assert table.nbytes() > 0
@@ -0,0 +1,165 @@
+import glob
+import json
+import os
+import threading
+from collections import Counter, defaultdict
+
+import pyarrow.parquet as pq
+import pytest
+
+import education_data
+from education_data import fixture_page, ingest_stubbed, read_rollup, rollups_version
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "education_data")
+
+
+def replay(dataset, year, page):
+    return fixture_page(FIXTURES, dataset, year, page)
+
+
+# The recorded rows of a dataset year, across every page
+def recorded_rows(dataset, year):
+    rows = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES, dataset, str(year), "page-*.json"))):
+        with open(path, encoding="utf-8") as handle:
+            rows.extend(json.load(handle)["results"])
+    return rows
+
+
+def hidden_entries(directory):
+    return [name for name in os.listdir(directory) if name.startswith(".")]
+
+
+def test_pages_are_followed_into_year_partitions(tmp_path):
+    report = ingest_stubbed("schools", [2019, 2020], replay, str(tmp_path), part_rows=4)
+
+    rows_dir = tmp_path / "schools" / "rows"
+    assert sorted(os.listdir(rows_dir)) == ["year=2019", "year=2020"]
+    assert report.years == [2019, 2020]
+    assert report.pages == 4
+    assert report.rows == len(recorded_rows("schools", 2019)) + len(recorded_rows("schools", 2020))
+    # 2020 comes in pages of 3, 2 and 2 rows: the first part closes at 5
+    assert sorted(os.listdir(rows_dir / "year=2020")) == ["part-00000.parquet", "part-00001.parquet"]
+    assert report.parts == 3
+    table = pq.read_table(rows_dir / "year=2020")
+    assert table.column("ncessch").to_pylist() == [row["ncessch"] for row in recorded_rows("schools", 2020)]
+    assert table.schema.names == list(education_data.DATASETS["schools"]["columns"])
+    assert not hidden_entries(rows_dir)
+
+
+def test_negative_codes_are_stored_as_nulls(tmp_path):
+    ingest_stubbed("schools", [2020], replay, str(tmp_path))
+    stored = pq.read_table(tmp_path / "schools" / "rows" / "year=2020").to_pylist()
+    recorded = recorded_rows("schools", 2020)
+    assert len(stored) == len(recorded)
+    for row, original in zip(stored, recorded):
+        for column in ("fips", "school_level", "charter", "enrollment", "teachers_fte"):
+            value = original[column]
+            if value < 0:
+                assert row[column] is None
+            else:
+                assert row[column] == pytest.approx(value)
+        assert row["school_name"] == original["school_name"]
+
+
+def test_rollups_total_the_recorded_rows(tmp_path):
+    ingest_stubbed("schools", [2019, 2020], replay, str(tmp_path), part_rows=2)
+    assert rollups_version("schools", str(tmp_path)) is not None
+
+    expected_rows = Counter()
+    reported = defaultdict(list)
+    for year in (2019, 2020):
+        for row in recorded_rows("schools", year):
+            expected_rows[year, row["state_location"]] += 1
+            if row["enrollment"] >= 0:
+                reported[year, row["state_location"]].append(row["enrollment"])
+    # A state where no school reported has no total, rather than zero
+    expected_enrollment = {key: sum(reported[key]) if reported[key] else None for key in expected_rows}
+    by_state = read_rollup("schools", "by_state", str(tmp_path))
+    assert {(row.year, row.state_location): row.rows for row in by_state.itertuples()} == dict(expected_rows)
+    assert {
+        (row.year, row.state_location): None if row.enrollment != row.enrollment else row.enrollment
+        for row in by_state.itertuples()
+    } == expected_enrollment
+
+    by_group = read_rollup("schools", "by_group", str(tmp_path))
+    levels = Counter(
+        (2020, row["school_level"] if row["school_level"] >= 0 else None) for row in recorded_rows("schools", 2020)
+    )
+    in_2020 = by_group[by_group.year == 2020]
+    assert {
+        (2020, None if level != level else int(level)): rows
+        for level, rows in zip(in_2020.school_level, in_2020.rows)
+    } == dict(levels)
+
+
+def test_colleges_count_institutions(tmp_path):
+    ingest_stubbed("colleges", [2021], replay, str(tmp_path))
+    by_group = read_rollup("colleges", "by_group", str(tmp_path))
+    assert by_group.rows.sum() == len(recorded_rows("colleges", 2021))
+    assert list(by_group.columns) == ["year", "sector", "rows"]
+
+
+def test_reingesting_a_year_replaces_it(tmp_path):
+    ingest_stubbed("schools", [2020], replay, str(tmp_path), part_rows=1)
+    assert len(os.listdir(tmp_path / "schools" / "rows" / "year=2020")) == 3
+    ingest_stubbed("schools", [2020], replay, str(tmp_path))
+    rows_dir = tmp_path / "schools" / "rows"
+    assert os.listdir(rows_dir / "year=2020") == ["part-00000.parquet"]
+    assert pq.read_table(rows_dir / "year=2020").num_rows == len(recorded_rows("schools", 2020))
+    assert not hidden_entries(rows_dir)
+
+
+def test_failed_swap_keeps_the_earlier_copy(tmp_path, monkeypatch):
+    ingest_stubbed("schools", [2020], replay, str(tmp_path))
+    rows_dir = tmp_path / "schools" / "rows"
+    rename = os.rename
+
+    def failing_rename(source, destination):
+        if os.path.basename(source).startswith(".year=") and not source.endswith(".old"):
+            raise OSError("disk full")
+        rename(source, destination)
+
+    monkeypatch.setattr(education_data.os, "rename", failing_rename)
+    with pytest.raises(OSError):
+        ingest_stubbed("schools", [2020], replay, str(tmp_path), part_rows=1)
+    assert os.listdir(rows_dir) == ["year=2020"]
+    assert pq.read_table(rows_dir / "year=2020").num_rows == len(recorded_rows("schools", 2020))
+
+
+def test_concurrent_runs_stage_separately(tmp_path, monkeypatch):
+    # Hold both runs at their second page, so both are staging at once
+    barrier = threading.Barrier(2, timeout=10)
+    staged = set()
+    write_part = education_data.write_part
+
+    def recording_write_part(directory, number, batches, schema):
+        staged.add(directory)
+        write_part(directory, number, batches, schema)
+
+    def held_replay(dataset, year, page):
+        if page == 2:
+            barrier.wait()
+        return replay(dataset, year, page)
+
+    monkeypatch.setattr(education_data, "write_part", recording_write_part)
+    errors = []
+
+    def run():
+        try:
+            ingest_stubbed("schools", [2020], held_replay, str(tmp_path), part_rows=1)
+        except OSError as error:
+            # Only the final swap may lose to the other run
+            errors.append(error)
+
+    threads = [threading.Thread(target=run) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(staged) == 2
+    assert len(errors) <= 1
+    rows_dir = tmp_path / "schools" / "rows"
+    assert os.listdir(rows_dir) == ["year=2020"]
+    assert pq.read_table(rows_dir / "year=2020").num_rows == len(recorded_rows("schools", 2020))
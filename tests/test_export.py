@@ -0,0 +1,82 @@
+import io
+import json
+import os
+import threading
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+import export
+import modules_data
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def export_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(export, "EXPORT_DIR", str(tmp_path / "exports"))
+    return tmp_path / "exports"
+
+
+def test_jsonl_export_has_every_module():
+    handle = io.BytesIO()
+    count = export.export("modules", "jsonl", handle, batch_size=3)
+    lines = handle.getvalue().decode("utf-8").splitlines()
+    assert count == len(lines) == len(modules_data.get_all_module_names())
+    assert [json.loads(line)["name"] for line in lines] == [module["name"] for module in modules_data.module_catalog]
+
+
+def test_parquet_export_reads_back():
+    import pyarrow.parquet as pq
+
+    handle = io.BytesIO()
+    count = export.export("apis", "parquet", handle, batch_size=2)
+    table = pq.read_table(io.BytesIO(handle.getvalue()))
+    assert table.num_rows == count
+    assert table.schema == export.arrow_schema(export.catalog_source("apis")[1])
+
+
+def test_concurrent_exports_leave_one_complete_file(export_dir):
+    barrier = threading.Barrier(4)
+    paths = []
+
+    def run():
+        barrier.wait()
+        paths.append(export.export_file("modules", "csv", batch_size=2))
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(paths) == 4 and len(set(paths)) == 1
+    assert os.listdir(export_dir) == [os.path.basename(paths[0])]
+    with open(paths[0], "rb") as handle:
+        expected = io.BytesIO()
+        export.export("modules", "csv", expected)
+        assert handle.read() == expected.getvalue()
+
+
+def test_failed_export_leaves_no_files(export_dir, monkeypatch):
+    def failing(records, columns, handle, batch_size):
+        handle.write(b"partial")
+        raise OSError("disk full")
+
+    monkeypatch.setitem(export.WRITERS, "jsonl", failing)
+    with pytest.raises(OSError):
+        export.export_file("modules", "jsonl")
+    assert os.listdir(export_dir) == []
+
+
+def test_export_errors_are_shown_in_the_app(tmp_path, monkeypatch):
+    # The export directory cannot be created under a regular file
+    blocker = tmp_path / "blocker"
+    blocker.write_text("")
+    monkeypatch.setattr(export, "EXPORT_DIR", str(blocker / "exports"))
+    monkeypatch.chdir(ROOT)
+    app = AppTest.from_file(os.path.join(ROOT, "streamlit_app.py"), default_timeout=60)
+    app.session_state["section"] = "Module Explorer"
+    app.run()
+    app.button(key="modules_export_prepare").click().run()
+    assert not app.exception, [exception.value for exception in app.exception]
+    assert [error.value for error in app.error if error.value.startswith("Could not export modules")]
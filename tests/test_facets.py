@@ -0,0 +1,123 @@
+import random
+
+import pytest
+
+from facets import Bitset, Everything, Facet, FacetIndex, set_positions, where
+
+COLORS = ["red", "green", "blue"]
+SIZES = ["small", "large"]
+TAGS = ["new", "sale", "eco", "gift"]
+
+
+@pytest.fixture
+def records():
+    rng = random.Random(0)
+    return [
+        {"color": rng.choice(COLORS), "size": rng.choice(SIZES), "tags": rng.sample(TAGS, rng.randint(0, 3))}
+        for _ in range(500)
+    ]
+
+
+@pytest.fixture
+def index(records):
+    index = FacetIndex({
+        "color": lambda record: [record["color"]],
+        "size": lambda record: [record["size"]],
+        "tag": lambda record: record["tags"],
+    })
+    for slot, record in enumerate(records):
+        index.add(slot, record)
+    return index
+
+
+def has(record, name, value):
+    return value in record["tags"] if name == "tag" else record[name] == value
+
+
+# Get the slots of the records a predicate accepts
+def matching(records, predicate):
+    return [slot for slot, record in enumerate(records) if predicate(record)]
+
+
+@pytest.mark.parametrize("positions", [[], [0], [7, 8], [0, 63, 64, 65, 1000], list(range(0, 300, 3))])
+def test_set_positions_lists_the_set_bits(positions):
+    bits = sum(1 << position for position in positions)
+    assert set_positions(bits) == positions
+    assert set_positions(bits, 1) == positions[1:]
+    assert set_positions(bits, 1, 2) == positions[1:3]
+    assert set_positions(bits, 0, 0) == []
+    assert set_positions(bits, len(positions) + 5) == []
+
+
+def test_bitset_updates_its_integer_form():
+    bitset = Bitset()
+    assert bitset.bits == 0
+    bitset.set(3)
+    bitset.set(70)
+    assert bitset.bits == (1 << 3) | (1 << 70)
+    bitset.clear(3)
+    assert bitset.bits == 1 << 70
+    bitset.clear(70)
+    assert bitset.bits == 0
+
+
+def test_and_or_not_match_brute_force(index, records):
+    cases = [
+        (Facet("color", "red"), lambda r: r["color"] == "red"),
+        (Everything(), lambda r: True),
+        (where(), lambda r: True),
+        (where(color=["red", "blue"]), lambda r: r["color"] in ("red", "blue")),
+        (where(color=["red"], size=["large"]), lambda r: r["color"] == "red" and r["size"] == "large"),
+        (where(tag=["new", "eco"], size=[]), lambda r: "new" in r["tags"] or "eco" in r["tags"]),
+        (~Facet("tag", "sale"), lambda r: "sale" not in r["tags"]),
+        (where(color=["green"]) & ~where(tag=["gift", "sale"]),
+         lambda r: r["color"] == "green" and not {"gift", "sale"} & set(r["tags"])),
+        (Facet("size", "small") | (Facet("color", "blue") & ~Facet("tag", "new")),
+         lambda r: r["size"] == "small" or (r["color"] == "blue" and "new" not in r["tags"])),
+        (~~Facet("color", "red"), lambda r: r["color"] == "red"),
+        (Facet("color", "purple"), lambda r: False),
+        (~Facet("color", "purple"), lambda r: True),
+    ]
+    for expression, predicate in cases:
+        assert set_positions(index.select(expression)) == matching(records, predicate)
+
+
+def test_counts_match_brute_force(index, records):
+    for expression, predicate in [
+        (where(), lambda r: True),
+        (where(size=["large"]), lambda r: r["size"] == "large"),
+        (where(color=["red"]) & ~where(tag=["eco"]), lambda r: r["color"] == "red" and "eco" not in r["tags"]),
+    ]:
+        selected = [record for record in records if predicate(record)]
+        counts = index.counts(index.select(expression))
+        for name, values in (("color", COLORS), ("size", SIZES), ("tag", TAGS)):
+            assert counts[name] == {
+                value: sum(1 for record in selected if has(record, name, value)) for value in values
+            }
+        # Values are reported in order of first appearance. The values of
+        # one record are indexed in set order, so only single-valued facets
+        # have a fixed order.
+        for name in ("color", "size"):
+            assert list(counts[name]) == list(dict.fromkeys(record[name] for record in records))
+
+
+def test_counts_can_be_limited_to_some_facets(index):
+    bits = index.select(where(size=["small"]))
+    everything = index.counts(bits)
+    assert index.counts(bits, ["color"]) == {"color": everything["color"]}
+    assert index.counts(bits, ["size", "color"]) == {"size": everything["size"], "color": everything["color"]}
+    assert index.counts(bits, []) == {}
+
+
+def test_removed_records_leave_the_bitmaps(index, records):
+    for slot in range(0, len(records), 2):
+        index.remove(slot, records[slot])
+    remaining = [slot for slot in range(len(records)) if slot % 2]
+    assert set_positions(index.universe) == remaining
+    assert set_positions(index.select(~Facet("color", "red"))) == [
+        slot for slot in remaining if records[slot]["color"] != "red"
+    ]
+    for slot in remaining:
+        index.remove(slot, records[slot])
+    # Values with no records left are dropped from the counts
+    assert index.counts(index.universe) == {"color": {}, "size": {}, "tag": {}}
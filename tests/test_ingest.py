@@ -0,0 +1,94 @@
+import json
+import os
+
+import pytest
+
+import ingest
+from catalog_store import STORE_TYPES
+
+
+def module(name, age_range="5-12 years", **fields):
+    return {"name": name, "description": "A module", "features": ["Quizzes"], "category": "Math",
+            "age_range": age_range, **fields}
+
+
+@pytest.fixture
+def batch(tmp_path):
+    lines = [
+        json.dumps(module("Fractions")),
+        json.dumps(module("Teens", age_range="teens")),
+        "not json",
+        json.dumps(module("Fractions", age_range="14+ years")),
+        "",
+        json.dumps(module("Reversed", age_range="12-5")),
+        json.dumps({"name": "Missing fields"}),
+    ]
+    path = tmp_path / "batch.jsonl"
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+
+@pytest.mark.parametrize("age_range, valid", [
+    ("5-12 years", True),
+    ("5 to 12", True),
+    ("14+ years", True),
+    ("16 years", True),
+    ("12-5", True),
+    ("teens", False),
+    ("All ages", False),
+    ("5 potatoes", False),
+    ("7abc", False),
+    ("0x10", False),
+    ("3-", False),
+    ("5-12-20 years", False),
+])
+def test_age_ranges_are_checked_with_the_age_index(age_range, valid):
+    problems = ingest.validate_record("modules", module("Any", age_range=age_range))
+    assert (problems == []) == valid
+
+
+@pytest.mark.parametrize("suffix", [".jsonl", ".db"])
+def test_ingest_merges_valid_records(batch, tmp_path, suffix):
+    output = str(tmp_path / f"modules{suffix}")
+    errors_path = tmp_path / "errors.jsonl"
+    existing = [module("Existing")]
+    report = ingest.ingest("modules", [batch], output, str(errors_path), existing, workers=1, chunk_lines=2)
+
+    assert (report.lines, report.accepted, report.rejected, report.duplicates, report.existing) == (7, 2, 3, 1, 1)
+    store = STORE_TYPES[suffix][0](output)
+    assert [record["name"] for record in store] == ["Existing", "Fractions", "Reversed"]
+    errors = [json.loads(line) for line in errors_path.read_text(encoding="utf-8").splitlines()]
+    assert {(error["line"], error["field"]) for error in errors} >= {(2, "age_range"), (3, None), (4, "name")}
+    assert not [name for name in os.listdir(tmp_path) if ".tmp" in name]
+
+
+def test_failed_ingest_removes_the_temporary_output(batch, tmp_path, monkeypatch):
+    def failing_writer(path, records):
+        with open(path, "w", encoding="utf-8") as handle:
+            handle.write(json.dumps(next(iter(records))) + "\n")
+        raise OSError("disk full")
+
+    monkeypatch.setitem(STORE_TYPES, ".jsonl", (STORE_TYPES[".jsonl"][0], failing_writer))
+    output = tmp_path / "modules.jsonl"
+    with pytest.raises(OSError):
+        ingest.ingest("modules", [batch], str(output), str(tmp_path / "errors.jsonl"), workers=1)
+    assert not output.exists()
+    assert not [name for name in os.listdir(tmp_path) if ".tmp" in name]
+
+
+def test_each_run_writes_its_own_temporary_file(batch, tmp_path, monkeypatch):
+    written = []
+    reader, writer = STORE_TYPES[".jsonl"]
+
+    def recording_writer(path, records):
+        written.append(path)
+        writer(path, records)
+
+    monkeypatch.setitem(STORE_TYPES, ".jsonl", (reader, recording_writer))
+    output = tmp_path / "modules.jsonl"
+    for _ in range(2):
+        ingest.ingest("modules", [batch], str(output), str(tmp_path / "errors.jsonl"), workers=1)
+    assert len(set(written)) == 2
+    assert all(os.path.dirname(path) == str(tmp_path) for path in written)
+    assert os.stat(output).st_mode & 0o777 == 0o644
+    assert [record["name"] for record in reader(str(output))] == ["Fractions", "Reversed"]
@@ -0,0 +1,132 @@
+import threading
+import tracemalloc
+
+import pytest
+
+from metrics import BUCKET_BOUNDS, Histogram, Registry, measure, timed
+
+
+def test_concurrent_observations_are_all_counted():
+    histogram = Histogram()
+    threads = [
+        threading.Thread(target=lambda: [histogram.observe(0.001, 8) for _ in range(20000)])
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert histogram.count == sum(histogram.buckets) == histogram.traced == 160000
+    assert histogram.retained == 8 * 160000
+    assert histogram.total == pytest.approx(160.0)
+
+
+def test_quantiles_stay_within_a_bucket_of_the_truth():
+    histogram = Histogram()
+    samples = [index / 1000 for index in range(1, 1001)]
+    for seconds in samples:
+        histogram.observe(seconds)
+    summary = histogram.summary()
+    assert summary["count"] == 1000
+    assert summary["max_s"] == 1.0
+    for q in (0.5, 0.95, 0.99):
+        assert summary[f"p{round(q * 100)}_s"] == pytest.approx(q, rel=0.2)
+    assert summary["mean_retained_bytes"] is None
+
+
+def test_slow_calls_land_in_the_overflow_bucket():
+    histogram = Histogram()
+    histogram.observe(BUCKET_BOUNDS[-1] * 2)
+    assert histogram.buckets[-1] == 1
+    assert histogram.quantile(0.5) == BUCKET_BOUNDS[-1] * 2
+
+
+def test_timed_records_net_retained_bytes():
+    registry = Registry()
+    kept = []
+
+    @timed("accessor", "keep", registry=registry)
+    def keep():
+        kept.append(bytearray(100000))
+
+    @timed("accessor", "release", registry=registry)
+    def release():
+        bytearray(100000)
+
+    tracemalloc.start()
+    try:
+        keep()
+        release()
+    finally:
+        tracemalloc.stop()
+    summaries = registry.summaries("accessor")
+    assert summaries[("accessor", "keep")]["mean_retained_bytes"] >= 100000
+    # Memory freed before returning is not counted
+    assert summaries[("accessor", "release")]["mean_retained_bytes"] < 10000
+
+
+def test_reset_keeps_the_histograms_timed_functions_hold():
+    registry = Registry()
+    with measure("block", "render", registry=registry):
+        pass
+    histogram = registry.histogram("block", "render")
+    registry.reset()
+    assert registry.histogram("block", "render") is histogram
+    assert histogram.count == 0
+    histogram.observe(0.01)
+    assert registry.summaries()[("block", "render")]["count"] == 1
+
+
+def test_prometheus_text_has_cumulative_buckets():
+    registry = Registry()
+    registry.histogram("section", 'Say "hi"').observe(0.002, 64)
+    text = registry.prometheus_text()
+    assert 'eduverse_duration_seconds_bucket{kind="section",name="Say \\"hi\\"",le="+Inf"} 1' in text
+    assert 'eduverse_duration_seconds_count{kind="section",name="Say \\"hi\\""} 1' in text
+    assert 'eduverse_retained_bytes_sum{kind="section",name="Say \\"hi\\""} 64' in text
+
+
+def test_prometheus_text_waits_for_observations_in_progress():
+    registry = Registry()
+    histogram = registry.histogram("accessor", "get")
+    histogram.observe(0.002)
+    rendered = []
+    with histogram._lock:
+        thread = threading.Thread(target=lambda: rendered.append(registry.prometheus_text()))
+        thread.start()
+        thread.join(0.2)
+        # Rendering needs the histogram's lock, like an observation does
+        assert thread.is_alive()
+    thread.join()
+    assert 'eduverse_duration_seconds_count{kind="accessor",name="get"} 1' in rendered[0]
+
+
+def test_prometheus_text_is_consistent_under_concurrent_observations():
+    registry = Registry()
+    histogram = registry.histogram("accessor", "get")
+    stop = threading.Event()
+
+    def observe():
+        while not stop.is_set():
+            histogram.observe(BUCKET_BOUNDS[-1] * 2, 8)
+
+    threads = [threading.Thread(target=observe) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    try:
+        for _ in range(200):
+            values = {}
+            for line in registry.prometheus_text().splitlines():
+                if not line.startswith("#"):
+                    metric, value = line.rsplit(" ", 1)
+                    values[metric] = float(value)
+            count = values['eduverse_duration_seconds_count{kind="accessor",name="get"}']
+            # Every call so far was slower than the last bound, and traced
+            assert values['eduverse_duration_seconds_sum{kind="accessor",name="get"}'] == pytest.approx(
+                count * BUCKET_BOUNDS[-1] * 2
+            )
+            assert values.get('eduverse_retained_bytes_count{kind="accessor",name="get"}', 0) == count
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
@@ -0,0 +1,216 @@
+import asyncio
+
+import pytest
+
+from api_client import ApiClient, HttpError
+from response_cache import CachedResponse, DiskCache, MemoryCache, ResponseCache
+from stub_server import StubServer
+
+TTLS = {"Stub": (60, 30)}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def versioned(versions):
+    """A handler serving versions[0] with its ETag, answering a matching
+    If-None-Match with 304."""
+
+    async def handler(request):
+        await asyncio.sleep(0.05)
+        version = versions[0]
+        if isinstance(version, int) and version >= 500:
+            return version, {}, b"down"
+        etag = f'"{version}"'
+        if request["headers"].get("if-none-match") == etag:
+            return 304, {"ETag": etag}, b""
+        return 200, {"Content-Type": "application/json", "ETag": etag}, {"version": version}
+
+    return handler
+
+
+# An entry whose size (body plus URL) is the given number of bytes
+def entry(size):
+    return CachedResponse("u", 200, "OK", {}, b"x" * (size - 1), 0, 0)
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "cache.sqlite")
+
+
+def test_concurrent_misses_share_one_upstream_request(cache_path):
+    async def run():
+        async with StubServer(versioned(["v1"])) as server:
+            cache = ResponseCache(cache_path, ttls=TTLS, clock=Clock())
+            async with ApiClient(registry=server.registry(), cache=cache) as client:
+                responses = await asyncio.gather(*(client.get("Stub", "/items") for _ in range(10)))
+            cache.close()
+            return responses, len(server.requests), cache.counts
+
+    responses, requests, counts = asyncio.run(run())
+    assert requests == 1
+    assert {response.json()["version"] for response in responses} == {"v1"}
+    assert (counts["miss"], counts["coalesced"]) == (1, 9)
+
+
+def test_memory_tier_evicts_least_recently_used():
+    memory = MemoryCache(max_bytes=300)
+    memory.put("a", entry(100))
+    memory.put("b", entry(100))
+    memory.put("c", entry(100))
+    assert memory.get("a") is not None
+    memory.put("d", entry(100))
+    assert memory.get("b") is None
+    assert [key for key in "acd" if memory.get(key) is not None] == ["a", "c", "d"]
+    assert memory.size == 300
+    # Too big for the whole budget, so never kept
+    memory.put("e", entry(301))
+    assert memory.get("e") is None and len(memory) == 3
+
+
+def test_disk_tier_evicts_least_recently_used(cache_path):
+    disk = DiskCache(cache_path, max_bytes=250)
+    disk.put("a", entry(100))
+    disk.put("b", entry(100))
+    disk.get("a")
+    disk.put("c", entry(100))
+    assert disk.get("b") is None
+    assert disk.get("a") is not None and disk.get("c") is not None
+    assert disk.size == 200
+    disk.close()
+
+
+def test_responses_survive_a_restart_on_disk(cache_path):
+    async def fetch(server, cache):
+        async with ApiClient(registry=server.registry(), cache=cache) as client:
+            return await client.get("Stub", "/items", params={"page": 1})
+
+    async def run():
+        async with StubServer(versioned(["v1"])) as server:
+            first = ResponseCache(cache_path, ttls=TTLS, clock=Clock())
+            await fetch(server, first)
+            first.close()
+
+            restarted = ResponseCache(cache_path, ttls=TTLS, clock=Clock())
+            response = await fetch(server, restarted)
+            stats = restarted.stats()
+            restarted.close()
+            return response, len(server.requests), stats
+
+    response, requests, stats = asyncio.run(run())
+    assert requests == 1
+    assert response.json() == {"version": "v1"}
+    assert response.headers["etag"] == '"v1"'
+    assert (stats["hit"], stats["memory_entries"], stats["disk_entries"]) == (1, 1, 1)
+
+
+def test_stale_entries_are_served_while_revalidating(cache_path):
+    clock = Clock()
+
+    async def run():
+        async with StubServer(versioned(["v1"])) as server:
+            cache = ResponseCache(cache_path, ttls=TTLS, clock=clock)
+            async with ApiClient(registry=server.registry(), cache=cache) as client:
+                await client.get("Stub", "/items")
+                clock.now += 70
+                stale = await asyncio.wait_for(client.get("Stub", "/items"), 0.04)
+                await asyncio.gather(*cache._in_flight.values())
+                fresh = await client.get("Stub", "/items")
+            stats = cache.stats()
+            cache.close()
+            return stale, fresh, server.requests, stats
+
+    stale, fresh, requests, stats = asyncio.run(run())
+    # The stale response came back without waiting for the upstream
+    assert stale.json() == fresh.json() == {"version": "v1"}
+    assert len(requests) == 2
+    assert requests[1]["headers"]["if-none-match"] == '"v1"'
+    assert (stats["stale"], stats["hit"]) == (1, 1)
+    assert stats["refreshes"] == {"updated": 0, "revalidated": 1, "failed": 0}
+
+
+def test_background_revalidation_failures_are_recorded(cache_path):
+    clock = Clock()
+    versions = ["v1"]
+
+    async def run():
+        async with StubServer(versioned(versions)) as server:
+            cache = ResponseCache(cache_path, ttls=TTLS, clock=clock)
+            async with ApiClient(registry=server.registry(), cache=cache, retries=0) as client:
+                await client.get("Stub", "/items")
+                clock.now += 70
+                versions[0] = 503
+                stale = await client.get("Stub", "/items")
+                await asyncio.gather(*cache._in_flight.values())
+            stats = cache.stats()
+            cache.close()
+            return stale, stats
+
+    stale, stats = asyncio.run(run())
+    assert stale.json() == {"version": "v1"}
+    assert stats["refreshes"]["failed"] == 1
+    assert "503" in stats["last_error"]
+
+
+def test_expired_entries_wait_for_the_upstream(cache_path):
+    clock = Clock()
+    versions = ["v1"]
+
+    async def run():
+        async with StubServer(versioned(versions)) as server:
+            cache = ResponseCache(cache_path, ttls=TTLS, clock=clock)
+            async with ApiClient(registry=server.registry(), cache=cache) as client:
+                await client.get("Stub", "/items")
+                # Past the TTL and the stale window: unchanged upstream
+                clock.now += 91
+                unchanged = await client.get("Stub", "/items")
+                clock.now += 91
+                versions[0] = "v2"
+                changed = await client.get("Stub", "/items")
+                again = await client.get("Stub", "/items")
+            cache.close()
+            return unchanged, changed, again, server.requests, cache.counts
+
+    unchanged, changed, again, requests, counts = asyncio.run(run())
+    assert unchanged.json() == {"version": "v1"}
+    assert changed.json() == again.json() == {"version": "v2"}
+    assert [request["headers"].get("if-none-match") for request in requests] == [None, '"v1"', '"v1"']
+    assert (counts["miss"], counts["revalidated"], counts["hit"]) == (2, 1, 1)
+
+
+def test_upstream_errors_without_an_entry_are_raised(cache_path):
+    async def run():
+        async with StubServer(lambda request: (404, {}, b"missing")) as server:
+            cache = ResponseCache(cache_path, ttls=TTLS, clock=Clock())
+            async with ApiClient(registry=server.registry(), cache=cache) as client:
+                with pytest.raises(HttpError):
+                    await client.get("Stub", "/missing")
+            cache.close()
+            return cache.counts
+
+    assert asyncio.run(run())["error"] == 1
+
+
+def test_no_store_responses_are_not_kept(cache_path):
+    def handler(request):
+        return 200, {"Cache-Control": "no-store"}, {"private": True}
+
+    async def run():
+        async with StubServer(handler) as server:
+            cache = ResponseCache(cache_path, ttls=TTLS, clock=Clock())
+            async with ApiClient(registry=server.registry(), cache=cache) as client:
+                await client.get("Stub", "/me")
+                await client.get("Stub", "/me")
+            stats = cache.stats()
+            cache.close()
+            return len(server.requests), stats
+
+    requests, stats = asyncio.run(run())
+    assert requests == 2
+    assert stats["disk_entries"] == 0
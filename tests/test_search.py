@@ -0,0 +1,156 @@
+import math
+import random
+
+import pytest
+
+from search import SEARCH_FIELDS, SearchIndex, tokenize
+
+WORDS = ["volcano", "volume", "vocabulary", "fraction", "fractal", "geometry", "reading", "science"]
+
+
+class RecordingList(list):
+    """A ranked list that remembers the deepest position read from it."""
+
+    def __init__(self, items):
+        super().__init__(items)
+        self.deepest = -1
+
+    def __getitem__(self, index):
+        self.deepest = max(self.deepest, index)
+        return super().__getitem__(index)
+
+
+class RecordingIndex(SearchIndex):
+    """A search index whose ranked lists record how far a query read them."""
+
+    def _record(self, key, impacts):
+        ranked, scores = impacts
+        if not isinstance(ranked, RecordingList):
+            ranked = RecordingList(ranked)
+            self._impacts[key] = impacts = (ranked, scores)
+        return impacts
+
+    def _term_impacts(self, term):
+        impacts = super()._term_impacts(term)
+        return impacts and self._record(term, impacts)
+
+    def _merged_impacts(self, terms):
+        return self._record(terms if len(terms) > 1 else terms[0], super()._merged_impacts(terms))
+
+    def deepest(self):
+        return max(ranked.deepest for ranked, _ in self._impacts.values())
+
+
+def random_records(count, seed=0):
+    rng = random.Random(seed)
+    return [
+        {
+            "name": f"Module {index} {rng.choice(WORDS)}",
+            "description": " ".join(rng.choices(WORDS, k=rng.randint(1, 12))),
+            "features": rng.sample(WORDS, 2),
+        }
+        for index in range(count)
+    ]
+
+
+# Score every record against a set of terms, without an index
+def brute_force(records, terms, k1=1.2, b=0.75):
+    frequencies = []
+    for record in records:
+        counts = {}
+        for field, weight in SEARCH_FIELDS.items():
+            value = record.get(field)
+            if not value:
+                continue
+            for term in tokenize(value if isinstance(value, str) else " ".join(value)):
+                counts[term] = counts.get(term, 0) + weight
+        frequencies.append(counts)
+    average = sum(sum(counts.values()) for counts in frequencies) / len(records)
+    matching = {term: sum(1 for counts in frequencies if term in counts) for term in terms}
+    scores = []
+    for counts in frequencies:
+        norm = k1 * (1 - b + b * sum(counts.values()) / average)
+        score = 0.0
+        for term in terms:
+            if term in counts:
+                idf = math.log(1 + (len(records) - matching[term] + 0.5) / (matching[term] + 0.5))
+                score += idf * (k1 + 1) * counts[term] / (counts[term] + norm)
+        scores.append(score)
+    return scores
+
+
+@pytest.mark.parametrize("query", ["volcano", "fraction geometry", "reading science volume"])
+def test_ranking_matches_brute_force_bm25(query):
+    records = random_records(300)
+    index = SearchIndex(records)
+    expected = sorted(
+        (score for score in brute_force(records, tokenize(query)) if score > 0), reverse=True
+    )[:10]
+    results = index.search_scored(query, limit=10, prefix=False)
+    assert [score for score, _ in results] == pytest.approx(expected)
+
+
+def test_last_term_is_expanded_as_a_prefix():
+    records = random_records(300)
+    index = SearchIndex(records)
+    # "vo" expands to volcano, volume and vocabulary, each scored in full
+    expected = sorted(
+        (score for score in brute_force(records, ["volcano", "volume", "vocabulary"]) if score > 0), reverse=True
+    )[:10]
+    assert [score for score, _ in index.search_scored("vo", limit=10)] == pytest.approx(expected)
+    # A trailing space, or prefix=False, makes it a whole word
+    assert index.search("vo ") == []
+    assert index.search("vo", prefix=False) == []
+
+
+def test_repeated_terms_are_not_scored_twice():
+    records = random_records(300)
+    index = SearchIndex(records)
+    expected = sorted(
+        (score for score in brute_force(records, ["volcano", "volume", "vocabulary"]) if score > 0), reverse=True
+    )[:10]
+    assert [score for score, _ in index.search_scored("volcano vo", limit=10)] == pytest.approx(expected)
+
+
+def test_only_the_most_common_expansions_are_used():
+    records = [{"name": f"Pre{index}", "description": " ".join([f"pre{index}"] * index)} for index in range(12)]
+    records += [{"name": "Common", "description": "pre11 pre10"}]
+    index = SearchIndex(records, max_expansions=2)
+    assert sorted(index._expand("pre")) == ["pre10", "pre11"]
+    assert {record["name"] for record in index.search("pre")} == {"Pre10", "Pre11", "Common"}
+
+
+@pytest.mark.parametrize("limit", [0, -1])
+def test_non_positive_limits_return_nothing(limit):
+    index = SearchIndex(random_records(20))
+    assert index.search_scored("volcano", limit=limit) == []
+
+
+def test_walk_stops_once_the_top_results_are_settled():
+    index = RecordingIndex(random_records(2000))
+    assert len(index.search("volcano", limit=5, prefix=False)) == 5
+    assert index.deepest() < 50
+
+
+def test_short_prefixes_stop_early_too():
+    # Eight expansions, each matching a quarter of the records
+    rng = random.Random(1)
+    terms = [f"pr{letter}" for letter in "abcdefgh"]
+    records = [
+        {"name": f"Module {index}", "description": " ".join(rng.sample(terms, 2) + ["filler"] * rng.randint(0, 20))}
+        for index in range(4000)
+    ]
+    index = RecordingIndex(records)
+    results = index.search_scored("pr", limit=10)
+    assert len(results) == 10
+    assert index.deepest() < 50
+    expected = sorted(brute_force(records, terms), reverse=True)[:10]
+    assert [score for score, _ in results] == pytest.approx(expected)
+
+
+def test_new_records_are_searchable():
+    index = SearchIndex(random_records(50))
+    index.search("vo")
+    index.add({"name": "Tectonics", "description": "Plates and volcanoes"})
+    assert index.search("tecton") == [{"name": "Tectonics", "description": "Plates and volcanoes"}]
+    assert index.suggest("tec") == ["Tectonics"]
@@ -0,0 +1,90 @@
+import threading
+import time
+
+import numpy as np
+
+import api_integrations
+import modules_data
+import similarity
+from similarity import Recommendations
+
+
+def record(name, text):
+    return {"name": name, "description": text}
+
+
+def test_neighbours_are_ranked_by_similarity():
+    modules = [
+        record("Fractions", "fractions numerator denominator practice"),
+        record("Decimals", "decimals fractions place value practice"),
+        record("Volcanoes", "volcanoes lava magma eruptions"),
+    ]
+    apis = [record("Math API", "fractions decimals exercises"), record("Geo API", "volcanoes magma maps")]
+    built = Recommendations(modules, apis)
+    assert [name for name, _ in built.neighbours("similar_modules", "Fractions")] == ["Decimals"]
+    assert [name for name, _ in built.neighbours("suggested_apis", "Volcanoes")] == ["Geo API"]
+    assert built.neighbours("suggested_apis", "No such module") == []
+
+
+def test_pruning_keeps_a_match_for_every_entry_with_a_shared_term():
+    # Every API mentions "quiz", so one posting per term drops most of them
+    apis = [record(f"API {index}", f"quiz {'extra ' * index}") for index in range(10)]
+    modules = [record(f"Module {index}", f"quiz topic{index}") for index in range(10)]
+    modules.append(record("Unrelated", "volcanoes"))
+    pruned = Recommendations(modules, apis, max_postings=1)
+    exhaustive = Recommendations(modules, apis, max_postings=len(apis))
+    for index in range(10):
+        assert pruned.neighbours("suggested_apis", f"Module {index}", 1) == exhaustive.neighbours(
+            "suggested_apis", f"Module {index}", 1
+        )
+    assert pruned.neighbours("suggested_apis", "Unrelated") == []
+
+
+def test_entries_without_candidates_are_scored_exhaustively(monkeypatch):
+    from scipy import sparse
+
+    modules = [record("Fractions", "fractions practice"), record("Decimals", "decimals fractions practice")]
+    apis = [record("Math API", "fractions decimals exercises"), record("Geo API", "volcanoes maps")]
+    exhaustive = Recommendations(modules, apis)
+    # Prune every posting, so no entry has a candidate left
+    monkeypatch.setattr(similarity, "prune_postings", lambda matrix, max_postings: sparse.csr_matrix(matrix.shape))
+    fallback = Recommendations(modules, apis)
+    for table in similarity.TABLES:
+        for name in fallback.names[similarity.TABLES[table][0]]:
+            assert fallback.neighbours(table, name) == exhaustive.neighbours(table, name)
+    assert fallback.neighbours("similar_modules", "Fractions")[0][0] == "Decimals"
+
+
+def test_every_entry_with_a_shared_term_gets_a_match():
+    built = Recommendations(modules_data.module_catalog, api_integrations.api_catalog, max_postings=1)
+    columns, _ = built.tables["suggested_apis"]
+    assert (columns[:, 0] >= 0).all()
+
+
+def test_concurrent_callers_share_one_build(monkeypatch):
+    builds = []
+
+    class SlowRecommendations:
+        def __init__(self, modules, apis):
+            builds.append(threading.get_ident())
+            time.sleep(0.2)
+
+    monkeypatch.setattr(similarity, "Recommendations", SlowRecommendations)
+    monkeypatch.setattr(similarity, "_recommendations", None)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(similarity.recommendations())) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(builds) == 1
+    assert len({id(result) for result in results}) == 1
+
+
+def test_top_k_skips_own_column_and_pads_missing_matches():
+    from scipy import sparse
+
+    block = sparse.csr_matrix(np.array([[0.9, 0.5, 0.0], [0.0, 0.0, 0.0]], dtype=np.float32))
+    columns, scores = similarity.top_k(block, 2, own_columns=np.array([0, 1]))
+    assert columns.tolist() == [[1, -1], [-1, -1]]
+    assert scores[0, 0] == np.float32(0.5)
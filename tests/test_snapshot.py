@@ -0,0 +1,99 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import snapshot
+from catalog import Catalog
+from facets import where
+from modules_data import all_modules, module_facets, module_views
+
+# Report where the app's catalogs came from: a prebuilt catalog already
+# has its search index, a rebuilt one only builds it on first search
+PROBE = """
+import json
+import api_integrations
+import modules_data
+print(json.dumps({
+    "prebuilt": [catalog._search_index is not None
+                 for catalog in (modules_data.module_catalog, api_integrations.api_catalog)],
+    "modules": list(modules_data.module_catalog),
+    "version": modules_data.module_catalog.version,
+}))
+"""
+
+
+@pytest.fixture
+def path(tmp_path, monkeypatch):
+    path = str(tmp_path / "catalog.snapshot")
+    monkeypatch.setenv("EDUVERSE_SNAPSHOT", path)
+    snapshot.read_header.cache_clear()
+    yield path
+    snapshot.read_header.cache_clear()
+
+
+# Rewrite the snapshot header with a different key, as an older build would
+# have written it
+def make_stale(path):
+    with open(path, "rb") as handle:
+        line = handle.readline()
+        data = handle.read()
+    header = json.loads(line.partition(b" ")[2])
+    header["key"] = "0" * len(header["key"])
+    with open(path, "wb") as handle:
+        handle.write(snapshot.MAGIC + b" " + json.dumps(header).encode("ascii") + b"\n" + data)
+    snapshot.read_header.cache_clear()
+
+
+def run_app(path):
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=snapshot.APP_DIR, capture_output=True, text=True, check=True,
+        env={**os.environ, "EDUVERSE_SNAPSHOT": path},
+    )
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def test_loaded_catalogs_match_fresh_ones(path):
+    snapshot.build(path)
+    loaded = snapshot.load_catalog("modules")
+    fresh = Catalog(all_modules, module_views(), module_facets())
+    assert list(loaded) == list(fresh)
+    assert loaded.version == fresh.version
+    assert loaded.names() == fresh.names()
+    assert loaded.aggregate("age_bucket") == fresh.aggregate("age_bucket")
+    assert loaded.facet_counts(where()) == fresh.facet_counts(where())
+    assert loaded.search("cyber") == fresh.search("cyber")
+    assert len(snapshot.load_catalog("apis")) > 0
+    assert snapshot.load_catalog("unknown") is None
+
+
+def test_stale_or_foreign_files_are_ignored(path, monkeypatch):
+    assert snapshot.load_catalog("modules") is None
+
+    snapshot.build(path)
+    make_stale(path)
+    assert snapshot.load_catalog("modules") is None
+
+    snapshot.build(path)
+    monkeypatch.setattr(snapshot, "SNAPSHOT_FORMAT", snapshot.SNAPSHOT_FORMAT + 1)
+    snapshot.read_header.cache_clear()
+    assert snapshot.load_catalog("modules") is None
+
+    with open(path, "wb") as handle:
+        handle.write(b"something else\n")
+    snapshot.read_header.cache_clear()
+    assert snapshot.load_catalog("modules") is None
+
+
+def test_the_app_rebuilds_when_the_snapshot_is_stale(path):
+    snapshot.build(path)
+    loaded = run_app(path)
+    assert loaded["prebuilt"] == [True, True]
+
+    make_stale(path)
+    rebuilt = run_app(path)
+    assert rebuilt["prebuilt"] == [False, False]
+    assert rebuilt["modules"] == loaded["modules"] == json.loads(json.dumps(all_modules))
+    assert rebuilt["version"] == loaded["version"]
@@ -0,0 +1,19 @@
+import os
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SECTIONS = ["Overview", "Performance", "Module Explorer", "API Integrations"]
+
+
+# Each section renders from a fresh script run without raising
+@pytest.mark.parametrize("section", SECTIONS)
+def test_section_renders(section, monkeypatch):
+    # The logo is loaded from a path relative to the app directory
+    monkeypatch.chdir(ROOT)
+    app = AppTest.from_file(os.path.join(ROOT, "streamlit_app.py"), default_timeout=60)
+    app.session_state["section"] = section
+    app.run()
+    assert not app.exception, [exception.value for exception in app.exception]
+    assert app.header[0].value.endswith(section)
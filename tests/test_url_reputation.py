@@ -0,0 +1,180 @@
+import os
+import random
+import struct
+
+import pytest
+
+import url_reputation
+from url_reputation import (
+    FeedError, UrlReputationStore, canonicalize, confirm_matches, full_hash, hash_prefix, prefixes_checksum,
+    url_expressions,
+)
+
+# Canonicalization examples from the Safe Browsing Update API documentation
+CANONICAL_URLS = [
+    ("http://host/%25%32%35", "http://host/%25"),
+    ("http://host/%25%32%35%25%32%35", "http://host/%25%25"),
+    ("http://host/%2525252525252525", "http://host/%25"),
+    ("http://host/asdf%25%32%35asd", "http://host/asdf%25asd"),
+    ("http://host/%%%25%32%35asd%%", "http://host/%25%25%25asd%25%25"),
+    ("http://www.google.com/", "http://www.google.com/"),
+    ("http://%31%36%38%2e%31%38%38%2e%39%39%2e%32%36/%2E%73%65%63%75%72%65/%77%77%77%2E%65%62%61%79%2E%63%6F%6D/",
+     "http://168.188.99.26/.secure/www.ebay.com/"),
+    ("http://195.127.0.11/uploads/%20%20%20%20/.verify/.eBaysecure=updateuserdataxplimnbqmn-xplmvalidateinfoswqpcmlx=hgplmcx/",
+     "http://195.127.0.11/uploads/%20%20%20%20/.verify/.eBaysecure=updateuserdataxplimnbqmn-xplmvalidateinfoswqpcmlx=hgplmcx/"),
+    ("http://host%23.com/%257Ea%2521b%2540c%2523d%2524e%25f%255E00%252611%252A22%252833%252944_55%252B",
+     "http://host%23.com/~a!b@c%23d$e%25f^00&11*22(33)44_55+"),
+    ("http://3279880203/blah", "http://195.127.0.11/blah"),
+    ("http://www.google.com/blah/..", "http://www.google.com/"),
+    ("www.google.com/", "http://www.google.com/"),
+    ("www.google.com", "http://www.google.com/"),
+    ("http://www.evil.com/blah#frag", "http://www.evil.com/blah"),
+    ("http://www.GOOgle.com/", "http://www.google.com/"),
+    ("http://www.google.com.../", "http://www.google.com/"),
+    ("http://www.google.com/foo\tbar\rbaz\n2", "http://www.google.com/foobarbaz2"),
+    ("http://www.google.com/q?", "http://www.google.com/q?"),
+    ("http://www.google.com/q?r?", "http://www.google.com/q?r?"),
+    ("http://www.google.com/q?r?s", "http://www.google.com/q?r?s"),
+    ("http://evil.com/foo#bar#baz", "http://evil.com/foo"),
+    ("http://evil.com/foo;", "http://evil.com/foo;"),
+    ("http://evil.com/foo?bar;", "http://evil.com/foo?bar;"),
+    ("http://%01%80.com/", "http://%01%80.com/"),
+    ("http://notrailingslash.com", "http://notrailingslash.com/"),
+    ("http://www.gotaport.com:1234/", "http://www.gotaport.com/"),
+    ("  http://www.google.com/  ", "http://www.google.com/"),
+    ("http:// leadingspace.com/", "http://%20leadingspace.com/"),
+    ("http://%20leadingspace.com/", "http://%20leadingspace.com/"),
+    ("%20leadingspace.com/", "http://%20leadingspace.com/"),
+    ("https://www.securesite.com/", "https://www.securesite.com/"),
+    ("http://host.com/ab%23cd", "http://host.com/ab%23cd"),
+    ("http://host.com//twoslashes?more//slashes", "http://host.com/twoslashes?more//slashes"),
+]
+
+
+@pytest.mark.parametrize("url, expected", CANONICAL_URLS)
+def test_canonicalize_matches_safe_browsing(url, expected):
+    assert canonicalize(url) == expected
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("http://a.b.c/1/2.html?param=1", [
+        "a.b.c/1/2.html?param=1", "a.b.c/1/2.html", "a.b.c/", "a.b.c/1/",
+        "b.c/1/2.html?param=1", "b.c/1/2.html", "b.c/", "b.c/1/",
+    ]),
+    ("http://a.b.c.d.e.f.g/1.html", [
+        "a.b.c.d.e.f.g/1.html", "a.b.c.d.e.f.g/",
+        "c.d.e.f.g/1.html", "c.d.e.f.g/",
+        "d.e.f.g/1.html", "d.e.f.g/",
+        "e.f.g/1.html", "e.f.g/",
+        "f.g/1.html", "f.g/",
+    ]),
+    ("http://1.2.3.4/1/", ["1.2.3.4/1/", "1.2.3.4/"]),
+    ("http://a.b/", ["a.b/"]),
+])
+def test_url_expressions_match_safe_browsing(url, expected):
+    assert sorted(url_expressions(url)) == sorted(expected)
+
+
+def test_prefix_hit_needs_full_hash_confirmation():
+    listed = "phish.example.com/login.html"
+    store = UrlReputationStore([hash_prefix(listed)])
+    matches = store.check_url("http://PHISH.example.com/./login.html#top")
+    assert matches == [listed]
+
+    # A different full hash sharing the prefix is only a prefix collision
+    collision = full_hash(listed)[:4] + bytes(28)
+    assert confirm_matches(matches, [collision]) == []
+    assert confirm_matches(matches, [collision, full_hash(listed)]) == [listed]
+    assert confirm_matches(matches, [full_hash(listed).hex()]) == [listed]
+
+
+def test_unlisted_url_has_no_matches():
+    store = UrlReputationStore([hash_prefix("phish.example.com/login.html")])
+    assert store.check_url("http://example.com/login.html") == []
+
+
+def test_bloom_filter_has_no_false_negatives():
+    rng = random.Random(3)
+    prefixes = [rng.getrandbits(32) for _ in range(20000)]
+    store = UrlReputationStore(prefixes)
+    assert all(prefix in store._bloom for prefix in prefixes)
+    assert all(store.contains_prefix(prefix) for prefix in prefixes)
+    assert store.contains_prefixes(prefixes).all()
+
+
+def test_batched_lookups_agree_with_single_lookups():
+    rng = random.Random(4)
+    listed = [rng.getrandbits(32) for _ in range(5000)]
+    store = UrlReputationStore(listed)
+    probes = listed[:500] + [rng.getrandbits(32) for _ in range(5000)]
+    assert store.contains_prefixes(probes).tolist() == [store.contains_prefix(prefix) for prefix in probes]
+
+
+def test_apply_update_adds_and_removes():
+    store = UrlReputationStore([1, 2, 3, 4], state="v1")
+    store.apply_update(additions=[5, 6], removals=[2, 4], state="v2")
+    assert [prefix for prefix in range(10) if store.contains_prefix(prefix)] == [1, 3, 5, 6]
+    assert len(store) == 4
+    assert store.state == "v2"
+    assert store.checksum == prefixes_checksum([1, 3, 5, 6])
+
+
+def test_apply_update_checks_the_checksum_before_replacing():
+    store = UrlReputationStore([1, 2, 3], state="v1")
+    with pytest.raises(FeedError):
+        store.apply_update(additions=[4], removals=[1], checksum=prefixes_checksum([9]), state="v2")
+    assert [prefix for prefix in range(10) if store.contains_prefix(prefix)] == [1, 2, 3]
+    assert store.state == "v1"
+
+    store.apply_update(additions=[4], removals=[1], checksum=prefixes_checksum([2, 3, 4]).upper())
+    assert store.checksum == prefixes_checksum([2, 3, 4])
+
+
+def test_additions_past_capacity_resize_the_bloom_filter():
+    rng = random.Random(5)
+    store = UrlReputationStore([rng.getrandbits(32) for _ in range(10)])
+    additions = [rng.getrandbits(32) for _ in range(20000)]
+    store.apply_update(additions=additions)
+
+    assert store._bloom.capacity >= len(store)
+    assert all(prefix in store._bloom for prefix in additions)
+    # A filter sized for 10 prefixes would pass nearly every probe
+    probes = [rng.getrandbits(32) for _ in range(20000)]
+    false_positives = sum(prefix in store._bloom for prefix in probes)
+    assert false_positives / len(probes) < 0.03
+
+
+def test_save_and_load_round_trip(tmp_path):
+    store = UrlReputationStore([7, 3, 3, 11], state="token")
+    path = tmp_path / "store.bin"
+    store.save(path)
+    loaded = UrlReputationStore.load(path)
+    assert loaded.state == "token"
+    assert loaded.checksum == store.checksum == prefixes_checksum([3, 7, 11])
+    assert loaded.contains_prefix(11)
+    assert list(loaded.contains_prefixes([3, 4, 7, 0xFFFFFFFF])) == [True, False, True, False]
+    assert not [name for name in os.listdir(tmp_path) if name != "store.bin"]
+
+
+def test_stores_are_four_byte_little_endian_on_disk(tmp_path):
+    path = tmp_path / "store.bin"
+    UrlReputationStore([0x01020304, 0xFFFFFFFF]).save(path)
+    data = path.read_bytes()
+    assert data[data.index(b"\n") + 1:] == struct.pack("<2I", 0x01020304, 0xFFFFFFFF)
+    loaded = UrlReputationStore.load(path)
+    assert loaded._prefixes.itemsize == 4
+    assert list(loaded.contains_prefixes([0xFFFFFFFF, 0x04030201])) == [True, False]
+
+
+def test_failed_save_keeps_the_previous_store(tmp_path, monkeypatch):
+    path = tmp_path / "store.bin"
+    UrlReputationStore([1, 2, 3], state="old").save(path)
+
+    def failing_replace(source, destination):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(url_reputation.os, "replace", failing_replace)
+    with pytest.raises(OSError):
+        UrlReputationStore([4, 5], state="new").save(path)
+    assert UrlReputationStore.load(path).state == "old"
+    assert os.listdir(tmp_path) == ["store.bin"]
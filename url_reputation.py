@@ -0,0 +1,476 @@
+"""
+This module contains the offline URL reputation store behind the phishing
+simulation and URL safety use cases of the PhishTank and Google Safe
+Browsing integrations.
+
+URLs are canonicalized and expanded into host-suffix / path-prefix
+expressions the way the Safe Browsing Update API does it. Each expression is
+hashed with SHA-256, and the first four bytes of the hash are looked up
+locally, with no network access. Those bytes are checked first against a
+Bloom filter and then against a sorted array of threat-feed prefixes. A
+prefix match means the URL is probably listed; a client that needs
+certainty asks the provider for the full hashes of the matching prefixes and
+passes them to confirm_matches.
+
+    python url_reputation.py build feed.txt store.bin
+    python url_reputation.py update store.bin diff.txt
+    python url_reputation.py check store.bin http://example.com/login
+    python url_reputation.py bench --size 1000000
+
+A feed file has one hex SHA-256 hash or hash prefix (at least 4 bytes) per
+line. An update file has one per line prefixed with "+" (add) or "-"
+(remove), and may carry "# checksum <hex>" and "# state <token>" lines.
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from array import array
+from bisect import bisect_left
+from urllib.parse import unquote_to_bytes
+
+PREFIX_SIZE = 4
+
+# Bloom filter sizing: about 1% false positives
+BLOOM_BITS_PER_PREFIX = 10
+
+STORE_MAGIC = b"EDUVERSE-URLREP"
+STORE_FORMAT = 1
+
+SCHEME_PATTERN = re.compile(r"^([a-zA-Z][a-zA-Z0-9+.-]*)://")
+
+# Bytes that stay percent-escaped in canonical URLs
+ESCAPED_BYTES = frozenset(range(0, 33)) | frozenset(range(127, 256)) | {ord("#"), ord("%")}
+
+
+# Pick the array type code whose items are exactly PREFIX_SIZE bytes. "I" is
+# 4 bytes on every mainstream platform, but C only promises 2, and both the
+# store file and numpy's uint32 view of the prefixes need 4.
+def _prefix_typecode():
+    for typecode in ("I", "L"):
+        if array(typecode).itemsize == PREFIX_SIZE:
+            return typecode
+    raise RuntimeError(f"No {PREFIX_SIZE}-byte unsigned array type on this platform")
+
+
+PREFIX_TYPECODE = _prefix_typecode()
+
+
+class FeedError(Exception):
+    """Raised for a malformed feed or an update whose checksum does not match."""
+
+
+# Percent-decode repeatedly until nothing changes
+def _unescape(text):
+    data = text.encode("utf-8")
+    while True:
+        decoded = unquote_to_bytes(data)
+        if decoded == data:
+            return data
+        data = decoded
+
+
+# Percent-escape control, non-ASCII, "#" and "%" bytes
+def _escape(data):
+    return "".join(f"%{byte:02X}" if byte in ESCAPED_BYTES else chr(byte) for byte in data)
+
+
+# Read one part of an inet_aton style address: decimal, 0x hex or 0 octal
+def _ip_part(part):
+    if re.fullmatch(r"0[xX][0-9a-fA-F]*", part):
+        return int(part[2:] or "0", 16)
+    if re.fullmatch(r"0[0-7]*", part):
+        return int(part, 8)
+    if re.fullmatch(r"[1-9][0-9]*", part):
+        return int(part)
+    return None
+
+
+# Normalize hosts such as "3279880203" or "0x12.0x43.0x44.0x01" to a dotted
+# quad, or return None when the host is not an IPv4 address
+def _normalize_ip(host):
+    parts = host.split(".")
+    if not 1 <= len(parts) <= 4:
+        return None
+    values = [_ip_part(part) for part in parts]
+    if None in values:
+        return None
+    # The last part fills every byte the earlier ones did not
+    last_bytes = 5 - len(values)
+    if any(value > 255 for value in values[:-1]) or values[-1] >= 256 ** last_bytes:
+        return None
+    address = 0
+    for value in values[:-1]:
+        address = address << 8 | value
+    address = address << (8 * last_bytes) | values[-1]
+    return ".".join(str(address >> shift & 0xFF) for shift in (24, 16, 8, 0))
+
+
+# Resolve "." and ".." segments and collapse repeated slashes
+def _normalize_path(path):
+    segments = []
+    parts = path.split("/")
+    for part in parts:
+        if part in ("", "."):
+            continue
+        if part == "..":
+            if segments:
+                segments.pop()
+            continue
+        segments.append(part)
+    trailing = parts[-1] in ("", ".", "..") and len(parts) > 1
+    normalized = "/" + "/".join(segments)
+    if trailing and segments:
+        normalized += "/"
+    return normalized
+
+
+# Split a URL into its canonical (scheme, host, path, query) parts; query is
+# None when the URL has no "?"
+def canonical_parts(url):
+    url = re.sub(r"[\t\r\n]", "", url.strip())
+    url = url.split("#", 1)[0]
+    url = _unescape(url).decode("latin-1")
+    match = SCHEME_PATTERN.match(url)
+    if match:
+        scheme = match.group(1).lower()
+        url = url[match.end():]
+    else:
+        scheme = "http"
+    split = re.search(r"[/?]", url)
+    authority, rest = (url[:split.start()], url[split.start():]) if split else (url, "")
+    host = authority.rsplit("@", 1)[-1]
+    host = re.sub(r":\d*$", "", host)
+    # Lowercase ASCII only, so escaped non-ASCII bytes are left alone
+    host = re.sub(r"\.{2,}", ".", host.strip(".")).encode("latin-1").lower().decode("latin-1")
+    host = _normalize_ip(host) or host
+    path, mark, query = rest.partition("?")
+    return scheme, _escape(host.encode("latin-1")), _escape(_normalize_path(path).encode("latin-1")), (
+        _escape(query.encode("latin-1")) if mark else None
+    )
+
+
+# Canonicalize a URL for hashing
+def canonicalize(url):
+    scheme, host, path, query = canonical_parts(url)
+    return f"{scheme}://{host}{path}" + (f"?{query}" if query is not None else "")
+
+
+# Get the host-suffix / path-prefix expressions to look up for a URL, at
+# most 5 hosts times 6 paths
+def url_expressions(url):
+    _, host, path, query = canonical_parts(url)
+    hosts = [host]
+    # IP addresses are only looked up as they are. Host names also get up to
+    # four suffixes from their last five components, skipping the bare
+    # top-level domain.
+    if _normalize_ip(host) != host:
+        components = host.split(".")
+        start = max(1, len(components) - 5)
+        for index in range(start, len(components) - 1):
+            hosts.append(".".join(components[index:]))
+    paths = []
+    if query is not None:
+        paths.append(f"{path}?{query}")
+    paths.append(path)
+    segments = path.split("/")[1:-1]
+    prefix = "/"
+    for segment in [None] + segments[:3]:
+        if segment is not None:
+            prefix += segment + "/"
+        if prefix not in paths:
+            paths.append(prefix)
+    return [h + p for h in hosts for p in paths]
+
+
+# Get the full SHA-256 hash of an expression
+def full_hash(expression):
+    return hashlib.sha256(expression.encode("latin-1")).digest()
+
+
+# Get the 32-bit hash prefix of an expression
+def hash_prefix(expression):
+    return int.from_bytes(full_hash(expression)[:PREFIX_SIZE], "big")
+
+
+# Keep the prefix matches whose full hash the provider returned (as bytes or
+# hex), the confirmation step of a Safe Browsing lookup
+def confirm_matches(matches, full_hashes):
+    confirmed = {bytes.fromhex(value) if isinstance(value, str) else bytes(value) for value in full_hashes}
+    return [expression for expression in matches if full_hash(expression) in confirmed]
+
+
+# Read a hex hash or hash prefix as a 32-bit prefix
+def parse_prefix(text):
+    text = text.strip()
+    if len(text) < 2 * PREFIX_SIZE or not re.fullmatch(r"[0-9a-fA-F]+", text):
+        raise FeedError(f"Not a hex hash prefix: {text!r}")
+    return int(text[:2 * PREFIX_SIZE], 16)
+
+
+# Get the SHA-256 checksum of sorted prefixes
+def prefixes_checksum(prefixes):
+    return hashlib.sha256(b"".join(prefix.to_bytes(PREFIX_SIZE, "big") for prefix in prefixes)).hexdigest()
+
+
+class BloomFilter:
+    """Bloom filter over 32-bit hash prefixes, using double hashing."""
+
+    def __init__(self, capacity, bits_per_item=BLOOM_BITS_PER_PREFIX):
+        self.capacity = capacity
+        self.size = max(64, capacity * bits_per_item)
+        self.hashes = max(1, round(bits_per_item * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    # Get the bit positions of a prefix
+    def _positions(self, prefix):
+        mixed = (prefix * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+        first = mixed & 0xFFFFFFFF
+        step = mixed >> 32 | 1
+        return [(first + i * step) % self.size for i in range(self.hashes)]
+
+    def add(self, prefix):
+        for position in self._positions(prefix):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, prefix):
+        bits = self.bits
+        for position in self._positions(prefix):
+            if not bits[position >> 3] >> (position & 7) & 1:
+                return False
+        return True
+
+
+class UrlReputationStore:
+    """Sorted array of threat-feed hash prefixes with a Bloom filter in front.
+
+    Prefixes are kept as unsigned 32-bit integers in one ``array``, 4 bytes
+    each. A lookup that passes the Bloom filter is confirmed by binary
+    search. ``state`` is the feed's opaque version token and ``checksum``
+    the SHA-256 of the sorted prefixes, as in Safe Browsing list updates.
+    """
+
+    def __init__(self, prefixes=(), state=""):
+        self.state = state
+        self._set_prefixes(array(PREFIX_TYPECODE, sorted(set(prefixes))))
+
+    def __len__(self):
+        return len(self._prefixes)
+
+    def _set_prefixes(self, prefixes):
+        bloom = BloomFilter(len(prefixes))
+        for prefix in prefixes:
+            bloom.add(prefix)
+        self._prefixes = prefixes
+        self._bloom = bloom
+
+    @property
+    def checksum(self):
+        return prefixes_checksum(self._prefixes)
+
+    # Check whether a 32-bit prefix is listed
+    def contains_prefix(self, prefix):
+        if prefix not in self._bloom:
+            return False
+        prefixes = self._prefixes
+        index = bisect_left(prefixes, prefix)
+        return index < len(prefixes) and prefixes[index] == prefix
+
+    # Check a batch of 32-bit prefixes at once, returning a NumPy bool array
+    def contains_prefixes(self, prefixes):
+        import numpy as np
+
+        wanted = np.asarray(prefixes, dtype=np.uint32)
+        listed = np.frombuffer(self._prefixes, dtype=np.uint32) if len(self._prefixes) else np.zeros(1, np.uint32)
+        # Bloom filter first, then binary search only for the candidates
+        mixed = wanted.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+        first = mixed & np.uint64(0xFFFFFFFF)
+        step = (mixed >> np.uint64(32)) | np.uint64(1)
+        bits = np.frombuffer(self._bloom.bits, dtype=np.uint8)
+        candidate = np.ones(len(wanted), dtype=bool)
+        for i in range(self._bloom.hashes):
+            positions = (first + np.uint64(i) * step) % np.uint64(self._bloom.size)
+            candidate &= (bits[positions >> np.uint64(3)] >> (positions & np.uint64(7)).astype(np.uint8)) & 1 == 1
+        found = np.zeros(len(wanted), dtype=bool)
+        indexes = np.flatnonzero(candidate)
+        slots = np.minimum(np.searchsorted(listed, wanted[indexes]), len(listed) - 1)
+        found[indexes] = listed[slots] == wanted[indexes]
+        return found
+
+    # Get the expressions of a URL whose hash prefix is listed
+    def check_url(self, url):
+        return [expression for expression in url_expressions(url) if self.contains_prefix(hash_prefix(expression))]
+
+    # Apply a feed diff. The new prefixes replace the old ones only if the
+    # result matches the expected checksum, when one is given.
+    def apply_update(self, additions=(), removals=(), checksum=None, state=None):
+        removed = set(removals)
+        merged = sorted(set(additions).union(prefix for prefix in self._prefixes if prefix not in removed))
+        prefixes = array(PREFIX_TYPECODE, merged)
+        if checksum is not None:
+            actual = prefixes_checksum(prefixes)
+            if actual != checksum.lower():
+                raise FeedError(f"Checksum mismatch after update: expected {checksum}, got {actual}")
+        if removed or len(prefixes) > self._bloom.capacity:
+            # A Bloom filter cannot forget entries, and past its capacity its
+            # false positive rate climbs, so in either case it is rebuilt
+            self._set_prefixes(prefixes)
+        else:
+            for prefix in additions:
+                self._bloom.add(prefix)
+            self._prefixes = prefixes
+        if state is not None:
+            self.state = state
+
+    # Write the store as a header line followed by the raw prefix array
+    def save(self, path):
+        header = {"format": STORE_FORMAT, "state": self.state, "count": len(self._prefixes)}
+        prefixes = array(PREFIX_TYPECODE, self._prefixes)
+        if sys.byteorder != "little":
+            prefixes.byteswap()
+        # Write beside the store and swap it in, so a crash mid-write never
+        # leaves a truncated store behind
+        directory = os.path.dirname(os.path.abspath(path))
+        descriptor, temporary = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + ".", suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "wb") as handle:
+                handle.write(STORE_MAGIC + b" " + json.dumps(header).encode("ascii") + b"\n")
+                handle.write(prefixes.tobytes())
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as handle:
+            magic, _, header = handle.readline().partition(b" ")
+            if magic != STORE_MAGIC:
+                raise FeedError(f"{path} is not a URL reputation store")
+            header = json.loads(header)
+            prefixes = array(PREFIX_TYPECODE)
+            prefixes.frombytes(handle.read())
+        if sys.byteorder != "little":
+            prefixes.byteswap()
+        if len(prefixes) != header["count"]:
+            raise FeedError(f"{path} is truncated")
+        store = cls.__new__(cls)
+        store.state = header["state"]
+        store._set_prefixes(prefixes)
+        return store
+
+
+# Read the prefixes of a feed file
+def read_feed(path):
+    with open(path, encoding="ascii") as handle:
+        return [parse_prefix(line) for line in handle if line.strip() and not line.startswith("#")]
+
+
+# Read an update file into (additions, removals, checksum, state)
+def read_update(path):
+    additions, removals = [], []
+    checksum = state = None
+    with open(path, encoding="ascii") as handle:
+        for line in handle:
+            line = line.strip()
+            if line.startswith("# checksum "):
+                checksum = line.split()[2]
+            elif line.startswith("# state "):
+                state = line.split(None, 2)[2]
+            elif line.startswith("+"):
+                additions.append(parse_prefix(line[1:]))
+            elif line.startswith("-"):
+                removals.append(parse_prefix(line[1:]))
+            elif line and not line.startswith("#"):
+                raise FeedError(f"Update lines must start with + or -: {line!r}")
+    return additions, removals, checksum, state
+
+
+# Generate a seeded synthetic feed of random prefixes plus the hashes of the
+# given listed URLs
+def synthetic_feed(count, listed_urls=(), seed=0):
+    rng = random.Random(seed)
+    prefixes = [rng.getrandbits(32) for _ in range(count)]
+    prefixes += [hash_prefix(url_expressions(url)[0]) for url in listed_urls]
+    return prefixes
+
+
+def bench(args):
+    listed = ["http://phish.example.com/login.html", "http://198.51.100.7/verify/account"]
+    started = time.perf_counter()
+    store = UrlReputationStore(synthetic_feed(args.size, listed))
+    print(f"built {len(store)} prefixes in {time.perf_counter() - started:.2f}s "
+          f"({len(store) * PREFIX_SIZE / 2**20:.1f} MB array, {len(store._bloom.bits) / 2**20:.1f} MB bloom)")
+
+    rng = random.Random(1)
+    probes = [rng.getrandbits(32) for _ in range(args.lookups)]
+    started = time.perf_counter()
+    hits = sum(store.contains_prefix(prefix) for prefix in probes)
+    elapsed = time.perf_counter() - started
+    print(f"single prefix lookups  {len(probes) / elapsed:12,.0f}/s  ({hits} hits)")
+
+    started = time.perf_counter()
+    hits = int(store.contains_prefixes(probes).sum())
+    elapsed = time.perf_counter() - started
+    print(f"batched prefix lookups {len(probes) / elapsed:12,.0f}/s  ({hits} hits)")
+
+    urls = [f"http://site{i}.example.org/path/{i}/page.html?q={i}" for i in range(args.lookups // 100)] + listed
+    started = time.perf_counter()
+    flagged = sum(bool(store.check_url(url)) for url in urls)
+    elapsed = time.perf_counter() - started
+    print(f"full URL checks        {len(urls) / elapsed:12,.0f}/s  ({flagged} flagged)")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline URL reputation store.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = commands.add_parser("build", help="build a store from a feed file")
+    build_parser.add_argument("feed")
+    build_parser.add_argument("store")
+    build_parser.add_argument("--state", default="", help="feed version token to record")
+
+    update_parser = commands.add_parser("update", help="apply an update file to a store")
+    update_parser.add_argument("store")
+    update_parser.add_argument("update")
+
+    check_parser = commands.add_parser("check", help="check URLs against a store")
+    check_parser.add_argument("store")
+    check_parser.add_argument("urls", nargs="+")
+
+    bench_parser = commands.add_parser("bench", help="time lookups against a synthetic feed")
+    bench_parser.add_argument("--size", type=int, default=1000000, help="prefixes in the synthetic feed")
+    bench_parser.add_argument("--lookups", type=int, default=1000000, help="prefix lookups to time")
+
+    args = parser.parse_args(argv)
+    if args.command == "build":
+        store = UrlReputationStore(read_feed(args.feed), args.state)
+        store.save(args.store)
+        print(f"{len(store)} prefixes, checksum {store.checksum}")
+    elif args.command == "update":
+        store = UrlReputationStore.load(args.store)
+        additions, removals, checksum, state = read_update(args.update)
+        store.apply_update(additions, removals, checksum, state)
+        store.save(args.store)
+        print(f"{len(store)} prefixes, checksum {store.checksum}")
+    elif args.command == "check":
+        store = UrlReputationStore.load(args.store)
+        for url in args.urls:
+            matches = store.check_url(url)
+            print(f"{'LISTED' if matches else 'ok':7s} {canonicalize(url)}" + (f"  ({', '.join(matches)})" if matches else ""))
+        return 0
+    else:
+        return bench(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())